@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+序列化格式基准测试
+
+比较订单缓存快照在不同序列化格式/压缩方式下的保存、加载耗时和文件大小
+用法: python benchmark_serialization.py [订单数量 ...]（默认 1000 10000 50000）
+"""
+
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime
+
+import data_codec
+from data_codec import read_data_file, write_data_file
+
+
+def build_orders(count):
+    """生成与真实缓存结构相同的模拟订单数据"""
+    now = datetime.now().isoformat()
+    orders = {}
+    for i in range(count):
+        order_id = f"250801-{i:012d}"
+        orders[order_id] = {
+            "order_id": order_id,
+            "created_at": now,
+            "updated_at": now,
+            "status": "completed",
+            "订单编号": order_id,
+            "商品名称": f"夏季新款纯棉短袖T恤 男女同款 宽松休闲 款式{i % 50}",
+            "成交金额": f"¥{(i % 300) + 19.9:.2f}",
+            "shipping_info": f"张三{i % 97}，1380013{i % 10000:04d}，广东省 深圳市 南山区 科技园南区{i % 200}栋{i % 30}号",
+            "shipping_info_updated_at": now
+        }
+    return orders
+
+
+def available_variants():
+    """列出当前环境可用的格式/压缩组合"""
+    variants = [("json-pretty", None), ("json", None), ("json", "gzip")]
+    if data_codec.zstandard is not None:
+        variants.append(("json", "zstd"))
+    if data_codec.msgpack is not None:
+        variants.append(("msgpack", None))
+        variants.append(("msgpack", "gzip" if data_codec.zstandard is None else "zstd"))
+    return variants
+
+
+def run_benchmark(counts):
+    """执行基准测试并打印结果表"""
+    encoder = "orjson" if data_codec.orjson is not None else "json"
+    print(f"JSON编码器: {encoder}")
+    print(f"{'订单数':>8} {'格式':<12} {'压缩':<6} {'保存(ms)':>10} {'加载(ms)':>10} {'大小(KB)':>10}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "order_data_cache.json")
+        for count in counts:
+            orders = build_orders(count)
+            for fmt, compression in available_variants():
+                start = time.perf_counter()
+                size = write_data_file(path, orders, fmt, compression)
+                save_ms = (time.perf_counter() - start) * 1000
+
+                start = time.perf_counter()
+                loaded = read_data_file(path)
+                load_ms = (time.perf_counter() - start) * 1000
+                assert len(loaded) == count
+
+                print(f"{count:>8} {fmt:<12} {str(compression or '-'):<6} "
+                      f"{save_ms:>10.1f} {load_ms:>10.1f} {size / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]
+    run_benchmark(counts)
@@ -0,0 +1,737 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订单数据缓存存储后端
+
+DataCacheManager 负责内存数据、索引和并发控制，具体的持久化由存储后端完成：
+- JsonCacheStorage: JSON快照 + 追加日志（默认）
+- SqliteCacheStorage: SQLite数据库（WAL模式），适合数千订单以上的店铺
+
+所有后端提供相同的接口：
+load / put / put_many / clear / compact / has_external_changes / poll_changes / backup / close / needs_full_snapshot，
+以及 epoch 属性（清空代数：每次clear都会变化并持久化，其他进程同步后可见）
+
+put / put_many / compact / backup / close 的 all_orders 参数只有在 needs_full_snapshot() 为True时才需要提供，
+日志模式下普通写入只传脏记录，调用方不必每次复制整个缓存
+
+多进程共享：多个采集进程可以在同一工作目录下共用一份缓存。
+JSON后端的所有读写都在 <缓存文件>.lock 上的进程间建议锁内进行（POSIX使用fcntl，
+Windows使用msvcrt），并记录本进程已读到的日志偏移；poll_changes 只解析其他进程
+新追加的日志行，快照被其他进程重写（压缩/清空）时才要求调用方完整重新加载。
+SQLite后端由SQLite自身的文件锁保证一致性，按rowid增量读取其他连接写入的行
+"""
+
+import json
+import os
+import re
+import time
+import uuid
+import shutil
+import hashlib
+import sqlite3
+from data_codec import read_data_file, write_data_file, resolve_format
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+def shipping_info_digest(shipping_info):
+    """计算收货信息的规范化摘要（忽略空白差异），用于重复检测索引"""
+    if not shipping_info:
+        return None
+    normalized = re.sub(r"\s+", " ", str(shipping_info)).strip()
+    if not normalized:
+        return None
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+class CacheStats:
+    """订单缓存统计：随写入增量维护，JSON快照头部会保存一份，启动时无需扫描全部订单"""
+
+    FIELDS = ("total", "completed", "with_shipping", "potential_duplicates", "last_updated")
+
+    def __init__(self, total=0, completed=0, with_shipping=0, potential_duplicates=0, last_updated=""):
+        self.total = total
+        self.completed = completed
+        self.with_shipping = with_shipping
+        self.potential_duplicates = potential_duplicates
+        self.last_updated = last_updated
+
+    @classmethod
+    def from_orders(cls, orders):
+        """扫描全部订单计算统计（旧格式快照或SQLite后端加载时使用）"""
+        stats = cls()
+        for record in orders.values():
+            stats.add(record)
+        return stats
+
+    @classmethod
+    def from_dict(cls, data):
+        """从快照头部恢复统计"""
+        return cls(**{key: data[key] for key in cls.FIELDS if key in data})
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def add(self, record):
+        """计入一条订单记录"""
+        if record is None:
+            return
+        self.total += 1
+        if record.get("status") == "completed":
+            self.completed += 1
+        if record.get("shipping_info"):
+            self.with_shipping += 1
+        if record.get("potential_duplicate"):
+            self.potential_duplicates += 1
+        updated_at = record.get("updated_at") or ""
+        if updated_at > self.last_updated:
+            self.last_updated = updated_at
+
+    def remove(self, record):
+        """移除一条订单记录（订单的更新时间只增不减，last_updated无需回退）"""
+        if record is None:
+            return
+        self.total -= 1
+        if record.get("status") == "completed":
+            self.completed -= 1
+        if record.get("shipping_info"):
+            self.with_shipping -= 1
+        if record.get("potential_duplicate"):
+            self.potential_duplicates -= 1
+
+
+def _file_stat(path):
+    """文件状态 (mtime, 大小, inode)，文件不存在时为None"""
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    except OSError:
+        return None
+
+
+class InterProcessLock:
+    """基于锁文件的进程间建议锁（可重入，线程间互斥由调用方保证）
+
+    POSIX使用fcntl.flock，Windows使用msvcrt.locking；两者都不可用时退化为无锁
+    """
+
+    def __init__(self, lock_path):
+        self.path = lock_path
+        self._file = None
+        self._depth = 0
+
+    def acquire(self):
+        """获取锁（阻塞等待其他进程释放）"""
+        if self._depth == 0:
+            lock_file = open(self.path, 'a+b')
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                elif msvcrt is not None:
+                    lock_file.seek(0)
+                    while True:
+                        try:
+                            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                            break
+                        except OSError:
+                            time.sleep(0.01)
+            except Exception:
+                lock_file.close()
+                raise
+            self._file = lock_file
+        self._depth += 1
+
+    def release(self):
+        """释放锁（最外层释放时才真正解锁）"""
+        self._depth -= 1
+        if self._depth > 0:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class JsonCacheStorage:
+    """JSON快照 + 追加日志存储后端
+
+    日志模式下每次写入只向 <缓存文件>.journal 追加一行JSON，按批次fsync，
+    日志条目达到阈值后再压缩合并进快照文件，加载时以"快照 + 日志重放"重建完整数据；
+    快照的序列化格式和压缩方式见 data_codec.py，读取时自动识别；
+    快照内容为 {"format": 2, "stats": 统计, "epoch": 清空代数, "orders": 订单字典}，旧版直接保存订单字典的快照仍可读取
+
+    多进程：读写都持有进程间锁；压缩时只截断日志（不删除文件），
+    其他进程通过快照文件状态的变化得知需要完整重新加载
+    """
+
+    name = "json"
+    SNAPSHOT_VERSION = 2  # 带统计头部的快照格式版本
+
+    def __init__(self, cache_file_path="order_data_cache.json", use_journal=True,
+                 journal_fsync_batch=20, journal_fsync_interval=1.0, compact_threshold=500,
+                 snapshot_format="json-pretty", compression=None):
+        """
+        参数:
+        - use_journal: 是否启用追加日志模式（关闭时每次写入都重写整个快照）
+        - journal_fsync_batch: 累计多少条日志后执行一次fsync
+        - journal_fsync_interval: 距上次fsync超过多少秒后强制fsync
+        - compact_threshold: 日志条目达到该数量后压缩合并到快照
+        - snapshot_format: 快照序列化格式（json-pretty / json / msgpack）
+        - compression: 快照压缩方式（None / gzip / zstd）
+        """
+        self.path = cache_file_path
+        self.snapshot_format, self.compression = resolve_format(snapshot_format, compression)
+        self.journal_file_path = cache_file_path + ".journal"
+        self.use_journal = use_journal
+        self.journal_fsync_batch = journal_fsync_batch
+        self.journal_fsync_interval = journal_fsync_interval
+        self.compact_threshold = compact_threshold
+        self._journal_file = None  # 日志文件句柄（延迟打开）
+        self._journal_entries = 0  # 自上次压缩以来的日志条目数
+        self._unsynced_entries = 0  # 尚未fsync的日志条目数
+        self._last_fsync_time = time.time()
+        self._lock = InterProcessLock(cache_file_path + ".lock")
+        self._snapshot_stat = None  # 本进程最后一次读写后的快照文件状态
+        self._journal_offset = 0  # 本进程已读取/写入到的日志字节偏移
+        self._journal_ino = None  # 日志文件inode，用于发现日志被替换
+        self._pending_changes = {}  # 其他进程写入、尚未交给调用方的订单
+        self._needs_reload = False  # 快照被其他进程重写，调用方需要完整重新加载
+        self.loaded_stats = None  # 最近一次加载得到的统计（旧格式快照为None，由调用方扫描计算）
+        self.epoch = None  # 清空代数（每次clear生成新值，保存在快照头部；从未清空过的旧快照为None）
+
+    def load(self, repair_journal=False):
+        """加载缓存文件（快照 + 日志重放），返回订单字典"""
+        with self._lock:
+            cache_data = self._read_snapshot()
+            self._pending_changes = {}
+            self._needs_reload = False
+            self._replay_journal(cache_data, repair_journal)
+
+            # 非日志模式下遗留的日志需要立即合并，避免数据只存在于日志中
+            if not self.use_journal and self._journal_entries > 0:
+                self.compact(cache_data)
+            return cache_data
+
+    def _read_snapshot(self):
+        """读取快照文件并记录其文件状态和头部统计（调用方需持有进程间锁）"""
+        cache_data = {}
+        self._snapshot_stat = _file_stat(self.path)
+        self.loaded_stats = CacheStats() if self._snapshot_stat is None else None
+        self.epoch = None
+        try:
+            if self._snapshot_stat is not None:
+                cache_data = read_data_file(self.path)
+                if not isinstance(cache_data, dict):
+                    cache_data = {}
+                elif cache_data.get("format") == self.SNAPSHOT_VERSION and isinstance(cache_data.get("orders"), dict):
+                    if isinstance(cache_data.get("stats"), dict):
+                        self.loaded_stats = CacheStats.from_dict(cache_data["stats"])
+                    self.epoch = cache_data.get("epoch")
+                    cache_data = cache_data["orders"]
+        except Exception as e:
+            print(f"加载缓存文件失败: {str(e)}")
+            cache_data = {}
+        return cache_data
+
+    def _replay_journal(self, cache_data, repair_journal=False):
+        """重放日志文件中的变更记录
+
+        日志只会在末尾出现写到一半的行（进程崩溃），遇到无法解析的行即停止重放；
+        repair_journal为True时把日志截断到最后一条完整记录，保证后续追加可被正确重放
+        """
+        self._journal_entries = 0
+        self._journal_offset = 0
+        journal_stat = _file_stat(self.journal_file_path)
+        self._journal_ino = journal_stat[2] if journal_stat else None
+        if journal_stat is None:
+            return
+
+        valid_length = 0
+        torn_tail = False
+        try:
+            with open(self.journal_file_path, 'rb') as f:
+                for raw_line in f:
+                    if not raw_line.endswith(b"\n"):
+                        torn_tail = True
+                        break
+                    try:
+                        entry = json.loads(raw_line.decode('utf-8'))
+                    except (ValueError, UnicodeDecodeError):
+                        torn_tail = True
+                        break
+                    if entry.get("op") == "put":
+                        if self.loaded_stats is not None:
+                            self.loaded_stats.remove(cache_data.get(entry["order_id"]))
+                            self.loaded_stats.add(entry["record"])
+                        cache_data[entry["order_id"]] = entry["record"]
+                    self._journal_entries += 1
+                    valid_length += len(raw_line)
+        except Exception as e:
+            print(f"重放缓存日志失败: {str(e)}")
+            return
+
+        self._journal_offset = valid_length
+        if torn_tail:
+            print(f"[缓存日志] 检测到不完整的日志尾部，已忽略（有效条目: {self._journal_entries}）")
+            if repair_journal:
+                try:
+                    with open(self.journal_file_path, 'r+b') as f:
+                        f.truncate(valid_length)
+                except Exception as e:
+                    print(f"截断缓存日志失败: {str(e)}")
+
+    def needs_full_snapshot(self, pending=0):
+        """调用方是否需要提供全部订单（all_orders）
+
+        写入pending条记录时：非日志模式要重写快照，日志模式只在即将达到压缩阈值时需要；
+        pending为0（压缩、备份、关闭）时：日志中有未合并的记录才需要
+        """
+        if not self.use_journal:
+            return True
+        if pending:
+            return self._journal_entries + pending >= self.compact_threshold
+        return self._journal_entries > 0
+
+    def put(self, order_id, record, all_orders=None):
+        """持久化单个订单；非日志模式下需要用all_orders重写整个快照"""
+        return self.put_many({order_id: record}, all_orders)
+
+    def put_many(self, records, all_orders=None):
+        """批量持久化多个订单：日志模式下一次写入多行，只flush一次"""
+        if not records:
+            return True
+        with self._lock:
+            if not self.use_journal:
+                if all_orders is None or _file_stat(self.path) != self._snapshot_stat:
+                    # 快照已被其他进程重写（或调用方未提供全部订单）：在磁盘上的最新数据上合并本次修改，避免覆盖对方的写入
+                    if _file_stat(self.path) != self._snapshot_stat:
+                        self._needs_reload = True
+                    all_orders = self._read_snapshot()
+                    all_orders.update(records)
+                return self._save_snapshot(all_orders)
+
+            try:
+                self._catch_up()
+                self._open_journal()
+                lines = "".join(
+                    json.dumps({"op": "put", "order_id": order_id, "record": record},
+                               ensure_ascii=False, separators=(',', ':')) + "\n"
+                    for order_id, record in records.items()
+                )
+                self._journal_file.write(lines.encode('utf-8'))
+                self._journal_file.flush()
+                self._journal_offset = self._journal_file.tell()
+                self._journal_entries += len(records)
+                self._unsynced_entries += len(records)
+
+                if (self._unsynced_entries >= self.journal_fsync_batch or
+                        time.time() - self._last_fsync_time >= self.journal_fsync_interval):
+                    self._sync_journal()
+
+                if self._journal_entries >= self.compact_threshold:
+                    return self.compact(all_orders)
+                return True
+            except Exception as e:
+                print(f"写入缓存日志失败: {str(e)}")
+                return False
+
+    def _open_journal(self):
+        """打开日志文件；日志被删除或替换时重新打开，避免写入已失效的文件"""
+        journal_stat = _file_stat(self.journal_file_path)
+        if self._journal_file is not None:
+            if journal_stat is not None and os.fstat(self._journal_file.fileno()).st_ino == journal_stat[2]:
+                return
+            self._close_journal()
+        self._journal_file = open(self.journal_file_path, 'ab')
+        self._journal_ino = os.fstat(self._journal_file.fileno()).st_ino
+
+    def _catch_up(self):
+        """读取其他进程在本进程上次读写之后追加的日志（调用方需持有进程间锁）
+
+        只解析新增的完整日志行并暂存到_pending_changes；快照被重写、日志变短或被替换时
+        无法增量追赶，标记为需要完整重新加载
+        """
+        if self._needs_reload:
+            return
+        if _file_stat(self.path) != self._snapshot_stat:
+            self._needs_reload = True
+            return
+        journal_stat = _file_stat(self.journal_file_path)
+        if journal_stat is None:
+            if self._journal_offset > 0:
+                self._needs_reload = True
+            return
+        if journal_stat[1] < self._journal_offset or (self._journal_offset > 0 and journal_stat[2] != self._journal_ino):
+            self._needs_reload = True
+            return
+        if journal_stat[1] == self._journal_offset:
+            return
+
+        with open(self.journal_file_path, 'rb') as f:
+            f.seek(self._journal_offset)
+            data = f.read()
+        complete_length = data.rfind(b"\n") + 1
+        for raw_line in data[:complete_length].splitlines():
+            try:
+                entry = json.loads(raw_line.decode('utf-8'))
+            except (ValueError, UnicodeDecodeError):
+                print("[缓存日志] 跳过无法解析的日志行")
+                continue
+            if entry.get("op") == "put":
+                self._pending_changes[entry["order_id"]] = entry["record"]
+            self._journal_entries += 1
+        self._journal_offset += complete_length
+        self._journal_ino = journal_stat[2]
+
+    def has_external_changes(self):
+        """其他进程是否在本进程上次读写之后修改过缓存（只比较文件状态，不加锁）"""
+        if self._pending_changes or self._needs_reload:
+            return True
+        if _file_stat(self.path) != self._snapshot_stat:
+            return True
+        journal_stat = _file_stat(self.journal_file_path)
+        if journal_stat is None:
+            return self._journal_offset > 0
+        return journal_stat[1] != self._journal_offset or (
+            self._journal_offset > 0 and journal_stat[2] != self._journal_ino)
+
+    def poll_changes(self):
+        """获取其他进程写入的订单变更 {订单ID: 记录}；需要完整重新加载时返回None"""
+        with self._lock:
+            self._catch_up()
+            if self._needs_reload:
+                return None
+            changes = self._pending_changes
+            self._pending_changes = {}
+            return changes
+
+    def clear(self):
+        """清空存储：空快照 + 清空日志，并生成新的清空代数"""
+        with self._lock:
+            self._pending_changes = {}
+            self._needs_reload = False
+            self.epoch = uuid.uuid4().hex
+            return self._rewrite({})
+
+    def compact(self, all_orders=None):
+        """压缩日志：把全部数据写入新快照后清空日志
+
+        若其他进程也写入过，以磁盘上的完整数据为准（本进程的修改都已写入日志），
+        并要求调用方随后完整重新加载；调用方未提供all_orders时同样从磁盘重建
+        """
+        with self._lock:
+            self._catch_up()
+            if self._needs_reload or self._pending_changes:
+                all_orders = self._read_snapshot()
+                self._replay_journal(all_orders)
+                self._pending_changes = {}
+                self._needs_reload = True
+            elif all_orders is None:
+                if self._journal_entries == 0:
+                    return True
+                all_orders = self._read_snapshot()
+                self._replay_journal(all_orders)
+            return self._rewrite(all_orders)
+
+    def _rewrite(self, all_orders):
+        """先原子性写入新快照，再截断日志（调用方需持有进程间锁）
+
+        若在两步之间崩溃，日志中的记录都是整条覆盖写入，重放到新快照上结果不变；
+        日志只截断不删除，其他进程持有的追加句柄仍然有效
+        """
+        self._close_journal()
+        if not self._save_snapshot(all_orders):
+            return False
+        try:
+            if os.path.exists(self.journal_file_path):
+                with open(self.journal_file_path, 'r+b') as f:
+                    f.truncate(0)
+            self._journal_entries = 0
+            self._journal_offset = 0
+            return True
+        except Exception as e:
+            print(f"清空缓存日志失败: {str(e)}")
+            return False
+
+    def has_pending_journal(self):
+        """日志中是否还有未合并进快照的记录"""
+        return self._journal_entries > 0
+
+    def _save_snapshot(self, all_orders):
+        """保存快照到文件（原子性写入）"""
+        try:
+            # 临时文件 + os.replace（Windows上也能覆盖已存在的文件，不会出现文件缺失的窗口期）
+            snapshot = {
+                "format": self.SNAPSHOT_VERSION,
+                "stats": CacheStats.from_orders(all_orders).to_dict(),
+                "epoch": self.epoch,
+                "orders": all_orders
+            }
+            write_data_file(self.path, snapshot, self.snapshot_format, self.compression)
+            self._snapshot_stat = _file_stat(self.path)
+            return True
+        except Exception as e:
+            print(f"保存缓存文件失败: {str(e)}")
+            return False
+
+    def _sync_journal(self):
+        """将日志文件刷到磁盘"""
+        if self._journal_file is not None and self._unsynced_entries > 0:
+            os.fsync(self._journal_file.fileno())
+        self._unsynced_entries = 0
+        self._last_fsync_time = time.time()
+
+    def _close_journal(self):
+        """关闭日志文件句柄"""
+        if self._journal_file is not None:
+            try:
+                self._sync_journal()
+            finally:
+                self._journal_file.close()
+                self._journal_file = None
+
+    def backup(self, backup_file, all_orders=None, hardlink=False):
+        """备份到指定文件（先合并日志，确保备份包含全部数据）
+
+        快照文件总是通过 os.replace 整体替换、从不原地修改，因此可以用硬链接备份：
+        不复制数据，后续写入也不会影响已有备份；硬链接失败（跨磁盘、文件系统不支持）时退回复制
+        """
+        with self._lock:
+            if self.use_journal and self._journal_entries > 0:
+                self.compact(all_orders)
+            if not os.path.exists(self.path):
+                return False
+            if hardlink:
+                try:
+                    os.link(self.path, backup_file)
+                    return True
+                except OSError:
+                    pass
+            shutil.copy2(self.path, backup_file)
+            return True
+
+    def close(self, all_orders=None):
+        """关闭存储：合并日志并释放文件句柄"""
+        if all_orders is not None and self.use_journal and self._journal_entries > 0:
+            return self.compact(all_orders)
+        self._close_journal()
+        return True
+
+
+class SqliteCacheStorage:
+    """SQLite存储后端（WAL模式）
+
+    orders表以清理后的订单ID为主键，并在状态、收货信息摘要和更新时间上建立索引；
+    完整记录以JSON保存在data列中，单条写入只更新一行
+
+    多进程：INSERT OR REPLACE 总是生成新的rowid，rowid顺序即提交顺序，
+    poll_changes 只读取上次同步之后rowid更大的行；清空时递增meta表中的epoch，
+    其他进程据此改为完整重新加载
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path="order_data_cache.db"):
+        self.path = db_path
+        # 写入都在DataCacheManager的锁内进行，允许跨线程共享连接
+        self.conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS orders (
+                order_id TEXT PRIMARY KEY,
+                status TEXT,
+                shipping_hash TEXT,
+                created_at TEXT,
+                updated_at TEXT,
+                data TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_shipping_hash ON orders(shipping_hash)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_updated_at ON orders(updated_at)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', 0)")
+        self.conn.commit()
+        self._data_version = None  # 最后一次同步时的data_version
+        self._last_rowid = 0  # 最后一次同步时的最大rowid
+        self._epoch = None  # 最后一次同步时的清空代数
+        self.loaded_stats = None  # 统计不单独保存，由调用方在加载后扫描计算
+
+    def load(self, repair_journal=False):
+        """读取全部订单，返回订单字典（WAL由SQLite自行恢复，repair_journal无需处理）"""
+        cache_data = {}
+        try:
+            # 先记录data_version再读取，期间的外部提交最多导致一次多余的增量读取
+            self._data_version = self._query_data_version()
+            self._epoch = self._query_epoch()
+            self._last_rowid = 0
+            for rowid, order_id, data in self.conn.execute("SELECT rowid, order_id, data FROM orders"):
+                cache_data[order_id] = json.loads(data)
+                self._last_rowid = max(self._last_rowid, rowid)
+        except Exception as e:
+            print(f"加载SQLite缓存失败: {str(e)}")
+        return cache_data
+
+    def _query_data_version(self):
+        """data_version只在其他连接提交修改后才会变化，正好用于判断外部修改"""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _query_epoch(self):
+        """读取清空代数"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()
+        return row[0] if row else 0
+
+    def has_external_changes(self):
+        """其他连接是否在上次同步之后提交过修改"""
+        try:
+            return self._query_data_version() != self._data_version
+        except Exception:
+            return False
+
+    def poll_changes(self):
+        """获取上次同步之后写入的订单 {订单ID: 记录}；其他进程清空过数据时返回None"""
+        try:
+            data_version = self._query_data_version()
+            if self._query_epoch() != self._epoch:
+                return None
+            changes = {}
+            last_rowid = self._last_rowid
+            for rowid, order_id, data in self.conn.execute(
+                    "SELECT rowid, order_id, data FROM orders WHERE rowid > ? ORDER BY rowid", (self._last_rowid,)):
+                changes[order_id] = json.loads(data)
+                last_rowid = rowid
+            self._last_rowid = last_rowid
+            self._data_version = data_version
+            return changes
+        except Exception as e:
+            print(f"读取SQLite增量变更失败: {str(e)}")
+            return None
+
+    def put(self, order_id, record, all_orders=None):
+        """写入或覆盖单个订单"""
+        return self.put_many({order_id: record})
+
+    def put_many(self, records, all_orders=None):
+        """在一个事务内写入或覆盖多个订单"""
+        if not records:
+            return True
+        try:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO orders (order_id, status, shipping_hash, created_at, updated_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(order_id, record.get("status"), shipping_info_digest(record.get("shipping_info")),
+                  record.get("created_at"), record.get("updated_at"),
+                  json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+                 for order_id, record in records.items()]
+            )
+            self.conn.commit()
+            return True
+        except Exception as e:
+            print(f"写入SQLite缓存失败: {str(e)}")
+            return False
+
+    def clear(self):
+        """清空所有订单"""
+        try:
+            self.conn.execute("DELETE FROM orders")
+            self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'epoch'")
+            self.conn.commit()
+            self._epoch = self._query_epoch()
+            self._last_rowid = 0
+            return self.compact()
+        except Exception as e:
+            print(f"清空SQLite缓存失败: {str(e)}")
+            return False
+
+    def compact(self, all_orders=None):
+        """把WAL检查点合并回主数据库文件"""
+        try:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return True
+        except Exception as e:
+            print(f"SQLite检查点失败: {str(e)}")
+            return False
+
+    def has_pending_journal(self):
+        """WAL由SQLite自动检查点，无需调用方干预"""
+        return False
+
+    def needs_full_snapshot(self, pending=0):
+        """按行写入，从不需要全部订单"""
+        return False
+
+    @property
+    def epoch(self):
+        """清空代数（meta表中每次clear递增）"""
+        return self._epoch
+
+    def backup(self, backup_file, all_orders=None, hardlink=False):
+        """使用SQLite在线备份API生成一致的备份文件（数据库原地修改，不能使用硬链接）"""
+        target = sqlite3.connect(backup_file)
+        try:
+            self.conn.backup(target)
+        finally:
+            target.close()
+        return True
+
+    def close(self, all_orders=None):
+        """检查点后关闭连接"""
+        self.compact()
+        self.conn.close()
+        return True
+
+
+def create_storage(config):
+    """根据缓存配置创建存储后端"""
+    storage_config = config.get("storage", {})
+    backend = storage_config.get("backend", "json")
+    if backend == "sqlite":
+        return SqliteCacheStorage(storage_config.get("sqlite_path", "order_data_cache.db"))
+    if backend != "json":
+        print(f"未知的缓存存储后端 '{backend}'，使用JSON后端")
+
+    journal_config = config.get("journal", {})
+    serialization_config = config.get("serialization", {})
+    return JsonCacheStorage(
+        storage_config.get("json_path", "order_data_cache.json"),
+        use_journal=journal_config.get("enabled", True),
+        journal_fsync_batch=journal_config.get("fsync_batch", 20),
+        journal_fsync_interval=journal_config.get("fsync_interval_seconds", 1.0),
+        compact_threshold=journal_config.get("compact_threshold", 500),
+        snapshot_format=serialization_config.get("format", "json"),
+        compression=serialization_config.get("compression")
+    )
+
+
+def migrate_storage(source, target):
+    """一次性迁移：把源后端的全部订单写入目标后端（目标原有数据会被清空）
+
+    返回迁移的订单数量
+    """
+    orders = source.load()
+    target.clear()
+    if not target.put_many(orders, orders):
+        raise RuntimeError("写入目标存储后端失败")
+    target.compact(orders)
+    return len(orders)
@@ -8,7 +8,8 @@
 """
 
 from utils import *
-from data_cache_manager import get_cache_manager
+from data_cache_manager import get_cache_manager, load_cache_config
+from data_codec import read_data_file, write_data_file
 
 class ClipboardManager:
     """剪贴板管理相关"""
@@ -17,6 +18,8 @@ class ClipboardManager:
         """初始化剪贴板管理器"""
         self.cache_manager = get_cache_manager()  # 获取数据缓存管理器
         self.parent = parent  # 父对象引用，用于获取运行状态
+        # 映射文件与订单缓存快照使用相同的序列化格式和压缩方式
+        self.clipboard_mappings_serialization = load_cache_config().get("serialization", {})
 
     def _get_clipboard_content(self):
         """
@@ -136,16 +139,27 @@ class ClipboardManager:
             self._log_info(f"收货信息无效，拒绝写入: {reason}", "orange")
             return False
         
-        # 检查是否已存在更长的收货信息
-        existing_order = self.cache_manager.read_order_by_id(order_id)
-        if existing_order and existing_order.get("shipping_info"):
-            existing_content = existing_order["shipping_info"]
-            if len(existing_content) > len(content):
-                self._log_info(f"保留现有更长的收货信息 (现有:{len(existing_content)}字符 vs 新内容:{len(content)}字符)", "orange")
-                return False
+        # 检查是否已存在更长的收货信息，并以读取时的版本号做比较并交换写入，
+        # 防止监听线程与主循环交错写入时覆盖对方刚写入的更长内容
+        for _ in range(3):
+            existing_order = self.cache_manager.read_order_by_id(order_id)
+            if existing_order and existing_order.get("shipping_info"):
+                existing_content = existing_order["shipping_info"]
+                if len(existing_content) > len(content):
+                    self._log_info(f"保留现有更长的收货信息 (现有:{len(existing_content)}字符 vs 新内容:{len(content)}字符)", "orange")
+                    return False
+            
+            # 写入到数据缓存
+            expected_version = existing_order.get("version", 0) if existing_order else 0
+            success, _ = self.cache_manager.upsert_fields(order_id, {"shipping_info": content}, expected_version)
+            if success:
+                break
+            # 只有被其他写入方抢先修改了收货信息时才重试
+            latest_order = self.cache_manager.read_order_by_id(order_id)
+            if not latest_order or latest_order.get("shipping_info") == content:
+                break
+            self._log_info(f"订单 {order_id} 的收货信息已被其他写入方更新，重新比较后再写入", "orange")
         
-        # 写入到数据缓存
-        success = self.cache_manager.write_order_data(order_id, shipping_info=content)
         if success:
             self._log_info(f"已建立映射: 订单ID {order_id} <-> 收货信息 (长度: {len(content)})", "green")
             
@@ -173,9 +187,10 @@ class ClipboardManager:
                 "order_clipboard_mappings": self.order_clipboard_contents
             }
             
-            # 保存到JSON文件
-            with open('clipboard_mappings.json', 'w', encoding='utf-8') as f:
-                json.dump(save_data, f, ensure_ascii=False, indent=2)
+            # 保存到映射文件（格式由cache_config.json的serialization配置决定）
+            serialization = getattr(self, 'clipboard_mappings_serialization', {})
+            write_data_file('clipboard_mappings.json', save_data,
+                            serialization.get("format", "json"), serialization.get("compression"))
             
             self._log_info(f"已保存 {len(self.order_clipboard_contents)} 个订单ID与剪贴板内容的映射", "green")
         except Exception as e:
@@ -192,8 +207,8 @@ class ClipboardManager:
         
         try:
             if os.path.exists('clipboard_mappings.json'):
-                with open('clipboard_mappings.json', 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                # 自动识别新旧格式（缩进JSON / 紧凑JSON / msgpack，可带压缩）
+                data = read_data_file('clipboard_mappings.json')
                 
                 if 'order_clipboard_mappings' in data:
                     # 将已加载的映射合并到现有字典
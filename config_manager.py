@@ -52,6 +52,7 @@ class ConfigManager:
 
     def _save_offset_config(self):
         """保存元素偏移量配置"""
+        self._operation_plan = None  # 偏移量已变化，执行计划在下一个订单重新编译
         try:
             config = {
                 "element_offsets": self.element_offsets,
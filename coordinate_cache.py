@@ -4,21 +4,43 @@
 坐标缓存系统
 
 负责管理元素坐标的缓存和恢复，用于重试机制中的坐标回退功能
+
+坐标只在内存中更新：坐标或偏移量发生变化时延迟 flush_delay 秒后合并写盘，
+坐标未变化的成功点击只累加内存中的计数，不触发写盘；停止采集和解释器退出时显式 flush()
+
+layout_coordinates 按 (元素名称, 视口尺寸, devicePixelRatio, 页面布局签名) 保存元素滚动到视口中央后
+其中心点的视口坐标：每个订单的元素点击前都会滚动到视口中央，同一列元素在不同订单行上的视口位置相同，
+因此与订单槽位和页面高度（随滚动加载变化）无关，第二个订单起就可以在正常流程中直接使用，
+而不只是重试模式下所有查找策略失败后的最后手段
 """
 
 import json
 import os
 import time
-from datetime import datetime, timedelta
+import atexit
+import threading
+from datetime import datetime
 from typing import Dict, Optional, Tuple
+from data_codec import write_data_file
+from coordinate_policy import CoordinateValidityPolicy, coordinate_timestamp, get_coordinate_policy
 
 class CoordinateCache:
     """坐标缓存管理器"""
     
-    def __init__(self, cache_file="coordinate_cache.json"):
+    def __init__(self, cache_file="coordinate_cache.json", flush_delay=2.0,
+                 policy: Optional[CoordinateValidityPolicy] = None):
         self.cache_file = cache_file
+        self.policy = policy or get_coordinate_policy()  # 与RetryManager共用的坐标有效性策略
         self.cache_data = self._load_cache()
+        self.cache_data.setdefault("layout_coordinates", {})  # 兼容没有该字段的旧缓存文件
         self.is_retry_mode = False  # 重试模式标志
+        self.flush_delay = flush_delay  # 坐标变化后延迟写盘的秒数
+        self._lock = threading.RLock()
+        self._dirty = False  # 内存中有尚未写盘的修改
+        self._flush_timer = None
+        self.write_stats = {"updates": 0, "unchanged": 0, "flushes": 0}  # 坐标更新 / 未变化 / 实际写盘次数
+        self._migrate_timestamps()
+        atexit.register(self.flush)
         
     def _load_cache(self) -> Dict:
         """加载缓存数据"""
@@ -32,25 +54,60 @@ class CoordinateCache:
             print(f"加载坐标缓存失败: {e}")
             return self._get_default_cache_structure()
     
+    def _migrate_timestamps(self) -> None:
+        """为只有 last_success 字符串的旧记录补上 last_success_ts，并标记为待写盘"""
+        migrated = 0
+        for section in ("coordinates", "layout_coordinates"):
+            for coord_data in self.cache_data.get(section, {}).values():
+                if "last_success_ts" in coord_data:
+                    continue
+                timestamp = coordinate_timestamp(coord_data)
+                if timestamp is not None:
+                    coord_data["last_success_ts"] = timestamp
+                    migrated += 1
+        if migrated:
+            self._dirty = True
+    
     def _get_default_cache_structure(self) -> Dict:
         """获取默认缓存结构"""
         return {
             "cache_version": "1.0",
             "last_updated": datetime.now().isoformat(),
-            "coordinates": {}
+            "coordinates": {},
+            "layout_coordinates": {}
         }
     
     def _save_cache(self) -> bool:
-        """保存缓存数据"""
+        """保存缓存数据（紧凑JSON，临时文件 + os.replace 原子写入）"""
         try:
-            self.cache_data["last_updated"] = datetime.now().isoformat()
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache_data, f, ensure_ascii=False, indent=2)
+            with self._lock:
+                self.cache_data["last_updated"] = datetime.now().isoformat()
+                write_data_file(self.cache_file, self.cache_data, "json")
+                self._dirty = False
+                self.write_stats["flushes"] += 1
             return True
         except Exception as e:
             print(f"保存坐标缓存失败: {e}")
             return False
     
+    def _schedule_flush(self) -> None:
+        """安排延迟写盘；已有待执行的写盘时合并到同一次写入"""
+        if self._flush_timer is not None:
+            return
+        self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+    
+    def flush(self) -> bool:
+        """立即把内存中的修改写盘（停止采集和解释器退出时调用）"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return True
+            return self._save_cache()
+    
     def set_retry_mode(self, is_retry: bool) -> None:
         """设置重试模式状态"""
         self.is_retry_mode = is_retry
@@ -62,30 +119,126 @@ class CoordinateCache:
         return self.is_retry_mode
     
     def save_coordinate(self, element_name: str, screen_x: int, screen_y: int, 
-                      element_offset_x: int = 0, element_offset_y: int = 0) -> bool:
-        """保存元素坐标（正常模式和重试模式都会保存）"""
+                      element_offset_x: int = 0, element_offset_y: int = 0,
+                      scroll_y: Optional[int] = None) -> bool:
+        """保存元素坐标（正常模式和重试模式都会保存）
+        
+        scroll_y为保存时的页面滚动位置（用于之后按滚动差调整坐标），不提供时保留原值；
+        坐标、偏移量和滚动位置都未变化时只累加成功次数，不安排写盘
+        """
         try:
-            coordinate_data = {
-                "screen_x": screen_x,
-                "screen_y": screen_y,
-                "element_offset_x": element_offset_x,
-                "element_offset_y": element_offset_y,
-                "success_count": self.cache_data["coordinates"].get(element_name, {}).get("success_count", 0) + 1,
-                "last_success": datetime.now().isoformat(),
-                "created_at": self.cache_data["coordinates"].get(element_name, {}).get("created_at", datetime.now().isoformat())
-            }
-            
-            self.cache_data["coordinates"][element_name] = coordinate_data
-            success = self._save_cache()
-            
-            if success:
-                print(f"[坐标缓存] 已保存元素'{element_name}'的坐标: ({screen_x}, {screen_y})")
+            with self._lock:
+                now_ts = time.time()
+                now = datetime.fromtimestamp(now_ts).isoformat()
+                existing = self.cache_data["coordinates"].get(element_name)
+                if scroll_y is None and existing:
+                    scroll_y = existing.get("scroll_y")
+                position = (screen_x, screen_y, element_offset_x, element_offset_y, scroll_y)
+                if existing and (existing.get("screen_x"), existing.get("screen_y"),
+                                 existing.get("element_offset_x"), existing.get("element_offset_y"),
+                                 existing.get("scroll_y")) == position:
+                    existing["success_count"] = existing.get("success_count", 0) + 1
+                    existing["last_success"] = now
+                    existing["last_success_ts"] = now_ts
+                    self._dirty = True
+                    self.write_stats["unchanged"] += 1
+                    return True
+                
+                coordinate_data = dict(existing or {})
+                coordinate_data.update({
+                    "screen_x": screen_x,
+                    "screen_y": screen_y,
+                    "element_offset_x": element_offset_x,
+                    "element_offset_y": element_offset_y,
+                    "success_count": coordinate_data.get("success_count", 0) + 1,
+                    "last_success": now,
+                    "last_success_ts": now_ts,
+                    "created_at": coordinate_data.get("created_at", now)
+                })
+                if scroll_y is not None:
+                    coordinate_data["scroll_y"] = scroll_y
+                self.cache_data["coordinates"][element_name] = coordinate_data
+                self._dirty = True
+                self.write_stats["updates"] += 1
+                self._schedule_flush()
             
-            return success
+            print(f"[坐标缓存] 已更新元素'{element_name}'的坐标: ({screen_x}, {screen_y})")
+            return True
         except Exception as e:
             print(f"保存坐标失败: {e}")
             return False
     
+    def lookup(self, element_name: str) -> Optional[Dict]:
+        """按元素名称查找完整坐标记录（内存字典O(1)查找，不读文件），从未成功过的元素返回None"""
+        coord_data = self.cache_data["coordinates"].get(element_name)
+        if coord_data and coord_data.get("success_count", 0) > 0:
+            return dict(coord_data)  # 返回副本
+        return None
+    
+    @staticmethod
+    def layout_key(element_name: str, viewport: Tuple[int, int],
+                   device_pixel_ratio: float, layout_signature: str) -> str:
+        """生成布局坐标的键：元素名称|视口宽x高|devicePixelRatio|布局签名"""
+        return (f"{element_name}|{int(viewport[0])}x{int(viewport[1])}|"
+                f"{float(device_pixel_ratio):g}|{layout_signature}")
+    
+    def save_layout_coordinate(self, key: str, view_x: float, view_y: float) -> bool:
+        """保存元素滚动到视口中央后中心点的视口坐标（CSS像素，不含元素偏移量）
+        
+        位置未变化（1像素以内）时只累加成功次数，不安排写盘
+        """
+        try:
+            with self._lock:
+                now_ts = time.time()
+                now = datetime.fromtimestamp(now_ts).isoformat()
+                view_x, view_y = round(view_x), round(view_y)
+                layout_coordinates = self.cache_data["layout_coordinates"]
+                existing = layout_coordinates.get(key)
+                if existing and abs(existing["view_x"] - view_x) <= 1 and abs(existing["view_y"] - view_y) <= 1:
+                    existing["success_count"] = existing.get("success_count", 0) + 1
+                    existing["last_success"] = now
+                    existing["last_success_ts"] = now_ts
+                    self._dirty = True
+                    self.write_stats["unchanged"] += 1
+                    return True
+                
+                layout_coordinates[key] = {
+                    "view_x": view_x,
+                    "view_y": view_y,
+                    "success_count": 1,  # 位置变化后重新计数
+                    "last_success": now,
+                    "last_success_ts": now_ts,
+                    "created_at": existing.get("created_at", now) if existing else now
+                }
+                self._dirty = True
+                self.write_stats["updates"] += 1
+                self._schedule_flush()
+            return True
+        except Exception as e:
+            print(f"保存布局坐标失败: {e}")
+            return False
+    
+    def lookup_layout(self, key: str, min_success: int = 2) -> Optional[Dict]:
+        """按布局键查找视口坐标（内存字典O(1)查找），同一位置成功次数不足 min_success 时返回None"""
+        coord_data = self.cache_data["layout_coordinates"].get(key)
+        if coord_data and coord_data.get("success_count", 0) >= min_success:
+            return dict(coord_data)
+        return None
+    
+    def discard_layout(self, key: str) -> None:
+        """删除验证失败的布局坐标，下次重新从真实元素学习"""
+        with self._lock:
+            if self.cache_data["layout_coordinates"].pop(key, None) is not None:
+                self._dirty = True
+                self._schedule_flush()
+    
+    @staticmethod
+    def to_screen(coord_data: Dict, metrics: Dict) -> Tuple[float, float]:
+        """按当前窗口位置把视口坐标换算为屏幕坐标（与正常点击流程的内容区域计算方式一致）"""
+        content_left = metrics['screenX'] + (metrics['outerWidth'] - metrics['innerWidth']) / 2
+        content_top = metrics['screenY'] + (metrics['outerHeight'] - metrics['innerHeight'])
+        return content_left + coord_data["view_x"], content_top + coord_data["view_y"]
+    
     def get_cached_coordinate(self, element_name: str) -> Optional[Tuple[int, int]]:
         """获取缓存的坐标（仅在重试模式下且元素查找失败时使用）"""
         if not self.should_use_cache():
@@ -112,50 +265,26 @@ class CoordinateCache:
             return None
     
     def _is_coordinate_valid(self, coord_data: Dict) -> bool:
-        """检查坐标是否有效"""
-        try:
-            # 检查必要字段
-            required_fields = ["screen_x", "screen_y", "last_success"]
-            for field in required_fields:
-                if field not in coord_data:
-                    return False
-            
-            # 检查时间有效性（24小时内）
-            last_success = datetime.fromisoformat(coord_data["last_success"])
-            if datetime.now() - last_success > timedelta(hours=24):
-                return False
-            
-            # 检查成功次数（至少成功过1次）
-            if coord_data.get("success_count", 0) < 1:
-                return False
-            
-            # 检查坐标范围（简单的屏幕边界检查）
-            x, y = coord_data["screen_x"], coord_data["screen_y"]
-            if x < 0 or y < 0 or x > 3840 or y > 2160:  # 支持4K屏幕
-                return False
-            
-            return True
-        except Exception:
-            return False
+        """检查坐标是否仍有效（保留规则见coordinate_policy）"""
+        return self.policy.is_fresh(coord_data)
     
     def clear_expired_coordinates(self) -> int:
-        """清理过期的坐标缓存"""
+        """清理过期的坐标缓存（包括布局坐标）"""
         try:
             expired_count = 0
-            current_time = datetime.now()
-            
-            # 创建新的坐标字典，只保留有效的坐标
-            new_coordinates = {}
-            for element_name, coord_data in self.cache_data["coordinates"].items():
-                if self._is_coordinate_valid(coord_data):
-                    new_coordinates[element_name] = coord_data
-                else:
-                    expired_count += 1
-            
-            self.cache_data["coordinates"] = new_coordinates
+            with self._lock:
+                for section in ("coordinates", "layout_coordinates"):
+                    entries = self.cache_data[section]
+                    mask = self.policy.fresh_mask(entries.values())
+                    if all(mask):
+                        continue
+                    self.cache_data[section] = {key: coord_data for (key, coord_data), keep
+                                                in zip(entries.items(), mask) if keep}
+                    expired_count += len(mask) - sum(mask)
             
             if expired_count > 0:
-                self._save_cache()
+                self._dirty = True
+                self.flush()
                 print(f"[坐标缓存] 已清理 {expired_count} 个过期坐标")
             
             return expired_count
@@ -167,15 +296,19 @@ class CoordinateCache:
         """获取缓存统计信息"""
         try:
             total_coordinates = len(self.cache_data["coordinates"])
-            valid_coordinates = sum(1 for coord_data in self.cache_data["coordinates"].values() 
-                                  if self._is_coordinate_valid(coord_data))
+            valid_coordinates = sum(self.policy.fresh_mask(self.cache_data["coordinates"].values()))
             
             return {
                 "total_coordinates": total_coordinates,
                 "valid_coordinates": valid_coordinates,
+                "layout_coordinates": len(self.cache_data["layout_coordinates"]),
                 "expired_coordinates": total_coordinates - valid_coordinates,
                 "cache_file_size": os.path.getsize(self.cache_file) if os.path.exists(self.cache_file) else 0,
-                "last_updated": self.cache_data.get("last_updated", "未知")
+                "last_updated": self.cache_data.get("last_updated", "未知"),
+                "pending_write": self._dirty,
+                "coordinate_updates": self.write_stats["updates"],
+                "unchanged_saves": self.write_stats["unchanged"],
+                "disk_writes": self.write_stats["flushes"]
             }
         except Exception as e:
             print(f"获取缓存统计失败: {e}")
@@ -184,8 +317,10 @@ class CoordinateCache:
     def reset_cache(self) -> bool:
         """重置缓存（清空所有坐标）"""
         try:
-            self.cache_data = self._get_default_cache_structure()
-            success = self._save_cache()
+            with self._lock:
+                self.cache_data = self._get_default_cache_structure()
+                self._dirty = True
+                success = self.flush()
             if success:
                 print("[坐标缓存] 缓存已重置")
             return success
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+坐标有效性策略
+
+CoordinateCache（坐标保留/过期清理）和 RetryManager（重试时能否使用缓存坐标）共用的判断规则，
+全部来自 retry_config.json：
+- 使用规则: coordinate_validation 中的 max_coordinate_age_minutes / min_success_count / enable_validation
+- 保留规则: retry_settings.cache_expiry_hours，至少成功过1次
+- 屏幕边界: screen_bounds_check 开启时使用实际显示器（多显示器为虚拟屏幕）范围
+
+配置只在 configure() 时解析一次，时间比较使用 epoch 秒（坐标记录的 last_success_ts），
+旧记录的 last_success_ts 由 CoordinateCache 加载时补全，这里不修改传入的记录
+"""
+
+import os
+import sys
+import json
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_SCREEN_BOUNDS = (0, 0, 3840, 2160)  # 无法检测显示器时按4K屏幕处理
+
+
+def detect_screen_bounds() -> Tuple[int, int, int, int]:
+    """检测所有显示器组成的屏幕范围 (left, top, right, bottom)"""
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            metrics = ctypes.windll.user32.GetSystemMetrics
+            # SM_XVIRTUALSCREEN / SM_YVIRTUALSCREEN / SM_CXVIRTUALSCREEN / SM_CYVIRTUALSCREEN
+            left, top, width, height = metrics(76), metrics(77), metrics(78), metrics(79)
+            if width > 0 and height > 0:
+                return (left, top, left + width, top + height)
+        except Exception as e:
+            print(f"获取虚拟屏幕范围失败: {e}")
+    try:
+        import pyautogui
+        width, height = pyautogui.size()
+        if width > 0 and height > 0:
+            return (0, 0, width, height)
+    except Exception:
+        pass
+    return DEFAULT_SCREEN_BOUNDS
+
+
+def coordinate_timestamp(coord_data: Dict) -> Optional[float]:
+    """坐标记录最后成功时间的 epoch 秒；旧记录只有 last_success 字符串时解析该字符串（不修改记录）"""
+    timestamp = coord_data.get("last_success_ts")
+    if timestamp is not None:
+        return timestamp
+    last_success = coord_data.get("last_success")
+    if not last_success:
+        return None
+    try:
+        timestamp = datetime.fromisoformat(last_success).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return timestamp
+
+
+class CoordinateValidityPolicy:
+    """坐标有效性策略"""
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.configure(config or {})
+
+    def configure(self, config: Dict) -> None:
+        """按重试配置重新生成检查规则"""
+        settings = config.get("retry_settings", {})
+        validation = config.get("coordinate_validation", {})
+        self.enabled = validation.get("enable_validation", True)
+        self.bounds = detect_screen_bounds() if validation.get("screen_bounds_check", True) else None
+        self.max_use_age = validation.get("max_coordinate_age_minutes", 60) * 60
+        self.min_use_success = validation.get("min_success_count", 2)
+        self.max_retention_age = settings.get("cache_expiry_hours", 24) * 3600
+        self._use_check = self._compile(self.max_use_age, self.min_use_success)
+        self._retention_check = self._compile(self.max_retention_age, 1)
+
+    def _compile(self, max_age: float, min_success: int):
+        """生成检查函数，阈值和边界绑定为局部变量"""
+        bounds = self.bounds
+
+        def check(coord_data: Dict, now: float) -> bool:
+            if coord_data.get("success_count", 0) < min_success:
+                return False
+            timestamp = coordinate_timestamp(coord_data)
+            if timestamp is None or now - timestamp > max_age:
+                return False
+            if bounds is not None and "screen_x" in coord_data:
+                x, y = coord_data["screen_x"], coord_data.get("screen_y", 0)
+                if x < bounds[0] or y < bounds[1] or x > bounds[2] or y > bounds[3]:
+                    return False
+            return True
+
+        return check
+
+    def is_usable(self, coord_data: Dict, now: Optional[float] = None) -> bool:
+        """重试时能否使用该坐标"""
+        if not self.enabled:
+            return True
+        try:
+            return self._use_check(coord_data, time.time() if now is None else now)
+        except Exception as e:
+            print(f"坐标验证失败: {e}")
+            return False
+
+    def is_fresh(self, coord_data: Dict, now: Optional[float] = None) -> bool:
+        """坐标是否仍应保留在缓存中"""
+        try:
+            return self._retention_check(coord_data, time.time() if now is None else now)
+        except Exception:
+            return False
+
+    def _mask(self, check, coords: Iterable[Dict], now: Optional[float]) -> List[bool]:
+        """批量检查：同一个当前时间，逐条调用已生成的检查函数"""
+        now = time.time() if now is None else now
+        mask = []
+        append = mask.append
+        for coord_data in coords:
+            try:
+                append(check(coord_data, now))
+            except Exception:
+                append(False)
+        return mask
+
+    def usable_mask(self, coords: Iterable[Dict], now: Optional[float] = None) -> List[bool]:
+        """批量判断能否使用"""
+        if not self.enabled:
+            return [True for _ in coords]
+        return self._mask(self._use_check, coords, now)
+
+    def fresh_mask(self, coords: Iterable[Dict], now: Optional[float] = None) -> List[bool]:
+        """批量判断是否保留"""
+        return self._mask(self._retention_check, coords, now)
+
+
+_coordinate_policy = None
+
+
+def get_coordinate_policy(config_file: str = "retry_config.json") -> CoordinateValidityPolicy:
+    """获取全局坐标有效性策略（首次调用时从重试配置文件加载，RetryManager 加载配置后会重新 configure）"""
+    global _coordinate_policy
+    if _coordinate_policy is None:
+        config = {}
+        try:
+            if os.path.exists(config_file):
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+        except Exception as e:
+            print(f"加载坐标有效性配置失败: {e}")
+        _coordinate_policy = CoordinateValidityPolicy(config)
+    return _coordinate_policy
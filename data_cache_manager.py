@@ -5,63 +5,360 @@
 
 实现统一的数据缓存，剪贴板监听器有写入权限，导出模块只有读取权限
 确保数据关联的原子性和一致性
+
+持久化由可插拔的存储后端完成（见 cache_storage.py），通过 cache_config.json 选择：
+- json（默认）：JSON快照 + 追加日志，每次写入只追加一行
+- sqlite：SQLite数据库（WAL模式），适合数千订单以上的店铺
+
+读取路径：内存数据按"写时复制"维护（写入总是替换整条记录而不是原地修改），
+读取方直接拿到按代数缓存的快照；只有当存储被其他进程修改时才同步，
+并且只合并其他进程新写入的订单，快照被整体重写时才完整重新加载
+
+多进程：多个采集实例可以共用同一工作目录下的缓存，进程间锁和增量变更读取见 cache_storage.py
+
+延迟刷盘模式（flush.deferred）：写入只修改内存并标记脏订单，由后台线程每隔
+interval_ms 毫秒或累计 max_pending 条变更时批量持久化；停止采集、导出前和
+解释器退出时显式调用 flush()，采集主循环不会因磁盘IO阻塞
+
+字段级合并：每条订单记录带有版本号 version（每次修改递增）和
+field_versions（各字段最后一次被修改时的版本号）。upsert_fields 支持
+比较并交换：写入方携带读取时的版本号，只有它要写的字段在此之后被别人改过
+才会被拒绝，修改不同字段的写入方互不冲突
+
+并发：订单记录在按订单ID哈希划分的分段锁内构造，全局状态锁只在替换记录、
+维护索引和生成快照时短暂持有，不同订单的写入可以并发进行，磁盘IO在所有锁之外
+
+备份轮转（backup配置）：备份优先使用硬链接（JSON快照从不原地修改），当前快照与最新备份
+相同时不重复备份；超出保留数量或保留天数的旧备份自动删除。session.resume_last_session
+开启时启动不再清空缓存，中断的采集可以在上次的数据基础上继续
+
+导出：iter_orders 按过滤条件和字段投影逐条生成订单，导出时不再整体复制缓存
+
+迁移工具：python data_cache_manager.py --migrate json sqlite
 """
 
 import json
 import os
 import time
+import atexit
 import threading
+from contextlib import ExitStack
 from datetime import datetime
 from utils import *
+from cache_storage import (JsonCacheStorage, SqliteCacheStorage, CacheStats, create_storage, migrate_storage,
+                           shipping_info_digest)
+
+# 缓存记录中由缓存管理器维护的系统字段（导出时不输出）
+SYSTEM_FIELDS = frozenset({
+    "order_id", "created_at", "updated_at", "status", "shipping_info", "shipping_info_updated_at",
+    "potential_duplicates", "version", "field_versions"
+})
+
+
+def _get_default_cache_config():
+    """获取默认缓存配置"""
+    return {
+        "storage": {
+            "backend": "json",
+            "json_path": "order_data_cache.json",
+            "sqlite_path": "order_data_cache.db"
+        },
+        "journal": {
+            "enabled": True,
+            "fsync_batch": 20,
+            "fsync_interval_seconds": 1.0,
+            "compact_threshold": 500
+        },
+        "flush": {
+            "deferred": True,
+            "interval_ms": 500,
+            "max_pending": 50
+        },
+        "serialization": {
+            "format": "json",
+            "compression": None
+        },
+        "backup": {
+            "directory": "cache_backups",
+            "keep_count": 10,
+            "max_age_days": 7,
+            "hardlink": True
+        },
+        "session": {
+            "resume_last_session": False,
+            "backup_before_clear": True
+        }
+    }
+
+
+def load_cache_config(config_file="cache_config.json"):
+    """加载缓存配置，缺失的配置项使用默认值"""
+    config = _get_default_cache_config()
+    try:
+        if os.path.exists(config_file):
+            with open(config_file, 'r', encoding='utf-8') as f:
+                user_config = json.load(f)
+            for section, values in user_config.items():
+                if isinstance(values, dict) and isinstance(config.get(section), dict):
+                    config[section].update(values)
+                else:
+                    config[section] = values
+    except Exception as e:
+        print(f"加载缓存配置失败: {e}")
+    return config
+
 
 class DataCacheManager:
     """数据缓存管理器 - 实现权限分离的缓存机制"""
     
-    def __init__(self, cache_file_path="order_data_cache.json"):
-        """初始化数据缓存管理器"""
-        self.cache_file_path = cache_file_path
-        self.write_lock = threading.Lock()  # 写入锁，防止并发冲突
+    LOCK_STRIPES = 16  # 订单分段锁数量
+    
+    def __init__(self, cache_file_path="order_data_cache.json", use_journal=True,
+                 journal_fsync_batch=20, journal_fsync_interval=1.0, compact_threshold=500,
+                 storage=None, deferred_flush=False, flush_interval_ms=500, flush_max_pending=50,
+                 backup_dir=None, backup_keep_count=None, backup_max_age_days=None, backup_hardlink=False):
+        """初始化数据缓存管理器
+        
+        参数:
+        - storage: 存储后端实例；未提供时使用JSON后端，journal相关参数传给JsonCacheStorage
+        - deferred_flush: 是否启用延迟刷盘（后台线程批量持久化）
+        - flush_interval_ms: 延迟刷盘的最长间隔（毫秒）
+        - flush_max_pending: 脏订单累计到该数量时立即唤醒刷盘线程
+        - backup_dir: 备份目录；为None时备份保存在缓存文件旁边
+        - backup_keep_count: 最多保留的备份数量（None表示不限）
+        - backup_max_age_days: 备份最长保留天数（None表示不限，最新的备份总会保留）
+        - backup_hardlink: 是否优先使用硬链接备份
+        """
+        if storage is None:
+            storage = JsonCacheStorage(cache_file_path, use_journal=use_journal,
+                                       journal_fsync_batch=journal_fsync_batch,
+                                       journal_fsync_interval=journal_fsync_interval,
+                                       compact_threshold=compact_threshold)
+        self.storage = storage
+        self.cache_file_path = storage.path
+        # 分段锁：按订单ID哈希分段，不同订单的合并可以并发进行，同一订单的写入串行化
+        self._stripe_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        # 状态锁：只在替换记录、维护索引/脏集合/代数和生成快照时短暂持有
+        self._state_lock = threading.Lock()
+        # 存储锁：所有存储后端访问都在此锁内进行
+        # 加锁顺序固定为 存储锁 -> 分段锁（按下标顺序）-> 状态锁
+        self._storage_lock = threading.Lock()
         self.cache_data = {}
-        self._load_cache()
+        self._dirty = set()  # 已修改但尚未持久化的订单ID
+        self._shipping_index = {}  # 收货信息摘要 -> 订单ID集合
+        self._generation = 0  # 内存数据代数，每次变更递增
+        self._snapshot = None  # (代数, 快照字典)
+        self._stats = CacheStats()  # 增量维护的订单统计
+        self.reload_stats = {"reloads": 0, "incremental": 0, "skips": 0}  # 完整重新加载 / 增量同步 / 跳过次数
+        self.cas_stats = {"rejected": 0}  # 比较并交换被拒绝的写入次数
+        self._load_cache(repair_journal=True)
+        
+        self.backup_dir = backup_dir
+        self.backup_keep_count = backup_keep_count
+        self.backup_max_age_days = backup_max_age_days
+        self.backup_hardlink = backup_hardlink
+        
+        self.deferred_flush = deferred_flush
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.flush_max_pending = flush_max_pending
+        self._flush_event = threading.Event()
+        self._flusher_stop = threading.Event()
+        self._flusher_thread = None
+        if deferred_flush:
+            self._flusher_thread = threading.Thread(target=self._flusher_loop, daemon=True)
+            self._flusher_thread.start()
+            atexit.register(self.stop_flusher)
     
-    def _load_cache(self):
-        """加载缓存文件"""
-        try:
-            if os.path.exists(self.cache_file_path):
-                with open(self.cache_file_path, 'r', encoding='utf-8') as f:
-                    self.cache_data = json.load(f)
-                    if not isinstance(self.cache_data, dict):
-                        self.cache_data = {}
+    def _load_cache(self, repair_journal=False):
+        """从存储后端加载全部数据（尚未持久化的本地修改会保留）"""
+        loaded = self.storage.load(repair_journal)
+        # 快照头部带有统计时直接使用，否则（旧格式快照、SQLite后端）扫描一次
+        stats = self.storage.loaded_stats or CacheStats.from_orders(loaded)
+        for order_id in self._dirty:
+            if order_id in self.cache_data:
+                stats.remove(loaded.get(order_id))
+                stats.add(self.cache_data[order_id])
+                loaded[order_id] = self.cache_data[order_id]
+        self.cache_data = loaded
+        self._stats = stats
+        self._rebuild_shipping_index()
+        self._generation += 1
+    
+    def _apply_external_changes(self, changes):
+        """合并其他进程写入的订单（调用方需持有全部分段锁和状态锁；本地尚未持久化的修改优先）"""
+        for order_id, record in changes.items():
+            if order_id in self._dirty:
+                continue
+            previous = self.cache_data.get(order_id)
+            if previous is not None:
+                self._unindex_shipping_info(order_id, previous.get("shipping_info"))
+            self._index_shipping_info(order_id, record.get("shipping_info"))
+            self._stats.remove(previous)
+            self._stats.add(record)
+            self.cache_data[order_id] = record
+        if changes:
+            self._generation += 1
+    
+    def _stripe_lock(self, order_id):
+        """获取订单所在分段的锁"""
+        return self._stripe_locks[hash(order_id) % len(self._stripe_locks)]
+    
+    def _lock_all(self, stack):
+        """按固定顺序获取全部分段锁和状态锁（整体替换内存数据时使用）"""
+        for lock in self._stripe_locks:
+            stack.enter_context(lock)
+        stack.enter_context(self._state_lock)
+    
+    def _reload_if_changed(self):
+        """仅当存储被其他进程修改时才同步（调用方需持有存储锁）"""
+        if not self.storage.has_external_changes():
+            self.reload_stats["skips"] += 1
+            return
+        changes = self.storage.poll_changes()
+        with ExitStack() as stack:
+            self._lock_all(stack)
+            if changes is None:
+                self.reload_stats["reloads"] += 1
+                self._load_cache()
             else:
-                self.cache_data = {}
-        except Exception as e:
-            print(f"加载缓存文件失败: {str(e)}")
-            self.cache_data = {}
+                self.reload_stats["incremental"] += 1
+                self._apply_external_changes(changes)
     
-    def _save_cache(self):
-        """保存缓存到文件（原子性写入）"""
-        try:
-            # 使用临时文件确保原子性写入
-            temp_file = self.cache_file_path + ".tmp"
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache_data, f, ensure_ascii=False, indent=2)
-            
-            # 原子性替换
-            if os.path.exists(self.cache_file_path):
-                os.remove(self.cache_file_path)
-            os.rename(temp_file, self.cache_file_path)
-            return True
-        except Exception as e:
-            print(f"保存缓存文件失败: {str(e)}")
-            return False
+    def _get_snapshot(self):
+        """获取当前代数的只读快照（同一代数内多次读取共享同一个快照）"""
+        with self._storage_lock:
+            self._reload_if_changed()
+            with self._state_lock:
+                if self._snapshot is None or self._snapshot[0] != self._generation:
+                    # 记录本身采用写时复制，浅拷贝即可与后续写入隔离
+                    self._snapshot = (self._generation, dict(self.cache_data))
+                return self._snapshot[1]
+    
+    def _rebuild_shipping_index(self):
+        """根据当前内存数据重建收货信息索引"""
+        self._shipping_index = {}
+        for order_id, data in self.cache_data.items():
+            self._index_shipping_info(order_id, data.get("shipping_info"))
+    
+    def _index_shipping_info(self, order_id, shipping_info):
+        """将订单加入收货信息索引"""
+        digest = shipping_info_digest(shipping_info)
+        if digest:
+            self._shipping_index.setdefault(digest, set()).add(order_id)
+    
+    def _unindex_shipping_info(self, order_id, shipping_info):
+        """将订单从收货信息索引中移除"""
+        digest = shipping_info_digest(shipping_info)
+        if digest and digest in self._shipping_index:
+            self._shipping_index[digest].discard(order_id)
+            if not self._shipping_index[digest]:
+                del self._shipping_index[digest]
+    
+    def find_duplicate_orders(self, shipping_info, exclude_order_id=None):
+        """查找收货信息相同的所有订单ID（O(1)索引查找）"""
+        digest = shipping_info_digest(shipping_info)
+        if not digest:
+            return []
+        order_ids = self._shipping_index.get(digest, ())
+        return sorted(oid for oid in order_ids if oid != exclude_order_id)
+    
+    def _flush_locked(self):
+        """持久化所有脏订单（调用方需持有存储锁；磁盘IO在状态锁之外进行）"""
+        with self._state_lock:
+            if not self._dirty:
+                return True
+            # 记录本身是写时复制的，这里只需取引用
+            records = {order_id: self.cache_data[order_id] for order_id in self._dirty if order_id in self.cache_data}
+            # 只有非日志后端或本次写入将触发压缩时才复制全部订单，普通刷盘为O(脏订单数)
+            all_orders = dict(self.cache_data) if self.storage.needs_full_snapshot(len(records)) else None
+            self._dirty = set()
+        
+        success = self.storage.put_many(records, all_orders)
+        
+        if not success:
+            # 持久化失败时重新标记为脏，等待下次重试
+            with self._state_lock:
+                self._dirty.update(records)
+        return success
+    
+    def flush(self):
+        """立即持久化所有尚未写入存储的修改"""
+        with self._storage_lock:
+            return self._flush_locked()
+    
+    def _flusher_loop(self):
+        """后台刷盘线程：每隔flush_interval或脏订单达到阈值时批量持久化"""
+        while not self._flusher_stop.is_set():
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            if self._dirty:
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"后台刷盘失败: {str(e)}")
+    
+    def stop_flusher(self):
+        """停止后台刷盘线程并持久化剩余修改（解释器退出时自动调用）"""
+        if self._flusher_thread is not None:
+            self._flusher_stop.set()
+            self._flush_event.set()
+            self._flusher_thread.join(2.0)
+            self._flusher_thread = None
+        return self.flush()
     
     def write_order_data(self, order_id, order_data=None, shipping_info=None):
         """写入订单数据（剪贴板监听器专用 - 写入权限）"""
-        with self.write_lock:
-            clean_order_id = self._clean_order_id(order_id)
-            if not clean_order_id or clean_order_id == "" or len(clean_order_id.strip()) == 0:
-                print(f"[缓存拒绝] 无效订单ID: '{order_id}' -> '{clean_order_id}'")
-                return False
+        success, _ = self._merge_order(order_id, order_data, shipping_info)
+        return success
+    
+    def upsert_fields(self, order_id, fields, expected_version=None):
+        """字段级合并写入，支持比较并交换
+        
+        参数:
+        - fields: 要写入的字段字典，shipping_info字段按收货信息处理（维护重复索引）
+        - expected_version: 写入方读取订单时的版本号；为None时无条件合并，
+          否则只要fields中任一字段在该版本之后被修改过就拒绝写入
+        
+        返回:
+        - (是否成功, 订单当前版本号)
+        """
+        fields = dict(fields)
+        shipping_info = fields.pop("shipping_info", None)
+        return self._merge_order(order_id, fields or None, shipping_info, expected_version)
+    
+    def get_order_version(self, order_id):
+        """获取订单当前版本号（订单不存在时为0）"""
+        data = self.cache_data.get(self._clean_order_id(order_id))
+        return data.get("version", 0) if data else 0
+    
+    def _merge_order(self, order_id, order_data=None, shipping_info=None, expected_version=None):
+        """合并订单字段到内存记录，返回 (是否成功, 当前版本号)
+        
+        记录的构造在订单分段锁内完成，状态锁只在查重、维护索引和替换记录时短暂持有，
+        不同订单的写入可以并发进行；持久化在所有锁之外进行
+        """
+        clean_order_id = self._clean_order_id(order_id)
+        if not clean_order_id or clean_order_id == "" or len(clean_order_id.strip()) == 0:
+            print(f"[缓存拒绝] 无效订单ID: '{order_id}' -> '{clean_order_id}'")
+            return False, 0
+        
+        with self._stripe_lock(clean_order_id):
+            current = self.cache_data.get(clean_order_id)
+            current_version = current.get("version", 0) if current else 0
+            touched_fields = [key for key in (order_data or {}) if key != "order_id"]
+            if shipping_info:
+                touched_fields.append("shipping_info")
+            
+            # 比较并交换：只检查本次要写的字段，不需要重新读取整条订单
+            if expected_version is not None and current:
+                field_versions = current.get("field_versions", {})
+                stale_fields = [f for f in touched_fields if field_versions.get(f, 0) > expected_version]
+                if stale_fields:
+                    with self._state_lock:
+                        self.cas_stats["rejected"] += 1
+                    print(f"[缓存拒绝] 订单 {clean_order_id} 的字段 {', '.join(stale_fields)} "
+                          f"已在版本 {expected_version} 之后被修改（当前版本 {current_version}）")
+                    return False, current_version
             
             # 验证订单编号一致性
             if order_data and '订单编号' in order_data:
@@ -71,90 +368,144 @@ class DataCacheManager:
                     # 修正订单编号字段
                     order_data['订单编号'] = clean_order_id
             
-            # 检查重复收货信息（先创建副本避免迭代时修改字典）
-            if shipping_info:
-                cache_items = list(self.cache_data.items())  # 创建副本
-                for existing_id, existing_data in cache_items:
-                    if (existing_id != clean_order_id and 
-                        existing_data.get('shipping_info') == shipping_info):
-                        print(f"[重复警告] 发现重复收货信息: {clean_order_id} 与 {existing_id}")
-                        # 标记为可能重复（稍后处理，避免在迭代中修改）
-                        potential_duplicate = existing_id
-                        break
-                else:
-                    potential_duplicate = None
-            
-            # 初始化订单记录
-            if clean_order_id not in self.cache_data:
-                self.cache_data[clean_order_id] = {
+            # 写时复制：在副本上修改后整条替换，已发出的快照不受影响
+            now = datetime.now().isoformat()
+            if current is not None:
+                record = dict(current)
+            else:
+                # 初始化订单记录
+                record = {
                     "order_id": clean_order_id,
-                    "created_at": datetime.now().isoformat(),
-                    "updated_at": datetime.now().isoformat(),
+                    "created_at": now,
+                    "updated_at": now,
                     "status": "partial"
                 }
-            
-            # 处理重复标记（在初始化后进行）
-            if shipping_info and 'potential_duplicate' in locals() and potential_duplicate:
-                self.cache_data[clean_order_id]['potential_duplicate'] = potential_duplicate
+            previous_shipping_info = record.get("shipping_info")
             
             # 更新订单基础数据
             if order_data:
                 for key, value in order_data.items():
                     if key != "order_id":  # 避免覆盖标准化的order_id
-                        self.cache_data[clean_order_id][key] = value
+                        record[key] = value
             
-            # 更新收货信息
+            # 更新收货信息（索引在状态锁内维护）
             if shipping_info:
-                self.cache_data[clean_order_id]["shipping_info"] = shipping_info
-                self.cache_data[clean_order_id]["shipping_info_updated_at"] = datetime.now().isoformat()
+                record["shipping_info"] = shipping_info
+                record["shipping_info_updated_at"] = now
             
             # 更新状态
-            self.cache_data[clean_order_id]["updated_at"] = datetime.now().isoformat()
+            record["updated_at"] = now
             if shipping_info and order_data:
-                self.cache_data[clean_order_id]["status"] = "completed"
+                record["status"] = "completed"
             
-            # 保存到文件
-            success = self._save_cache()
-            if success:
-                status = self.cache_data[clean_order_id].get('status', 'unknown')
-                print(f"[缓存写入] 订单ID: {clean_order_id}, 状态: {status}")
-            return success
+            # 更新版本号和字段版本
+            version = current_version + 1
+            record["version"] = version
+            field_versions = dict(record.get("field_versions", {}))
+            for field in touched_fields:
+                field_versions[field] = version
+            record["field_versions"] = field_versions
+            
+            with self._state_lock:
+                # 检查重复收货信息（通过摘要索引查找，无需扫描全部订单）
+                duplicate_ids = []
+                if shipping_info:
+                    duplicate_ids = self.find_duplicate_orders(shipping_info, exclude_order_id=clean_order_id)
+                    self._unindex_shipping_info(clean_order_id, previous_shipping_info)
+                    self._index_shipping_info(clean_order_id, shipping_info)
+                
+                # 处理重复标记（potential_duplicate保留第一个冲突订单以兼容旧数据）
+                if duplicate_ids:
+                    record['potential_duplicate'] = duplicate_ids[0]
+                    record['potential_duplicates'] = duplicate_ids
+                
+                self._stats.remove(self.cache_data.get(clean_order_id))
+                self._stats.add(record)
+                self.cache_data[clean_order_id] = record
+                self._generation += 1
+                self._dirty.add(clean_order_id)
+                pending = len(self._dirty)
+        
+        if duplicate_ids:
+            print(f"[重复警告] 发现重复收货信息: {clean_order_id} 与 {', '.join(duplicate_ids)}")
+        
+        if self.deferred_flush:
+            # 延迟刷盘：只唤醒后台线程，不在调用线程上做磁盘IO
+            if pending >= self.flush_max_pending:
+                self._flush_event.set()
+            success = True
+        else:
+            # 保存到文件（日志模式下只追加一行）
+            success = self.flush()
+        
+        if success:
+            print(f"[缓存写入] 订单ID: {clean_order_id}, 状态: {record.get('status', 'unknown')}, 版本: {version}")
+        return success, version
     
     def read_all_orders(self):
         """读取所有订单数据（导出模块专用 - 只读权限）"""
-        # 重新加载最新数据
-        self._load_cache()
-        return dict(self.cache_data)  # 返回副本，防止意外修改
+        # 仅在文件被外部修改时才重新解析，否则直接使用内存快照
+        return dict(self._get_snapshot())  # 返回副本，防止意外修改
     
     def read_order_by_id(self, order_id):
         """根据订单ID读取单个订单数据（只读权限）"""
         clean_order_id = self._clean_order_id(order_id)
-        if clean_order_id in self.cache_data:
-            return dict(self.cache_data[clean_order_id])  # 返回副本
+        data = self.cache_data.get(clean_order_id)
+        if data is not None:
+            return dict(data)  # 返回副本
         return None
     
+    def iter_orders(self, filter=None, fields=None, exclude_fields=None):
+        """流式遍历订单（导出专用 - 只读权限），逐条生成 (订单ID, 订单数据)
+        
+        参数:
+        - filter: 过滤函数，接收订单记录，返回True的订单才会输出
+        - fields: 只输出这些字段（投影）；为None时输出全部字段
+        - exclude_fields: 不输出的字段
+        
+        遍历的是当前代数的只读快照（同一代数内的读取共享一次浅拷贝），每次只生成一条订单的副本；
+        调用方若把结果全部收集起来，内存占用仍与订单数成正比
+        """
+        snapshot = self._get_snapshot()
+        fields = tuple(fields) if fields is not None else None
+        exclude_fields = frozenset(exclude_fields or ())
+        for order_id, data in snapshot.items():
+            if filter is not None and not filter(data):
+                continue
+            if fields is not None:
+                yield order_id, {key: data[key] for key in fields if key in data and key not in exclude_fields}
+            elif exclude_fields:
+                yield order_id, {key: value for key, value in data.items() if key not in exclude_fields}
+            else:
+                yield order_id, dict(data)  # 返回副本
+    
     def get_orders_with_shipping_info(self):
         """获取包含收货信息的订单（导出专用）"""
-        self._load_cache()
-        result = {}
-        for order_id, data in self.cache_data.items():
-            if "shipping_info" in data and data["shipping_info"]:
-                result[order_id] = dict(data)  # 返回副本
-        return result
+        return dict(self.iter_orders(filter=lambda data: data.get("shipping_info")))
     
     def get_cache_stats(self):
-        """获取缓存统计信息"""
-        self._load_cache()
-        total_orders = len(self.cache_data)
-        completed_orders = sum(1 for data in self.cache_data.values() if data.get("status") == "completed")
-        partial_orders = total_orders - completed_orders
+        """获取缓存统计信息（计数随写入增量维护，O(1)，可供界面轮询）"""
+        with self._storage_lock:
+            self._reload_if_changed()
+        with self._state_lock:
+            stats = self._stats
+            total_orders = stats.total
+            completed_orders = stats.completed
+            with_shipping = stats.with_shipping
+            potential_duplicates = stats.potential_duplicates
+            last_updated = stats.last_updated
         
         return {
             "total_orders": total_orders,
             "completed_orders": completed_orders,
-            "partial_orders": partial_orders,
+            "partial_orders": total_orders - completed_orders,
+            "orders_with_shipping_info": with_shipping,
+            "potential_duplicates": potential_duplicates,
             "cache_file": self.cache_file_path,
-            "last_updated": max([data.get("updated_at", "") for data in self.cache_data.values()], default="")
+            "last_updated": last_updated,
+            "reloads": self.reload_stats["reloads"],
+            "incremental_reloads": self.reload_stats["incremental"],
+            "reload_skips": self.reload_stats["skips"]
         }
     
     def _clean_order_id(self, order_id):
@@ -175,34 +526,152 @@ class DataCacheManager:
         
         return clean_id.strip() if clean_id.strip() else None
     
+    def get_cache_epoch(self):
+        """缓存清空代数：每次清空缓存都会变化（跨进程、跨重启保持），断点续采据此判断检查点之后缓存是否被清空"""
+        with self._storage_lock:
+            self._reload_if_changed()
+            return self.storage.epoch
+    
     def clear_cache(self):
         """清空缓存（谨慎使用）"""
-        with self.write_lock:
-            self.cache_data = {}
-            return self._save_cache()
+        with self._storage_lock:
+            with ExitStack() as stack:
+                self._lock_all(stack)
+                self.cache_data = {}
+                self._shipping_index = {}
+                self._stats = CacheStats()
+                self._dirty = set()
+                self._generation += 1
+            success = self.storage.clear()
+            return success
+    
+    def compact(self):
+        """手动压缩存储（JSON后端合并日志，SQLite后端执行WAL检查点）"""
+        with self._storage_lock:
+            self._flush_locked()
+            with self._state_lock:
+                all_orders = dict(self.cache_data) if self.storage.needs_full_snapshot() else None
+            return self.storage.compact(all_orders)
+    
+    def close(self):
+        """关闭缓存：持久化剩余修改、合并日志并释放文件句柄/数据库连接"""
+        self.stop_flusher()
+        with self._storage_lock:
+            with self._state_lock:
+                all_orders = dict(self.cache_data) if self.storage.needs_full_snapshot() else None
+            return self.storage.close(all_orders)
+    
+    def _backup_prefix(self):
+        """备份文件路径前缀（<备份目录>/<缓存文件名>.backup_）"""
+        backup_dir = self.backup_dir or os.path.dirname(self.cache_file_path)
+        return os.path.join(backup_dir, os.path.basename(self.cache_file_path) + ".backup_")
+    
+    def list_backups(self):
+        """列出现有备份文件（按修改时间从旧到新排序）"""
+        prefix = self._backup_prefix()
+        backup_dir = os.path.dirname(prefix) or "."
+        if not os.path.isdir(backup_dir):
+            return []
+        name_prefix = os.path.basename(prefix)
+        backups = [os.path.join(os.path.dirname(prefix), name) for name in os.listdir(backup_dir)
+                   if name.startswith(name_prefix)]
+        return sorted(backups, key=os.path.getmtime)
     
     def backup_cache(self, backup_suffix=None):
-        """备份缓存文件"""
+        """备份缓存文件，并按保留策略轮转旧备份"""
         if not backup_suffix:
             backup_suffix = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        backup_file = f"{self.cache_file_path}.backup_{backup_suffix}"
+        backup_file = self._backup_prefix() + backup_suffix
         try:
-            if os.path.exists(self.cache_file_path):
-                import shutil
-                shutil.copy2(self.cache_file_path, backup_file)
+            if os.path.dirname(backup_file):
+                os.makedirs(os.path.dirname(backup_file), exist_ok=True)
+            with self._storage_lock:
+                self._flush_locked()
+                with self._state_lock:
+                    all_orders = dict(self.cache_data) if self.storage.needs_full_snapshot() else None
+                backups = self.list_backups()
+                if self.backup_hardlink and not self.storage.has_pending_journal() and backups and \
+                        os.path.exists(self.cache_file_path) and os.path.samefile(backups[-1], self.cache_file_path):
+                    # 快照自上次备份以来没有变化，最新备份就是当前数据
+                    print(f"缓存未变化，沿用最新备份: {backups[-1]}")
+                    return backups[-1]
+                success = self.storage.backup(backup_file, all_orders, hardlink=self.backup_hardlink)
+            if success:
                 print(f"缓存已备份到: {backup_file}")
+                self.rotate_backups()
                 return backup_file
         except Exception as e:
             print(f"备份缓存失败: {str(e)}")
         return None
+    
+    def rotate_backups(self):
+        """按数量和天数删除过期备份（最新的备份总会保留），返回删除的文件列表"""
+        backups = self.list_backups()
+        removed = []
+        now = time.time()
+        for index, backup_file in enumerate(backups[:-1]):
+            newer_count = len(backups) - index - 1
+            too_many = self.backup_keep_count is not None and newer_count >= self.backup_keep_count
+            too_old = (self.backup_max_age_days is not None and
+                       now - os.path.getmtime(backup_file) > self.backup_max_age_days * 86400)
+            if too_many or too_old:
+                try:
+                    os.remove(backup_file)
+                    removed.append(backup_file)
+                except OSError as e:
+                    print(f"删除过期备份失败: {backup_file}, {str(e)}")
+        if removed:
+            print(f"已删除 {len(removed)} 个过期缓存备份")
+        return removed
 
 # 全局缓存管理器实例
 _cache_manager = None
 
 def get_cache_manager():
-    """获取全局缓存管理器实例"""
+    """获取全局缓存管理器实例（存储后端由cache_config.json决定）"""
     global _cache_manager
     if _cache_manager is None:
-        _cache_manager = DataCacheManager()
-    return _cache_manager
\ No newline at end of file
+        config = load_cache_config()
+        flush_config = config.get("flush", {})
+        backup_config = config.get("backup", {})
+        _cache_manager = DataCacheManager(
+            storage=create_storage(config),
+            deferred_flush=flush_config.get("deferred", True),
+            flush_interval_ms=flush_config.get("interval_ms", 500),
+            flush_max_pending=flush_config.get("max_pending", 50),
+            backup_dir=backup_config.get("directory"),
+            backup_keep_count=backup_config.get("keep_count"),
+            backup_max_age_days=backup_config.get("max_age_days"),
+            backup_hardlink=backup_config.get("hardlink", True)
+        )
+    return _cache_manager
+
+
+def migrate_cache(source_backend, target_backend, config_file="cache_config.json"):
+    """在JSON和SQLite后端之间一次性迁移订单缓存，返回迁移的订单数量"""
+    config = load_cache_config(config_file)
+    source_config = dict(config, storage=dict(config["storage"], backend=source_backend))
+    target_config = dict(config, storage=dict(config["storage"], backend=target_backend))
+    source = create_storage(source_config)
+    target = create_storage(target_config)
+    try:
+        count = migrate_storage(source, target)
+        print(f"已将 {count} 个订单从 {source_backend} 迁移到 {target_backend}")
+        return count
+    finally:
+        source.close()
+        target.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="订单数据缓存工具")
+    parser.add_argument("--migrate", nargs=2, metavar=("SOURCE", "TARGET"),
+                        choices=["json", "sqlite"], help="在存储后端之间迁移数据，例如: --migrate json sqlite")
+    parser.add_argument("--config", default="cache_config.json", help="缓存配置文件路径")
+    args = parser.parse_args()
+    if args.migrate:
+        migrate_cache(args.migrate[0], args.migrate[1], args.config)
+    else:
+        parser.print_help()
\ No newline at end of file
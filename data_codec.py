@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据文件编解码
+
+为订单缓存快照（order_data_cache.json）和剪贴板映射（clipboard_mappings.json）
+提供紧凑的磁盘格式：
+- 序列化格式: json-pretty（旧格式，indent=2）/ json（无缩进，orjson可用时自动使用）/ msgpack（需安装msgpack）
+- 压缩方式: 无 / gzip / zstd（需安装zstandard）
+
+读取时根据文件内容自动识别格式和压缩方式，新旧格式可以透明读取
+"""
+
+import os
+import json
+import gzip
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+SUPPORTED_FORMATS = ("json-pretty", "json", "msgpack")
+SUPPORTED_COMPRESSIONS = (None, "gzip", "zstd")
+
+
+def resolve_format(fmt, compression):
+    """根据已安装的可选依赖确定实际使用的格式和压缩方式"""
+    if fmt not in SUPPORTED_FORMATS:
+        print(f"未知的序列化格式 '{fmt}'，使用json")
+        fmt = "json"
+    if fmt == "msgpack" and msgpack is None:
+        print("未安装msgpack，序列化格式回退为json")
+        fmt = "json"
+    if compression not in SUPPORTED_COMPRESSIONS:
+        print(f"未知的压缩方式 '{compression}'，不压缩")
+        compression = None
+    if compression == "zstd" and zstandard is None:
+        print("未安装zstandard，压缩方式回退为gzip")
+        compression = "gzip"
+    return fmt, compression
+
+
+def encode_data(data, fmt="json", compression=None):
+    """把数据编码为字节串"""
+    fmt, compression = resolve_format(fmt, compression)
+    if fmt == "json-pretty":
+        raw = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    elif fmt == "msgpack":
+        raw = msgpack.packb(data, use_bin_type=True)
+    elif orjson is not None:
+        raw = orjson.dumps(data)
+    else:
+        raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    if compression == "gzip":
+        # 压缩等级1：速度优先，压缩率已足够
+        return gzip.compress(raw, compresslevel=1)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(raw)
+    return raw
+
+
+def decode_data(raw):
+    """自动识别压缩方式和序列化格式并解码"""
+    if raw.startswith(GZIP_MAGIC):
+        raw = gzip.decompress(raw)
+    elif raw.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ValueError("文件使用zstd压缩，但未安装zstandard")
+        raw = zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+
+    stripped = raw.lstrip(b" \t\r\n\xef\xbb\xbf")
+    if not stripped:
+        raise ValueError("文件内容为空")
+    if stripped[:1] in (b"{", b"["):
+        if orjson is not None:
+            return orjson.loads(stripped)
+        return json.loads(stripped.decode('utf-8'))
+    if msgpack is None:
+        raise ValueError("文件为msgpack格式，但未安装msgpack")
+    return msgpack.unpackb(raw, raw=False)
+
+
+def read_data_file(path):
+    """读取任意支持格式的数据文件"""
+    with open(path, 'rb') as f:
+        return decode_data(f.read())
+
+
+def write_data_file(path, data, fmt="json", compression=None):
+    """原子性写入数据文件（临时文件 + fsync + os.replace）"""
+    payload = encode_data(data, fmt, compression)
+    temp_file = path + ".tmp"
+    with open(temp_file, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, path)
+    return len(payload)
+
+
+def write_json_array(f, items, indent=2):
+    """把可迭代对象逐条写成JSON数组（输出与 json.dump(list(items), f, ensure_ascii=False, indent=indent) 相同），
+    不需要先把全部元素放进列表"""
+    padding = " " * indent
+    first = True
+    for item in items:
+        f.write("[\n" if first else ",\n")
+        first = False
+        text = json.dumps(item, ensure_ascii=False, indent=indent)
+        f.write(padding + text.replace("\n", "\n" + padding))
+    f.write("[]" if first else "\n]")
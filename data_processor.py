@@ -8,7 +8,12 @@
 
 from utils import *
 from coordinate_cache import CoordinateCache
-from data_cache_manager import get_cache_manager
+from data_cache_manager import get_cache_manager, SYSTEM_FIELDS
+from run_checkpoint import RunCheckpoint
+from page_waits import wait_dom_quiet, wait_element_ready
+from order_pipeline import OrderPipeline
+from operation_plan import compile_operation_plan
+from data_codec import write_json_array
 
 class DataProcessor:
     """数据处理和导出相关"""
@@ -17,15 +22,45 @@ class DataProcessor:
         """初始化数据处理器"""
         self.coordinate_cache = CoordinateCache()
         self.cache_manager = get_cache_manager()  # 获取数据缓存管理器
+        self.run_checkpoint = RunCheckpoint()  # 采集进度检查点
+        self._resume_state = None  # 断点续采时加载的检查点
+        self._last_layout = None  # 最近一次正常点击时的页面布局（视口、DPR、布局签名），布局坐标查找据此生成键
+        self._page_text_cache = {}  # 当前页批量预取的getText文本 {槽位: {元素名称: 文本}}
+        self.order_pipeline = OrderPipeline()  # 模块化翻页循环的订单流水线
+        self._clipboard_wait_job = None  # 本次剪贴板等待期间在后台执行的任务
+        self._operation_plan = None  # 编译后的操作执行计划，偏移量配置保存后失效
 
-    def run_actions_loop(self, manual_order_count=None):
-        """主循环入口 - 支持模块化翻页"""
+    def run_actions_loop(self, manual_order_count=None, resume=False):
+        """主循环入口 - 支持模块化翻页
+        
+        resume为True时从检查点继续：跳到检查点记录的页码和订单序号，
+        并跳过数据缓存中已有收货信息的订单
+        """
         if not self.driver:
             self._log_info('循环模式错误: 浏览器未连接。', 'red')
             return
             
         # 同步UI状态到实例属性
         self._sync_ui_modular_paging_state()
+        
+        self._resume_state = None
+        if resume:
+            checkpoint = self.run_checkpoint.resume()
+            if checkpoint is None:
+                self._log_info('没有可以恢复的采集检查点，请点击"开始"重新采集', 'orange')
+                self._stop_collection()
+                return
+            if not self._checkpoint_matches_cache(checkpoint):
+                self.run_checkpoint.clear()
+                self._stop_collection()
+                return
+            self._resume_state = checkpoint
+            if manual_order_count is None:
+                manual_order_count = checkpoint.get("total_orders")
+            # 按检查点记录的循环模式继续，保证页码和订单序号含义一致
+            self.use_modular_paging = checkpoint.get("mode") == "modular"
+            self._log_info(f"从检查点恢复采集: 第{checkpoint.get('page', 1)}页第{checkpoint.get('order_index', 0) + 1}个订单，"
+                           f"已处理 {len(checkpoint.get('processed_order_ids', []))} 个订单", "green")
             
         # 检查是否启用模块化翻页
         if hasattr(self, 'use_modular_paging') and self.use_modular_paging:
@@ -33,6 +68,31 @@ class DataProcessor:
         else:
             return self._run_original_loop(manual_order_count)
     
+    def _checkpoint_matches_cache(self, checkpoint):
+        """检查点记录的已处理订单是否仍在数据缓存中（缓存在检查点之后被清空过则不能续采，否则这些订单会被跳过而丢失）"""
+        if "cache_epoch" in checkpoint:
+            matches = checkpoint["cache_epoch"] == self.cache_manager.get_cache_epoch()
+        else:
+            # 旧版检查点没有记录清空代数，逐个确认已处理订单仍在缓存中
+            matches = all(self.cache_manager.read_order_by_id(order_id) is not None
+                          for order_id in checkpoint.get("processed_order_ids", []))
+        if not matches:
+            self._log_info('数据缓存在检查点之后已被清空，已处理的订单不在缓存中，无法断点续采；'
+                           '检查点已删除，请点击"开始"重新采集', 'red')
+        return matches
+    
+    def _should_skip_collected_order(self, order_data):
+        """断点续采时判断订单是否已经采集过（检查点已记录，或数据缓存中已有收货信息）"""
+        if not self._resume_state:
+            return False
+        order_id = order_data.get('订单编号')
+        if not order_id or not isinstance(order_id, str):
+            return False
+        if self.run_checkpoint.is_processed(order_id):
+            return True
+        cached = self.cache_manager.read_order_by_id(order_id)
+        return bool(cached and cached.get("shipping_info"))
+    
     def _run_original_loop(self, manual_order_count=None):
         """原有的循环逻辑（保持不变）"""
         if not self.driver:
@@ -103,10 +163,11 @@ class DataProcessor:
             return
             
         first_action_xpath = actions_to_loop[0]['xpath']
-        xpath_pattern = None
+        # 断点续采时直接使用检查点中学习到的XPath模式
+        xpath_pattern = self._resume_state.get("xpath_pattern") if self._resume_state else None
         
         # 尝试使用参照点学习XPath模式
-        if hasattr(self, 'ref2_xpath') and self.ref2_xpath:
+        if not xpath_pattern and hasattr(self, 'ref2_xpath') and self.ref2_xpath:
             xpath_pattern = self._learn_xpath_pattern(first_action_xpath, self.ref2_xpath)
             if not xpath_pattern:
                 self._log_info('无法从参照XPath中学习到规律，将回退到基本模式。', 'orange')
@@ -125,20 +186,28 @@ class DataProcessor:
                 self._log_info('循环模式错误: 无法在第一个操作的XPath中找到列表索引（如 [1], [2]）。无法继续循环。', 'red')
                 return
                 
-        # 设置进度条最大值
-        self.progress_bar["maximum"] = num_items
-        self.progress_bar["value"] = 0
-        self.progress_label.config(text=f"0/{num_items}")
+        # 设置进度条最大值（界面线程执行）
+        self.run_control.post(self._show_progress, f"0/{num_items}", 0, num_items)
         self._log_info(f"设置进度条最大值为: {num_items}", "blue")
         
-        self.collected_data = []
         processed_order_ids = set()  # 用于检测重复订单
+        self._page_text_cache = {}
         consecutive_same_order = 0   # 连续重复订单计数
+        start_index = 1
+        if self._resume_state:
+            start_index = self._resume_state.get("order_index", 0) + 1
+            self._log_info(f"[断点续采] 跳过前 {start_index - 1} 个已处理订单", "blue")
+        else:
+            self.collected_data = []
+            self.run_checkpoint.start("original", num_items, xpath_pattern=xpath_pattern,
+                                      cache_epoch=self.cache_manager.get_cache_epoch())
+        last_index = start_index - 1
         
-        for i in range(1, num_items+1):
+        for i in range(start_index, num_items+1):
             if not self.is_running:
                 break
             
+            retry_started_at = None  # 本次为重试时记录开始时间，用于统计重试结果和耗时
             # 检查重试标志 - 阶段3增强：配置化重试机制
             if hasattr(self, 'retry_current_order') and self.retry_current_order:
                 # 使用重试管理器检查是否应该重试
@@ -156,100 +225,68 @@ class DataProcessor:
                     log_entry = create_retry_log_entry("retry_start", f"order_{i}", {"attempt": self.retry_manager.retry_attempts.get(f"order_processing_{i}", 0) + 1})
                     write_retry_log(log_entry)
                 
-                # 阶段3修复：重试前检查暂停状态，确保协调工作
-                if hasattr(self, 'is_paused') and self.is_paused:
-                    self._log_info("[重试] 检测到暂停状态，等待恢复后重试", "orange")
-                    # 等待暂停状态解除
-                    while hasattr(self, 'is_paused') and self.is_paused and self.is_running:
-                        time.sleep(0.1)  # 更频繁检查以提高响应性
-                        self.root.update()
-                    if not self.is_running:
-                        break
-                    self._log_info("[重试] 暂停状态已解除，准备重试", "green")
-                
-                # 阶段3修复：重试前检查验证码状态
-                if hasattr(self, 'force_stop_flag') and self.force_stop_flag:
-                    self._log_info("[重试] 检测到验证码状态，等待验证码消失后重试", "red")
-                    # 等待验证码状态解除
-                    while hasattr(self, 'force_stop_flag') and self.force_stop_flag and self.is_running:
-                        time.sleep(0.1)  # 更频繁检查以提高响应性
-                        self.root.update()
-                    if not self.is_running:
+                # 阶段3修复：重试前等待暂停和验证码状态解除，确保协调工作
+                if self.run_control.is_blocked():
+                    self._log_info("[重试] 检测到暂停或验证码状态，等待解除后重试", "orange")
+                    if not self.run_control.wait_until_clear():
                         break
-                    self._log_info("[重试] 验证码已消失，准备重试", "green")
+                    self._log_info("[重试] 暂停和验证码状态已解除，准备重试", "green")
                 
-                # 应用重试延迟
+                # 应用重试延迟（终止采集时立即结束等待）
                 if hasattr(self, 'retry_manager'):
-                    retry_delay = self.retry_manager.get_retry_delay()
+                    retry_delay = self.retry_manager.get_retry_delay("order_processing", i)
                     self._log_info(f"[重试] 等待 {retry_delay} 秒后重试", "blue")
-                    time.sleep(retry_delay)
+                    wait_started_at = time.time()
+                    still_running = self.run_control.sleep(retry_delay)
+                    self.retry_manager.record_retry_wait("order_processing", i, time.time() - wait_started_at)
+                    if not still_running:
+                        break
                 
                 self.retry_current_order = False  # 重置重试标志
                 self.current_order_index = i  # 保存当前订单索引
+                retry_started_at = time.time()
                 self._log_info(f"[重试] 重新处理第 {i}/{num_items} 个订单", "orange")
             else:
                 self._log_info(f"[循环] 正在处理第 {i}/{num_items} 个订单", "blue")
                 
             order_data = {}
             
-            # 处理当前订单的所有操作
-            for op in actions_to_loop:
+            # 处理当前订单的所有操作（按编译后的执行计划）
+            plan = self._get_operation_plan(actions_to_loop, xpath_pattern)
+            for step in plan.steps:
                 # 首先检查是否已终止操作
                 if not self.is_running:
                     self._log_info("操作已终止，停止处理当前订单", "orange")
                     break
                     
-                # 检查暂停状态
-                if hasattr(self, 'is_paused') and self.is_paused:
-                    self._log_info("操作已暂停，等待继续...", "orange")
-                    # 等待暂停状态解除
-                    while hasattr(self, 'is_paused') and self.is_paused and self.is_running:
-                        time.sleep(0.5)
-                        self.root.update()
-                    if not self.is_running:
-                        break
-                    self._log_info("暂停状态已解除，继续执行操作", "green")
-                
-                # 检查验证码检测状态
-                if hasattr(self, 'force_stop_flag') and self.force_stop_flag:
-                    self._log_info("检测到验证码，暂停操作执行", "red")
-                    # 等待验证码消失
-                    while hasattr(self, 'force_stop_flag') and self.force_stop_flag and self.is_running:
-                        time.sleep(0.5)
-                        self.root.update()
-                    if not self.is_running:
+                # 每个操作前检查暂停和验证码状态，阻塞等待解除（不轮询）
+                if self.run_control.is_blocked():
+                    if self.force_stop_flag:
+                        self._log_info(f"操作前检测到验证码，暂停执行: {step.name}", "red")
+                    else:
+                        self._log_info("操作已暂停，等待继续...", "orange")
+                    if not self.run_control.wait_until_clear():
                         break
-                    self._log_info("验证码已消失，继续执行操作", "green")
+                    self._log_info(f"暂停和验证码状态已解除，继续执行操作: {step.name}", "green")
                 
                 # 移除'查看2'的特殊逻辑，现在使用与其他元素相同的定位点击方法
                 # 原特殊逻辑已被移除，'查看2'现在将通过正常的元素定位和点击流程处理
                 
-                # 每个操作前都检测验证码
-                if hasattr(self, 'force_stop_flag') and self.force_stop_flag:
-                    self._log_info(f"操作前检测到验证码，暂停执行: {op['name']}", "red")
-                    # 等待验证码消失
-                    while hasattr(self, 'force_stop_flag') and self.force_stop_flag and self.is_running:
-                        time.sleep(0.1)
-                        self.root.update()
-                    if not self.is_running:
-                        break
-                    self._log_info(f"验证码已消失，继续执行操作: {op['name']}", "green")
-                
-                # 正常处理其他元素
-                op_xpath = op.get('xpath', '')
-                op_item_xpath = self._generate_xpath_for_item(op_xpath, i, xpath_pattern)
-                op_copy = op.copy()
-                op_copy['xpath'] = op_item_xpath
+                # 正常处理其他元素（getText优先使用整页批量预取的文本）
                 try:
-                    result = self._execute_operation(op_copy)
+                    result = step.handler(step, i, plan, num_items)
                     if result is not None:
-                        order_data[op['name']] = result
-                    # 如果"点击前确认"未勾选，每个操作后添加延迟
+                        order_data[step.name] = result
+                    # 断点续采：已采集过的订单不再执行后续操作
+                    if self._should_skip_collected_order(order_data):
+                        self._log_info(f"[断点续采] 订单 {order_data['订单编号']} 已采集，跳过", "blue")
+                        order_data = {}
+                        break
+                    # 如果"点击前确认"未勾选，每个操作后等待页面静止（操作间延迟作为最长等待时间）
                     if not self.confirm_click.get():
-                        time.sleep(self.auto_action_interval)
-                        self._log_info(f"自动执行模式：操作间延迟 {self.auto_action_interval} 秒", "blue")
+                        self._wait_page_settled(self.auto_action_interval)
                 except Exception as e:
-                    self._log_info(f"执行'{op['name']}'操作失败: {str(e)}", "red")
+                    self._log_info(f"执行'{step.name}'操作失败: {str(e)}", "red")
             
             # 检查是否成功采集了订单数据
             if order_data:
@@ -285,10 +322,18 @@ class DataProcessor:
                     # 没有找到订单ID，但仍然添加数据
                     self.collected_data.append(order_data)
             
-            # 更新进度条
-            self.progress_bar["value"] = i
-            self.progress_label.config(text=f"{i}/{num_items}")
-            self.root.update()
+            # 记录重试结果（采集到订单数据即视为重试成功）
+            if retry_started_at is not None and hasattr(self, 'retry_manager'):
+                self.retry_manager.record_retry_attempt("order_processing", i, bool(order_data),
+                                                        time.time() - retry_started_at)
+            
+            # 记录检查点（中断后可从下一个订单继续）
+            if self.is_running:
+                last_index = i
+                self.run_checkpoint.record_order(1, i, order_data.get('订单编号') if order_data else None)
+            
+            # 更新进度条（界面线程执行）
+            self.run_control.post(self._show_progress, f"{i}/{num_items}", i)
             
             # 如果不是最后一个订单，滚动到下一个
             if i < num_items:
@@ -305,17 +350,19 @@ class DataProcessor:
                 if not self.is_running:
                     self._log_info("操作已终止，停止等待页面加载", "orange")
                     break
-                time.sleep(1.5)
+                self._wait_page_settled(1.5)
         
         self._log_info(f"[循环] 已完成所有 {len(self.collected_data)} 个订单的处理", "green")
+        if last_index >= num_items:
+            self.run_checkpoint.clear()
         self._stop_collection()
-        if len(self.collected_data) > 0:
-            self.excel_button.config(state=tk.NORMAL)
-            self.word_button.config(state=tk.NORMAL)
 
 
-    def _execute_operation(self, operation):
-        """重构：执行单个操作，采用pyautogui移动+WASD微调+剪贴板采集，支持用户验证，对齐代码逻辑.md"""
+    def _execute_operation(self, operation, xpath=None, offsets=None):
+        """重构：执行单个操作，采用pyautogui移动+WASD微调+剪贴板采集，支持用户验证，对齐代码逻辑.md
+        
+        xpath/offsets由执行计划传入（当前订单的XPath、已解析的偏移量），未传入时从operation和元素属性获取
+        """
         import time  # 添加time模块导入，修复UnboundLocalError
         
         # 添加暂停检查 - 阶段1修复：方法开始时检查暂停状态
@@ -331,12 +378,13 @@ class DataProcessor:
         if 'pyautogui' not in globals():
             self._log_info("pyautogui模块未正确导入，请安装: pip install pyautogui", "red")
             return None
-            
+        
+        element = None
         try:
             if not self.driver:
                 self._log_info("浏览器未连接，无法执行操作", "red")
                 return None
-            xpath = operation.get("smart_xpath") or operation["xpath"]
+            xpath = xpath or operation.get("smart_xpath") or operation["xpath"]
             action = operation["action"]
             name = operation["name"]
             
@@ -349,8 +397,12 @@ class DataProcessor:
                 self._log_info(f"元素查找前检测到验证码: {name}", "red")
                 return None
             
-            # 使用智能定位查找元素
-            element = self._find_element_smart(name, xpath)
+            # 点击操作先尝试布局坐标快速路径，未命中或验证失败时再使用智能定位查找元素
+            element = None
+            if action in ["click", "clickAndGetClipboard"]:
+                element = self._find_element_by_layout(name, xpath)
+            if element is None:
+                element = self._find_element_smart(name, xpath)
                 
             if not element:
                 self._log_info(f"未找到元素: {name}", "red")
@@ -360,51 +412,40 @@ class DataProcessor:
             element_offset_x = 0
             element_offset_y = 0
             
-            # 尝试从元素上获取名称属性，这是为了确保使用相对XPath等方法找到的元素也能正确应用偏移量
-            try:
-                element_name = self.driver.execute_script("return arguments[0].getAttribute('data-element-name');", element)
-                if element_name and element_name in self.element_offsets:
-                    self._log_info(f"使用元素'{element_name}'的偏移量配置", "blue")
-                    element_offset_x = self.element_offsets[element_name].get("x", 0)
-                    element_offset_y = self.element_offsets[element_name].get("y", 0)
-                elif name in self.element_offsets:
-                    self._log_info(f"使用元素'{name}'的偏移量配置", "blue")
-                    element_offset_x = self.element_offsets[name].get("x", 0)
-                    element_offset_y = self.element_offsets[name].get("y", 0)
-                else:
-                    self._log_info(f"元素'{name}'没有偏移量配置，使用默认值(0,0)", "blue")
-            except Exception as e:
-                # 如果获取属性失败，回退到使用操作名称
-                if name in self.element_offsets:
-                    element_offset_x = self.element_offsets[name].get("x", 0)
-                    element_offset_y = self.element_offsets[name].get("y", 0)
-                    self._log_info(f"从属性获取元素名称失败，使用操作名称'{name}'的偏移量: X={element_offset_x}, Y={element_offset_y}", "orange")
+            if offsets is not None:
+                # 执行计划中已按元素名称解析（查找元素时data-element-name就设置为该名称）
+                element_offset_x, element_offset_y = offsets
+            else:
+                # 尝试从元素上获取名称属性，这是为了确保使用相对XPath等方法找到的元素也能正确应用偏移量
+                try:
+                    element_name = self.driver.execute_script("return arguments[0].getAttribute('data-element-name');", element)
+                    if element_name and element_name in self.element_offsets:
+                        self._log_info(f"使用元素'{element_name}'的偏移量配置", "blue")
+                        element_offset_x = self.element_offsets[element_name].get("x", 0)
+                        element_offset_y = self.element_offsets[element_name].get("y", 0)
+                    elif name in self.element_offsets:
+                        self._log_info(f"使用元素'{name}'的偏移量配置", "blue")
+                        element_offset_x = self.element_offsets[name].get("x", 0)
+                        element_offset_y = self.element_offsets[name].get("y", 0)
+                    else:
+                        self._log_info(f"元素'{name}'没有偏移量配置，使用默认值(0,0)", "blue")
+                except Exception as e:
+                    # 如果获取属性失败，回退到使用操作名称
+                    if name in self.element_offsets:
+                        element_offset_x = self.element_offsets[name].get("x", 0)
+                        element_offset_y = self.element_offsets[name].get("y", 0)
+                        self._log_info(f"从属性获取元素名称失败，使用操作名称'{name}'的偏移量: X={element_offset_x}, Y={element_offset_y}", "orange")
             
             if action == "getText":
                 # 获取文本操作
                 self._log_info(f"获取文本操作: {name}", "blue")
                 # time.sleep(2.0)  # 移除延迟
                 
-                import re
-                text = element.text.strip()
-                self._log_info(f"获取文本 '{name}': {text}", "green")
-                
-                # 如果是订单编号元素，解析并保存订单ID
-                if name == "订单编号" or "订单编号" in name:
-                    match = re.search(r"订单编号[：: ]*([0-9a-zA-Z\-]+)", text)
-                    if match:
-                        self.last_captured_order_id = match.group(1)
-                        self._log_info(f"已保存订单编号: {self.last_captured_order_id}", "blue")
-                        # 返回纯订单ID而不是完整文本，确保数据一致性
-                        return self.last_captured_order_id
-                    else:
-                        self.last_captured_order_id = None
-                        self._log_info("未能解析订单编号", "red")
-                return text
+                return self._handle_text_result(name, element.text.strip())
             elif action in ["click", "clickAndGetClipboard"]:
-                # 点击前延迟修改为1秒
-                self._log_info(f"点击前延迟1秒: {name}", "blue")
-                time.sleep(1.0)
+                # 点击前等待页面静止（最多1秒）
+                self._log_info(f"点击前等待页面就绪: {name}", "blue")
+                self._wait_page_settled(1.0)
                 
                 # 在点击前再次检查暂停状态和验证码 - 阶段1修复：点击前检查
                 if hasattr(self, 'is_paused') and self.is_paused:
@@ -453,40 +494,35 @@ class DataProcessor:
                     except Exception as e:
                         self._log_info(f"更新缓存坐标失败 '{name}': {str(e)}", "orange")
                     
+                    # 布局坐标命中时累加该布局键的成功次数
+                    layout_key = getattr(element, 'layout_key', None)
+                    if layout_key:
+                        self.coordinate_cache.save_layout_coordinate(layout_key, element.view_x, element.view_y)
+                    
                     self._manage_focus()
                     
                     # 虚拟元素点击成功，返回True
                     if action == "click":
+                        self._record_pending_strategy(element, True)
                         return True
                     
                 else:
                     # 正常元素处理流程
-                    # 滚动到元素可见
-                    self.driver.execute_script('arguments[0].scrollIntoView({behavior: "smooth", block: "center"});', element)
-                    time.sleep(0.3)  # 滚动操作延迟修改为0.3秒
-                    
-                    # 获取浏览器窗口位置和尺寸
-                    window_pos = self.driver.get_window_position()
-                    window_size = self.driver.get_window_size()
-                    
-                    # 获取元素在视口中的位置和尺寸
-                    rect = self.driver.execute_script('return arguments[0].getBoundingClientRect();', element)
+                    # 立即滚动到视口中央，等待位置稳定且可点击（最多0.3秒），同时取得元素在视口中的位置和尺寸
+                    rect = wait_element_ready(self.driver, element, 0.3)
+                    if rect is None:
+                        # 页面仍在变化或元素被遮挡，再等待一次，仍未就绪时不使用过期的位置点击
+                        self._log_info(f"元素'{name}'尚未就绪，继续等待", "orange")
+                        rect = wait_element_ready(self.driver, element, 1.0)
+                    if rect is None:
+                        self._log_info(f"元素'{name}'在等待时间内未就绪（位置不稳定或被遮挡），跳过点击", "red")
+                        return None
                 
                     # 记录元素的原始位置信息
                     self._log_info(f"元素'{name}'的原始位置: left={rect['left']}, top={rect['top']}, width={rect['width']}, height={rect['height']}", "blue")
                     
-                    # 获取浏览器内容区域的偏移量
-                    js = """
-                    return {
-                        screenX: window.screenX, 
-                        screenY: window.screenY, 
-                        outerHeight: window.outerHeight, 
-                        innerHeight: window.innerHeight,
-                        outerWidth: window.outerWidth,
-                        innerWidth: window.innerWidth
-                    };
-                    """
-                    win_metrics = self.driver.execute_script(js)
+                    # 获取浏览器内容区域的偏移量（同时取得元素的视口坐标和页面布局信息，用于记录布局坐标）
+                    win_metrics = self.driver.execute_script(self._LAYOUT_METRICS_JS, element)
                     
                     # 计算内容区域的左上角位置
                     content_left = win_metrics['screenX'] + (win_metrics['outerWidth'] - win_metrics['innerWidth']) / 2
@@ -594,12 +630,13 @@ class DataProcessor:
                         # 点击成功后保存坐标到缓存（无论是否为重试模式） - 阶段3增强
                         try:
                             self._save_successful_coordinates_enhanced(name, click_pos.x, click_pos.y, element_offset_x, element_offset_y)
+                            self._save_layout_coordinate(name, win_metrics)
                             self._log_info(f"已缓存元素 '{name}' 的坐标: ({click_pos.x}, {click_pos.y})", "blue")
                         except Exception as e:
                             self._log_info(f"缓存坐标失败 '{name}': {str(e)}", "orange")
                         
-                        # 点击后延迟修改为1秒
-                        time.sleep(1.0)
+                        # 点击后等待页面变化并静止（最多1秒）
+                        self._wait_page_settled(1.0, expect_change=True)
                         
                         # 对于'复制完整的收货信息'元素，跳过额外点击以避免剪贴板内容重复
                         if name != '复制完整的收货信息':
@@ -613,7 +650,7 @@ class DataProcessor:
                             extra_click_after_pos = pyautogui.position()
                             self._log_info(f"[坐标日志] 元素'{name}' - 额外点击时坐标: X={extra_click_after_pos.x}, Y={extra_click_after_pos.y}", "green")
                             self._log_info(f"已执行额外的原地点击 '{name}'", "blue")
-                            time.sleep(1.0)  # 额外点击延迟修改为1秒
+                            self._wait_page_settled(1.0, expect_change=True)  # 额外点击后等待页面变化并静止（最多1秒）
                         else:
                             self._log_info(f"跳过'{name}'的额外点击，避免剪贴板内容重复", "blue")
                         
@@ -637,17 +674,20 @@ class DataProcessor:
                          # time.sleep(3.5)  # 剪贴板操作延迟移除
                          self._manage_focus()
                          # time.sleep(2.5)  # 信息复制操作延迟移除
-                         clipboard_content = self._wait_for_clipboard_content(
+                         clipboard_content = self._overlap_clipboard_wait(lambda: self._wait_for_clipboard_content(
                              timeout=12.0,
-                             check_interval=0.5,
+                             check_interval=0.1,
                              min_length=10
-                         )
+                         ))
+                     # 使用缓存坐标点击时，以剪贴板取得内容作为点击成功的确认
+                     self._record_pending_strategy(element, bool(clipboard_content and clipboard_content.strip()))
                      # 使用之前采集的订单ID
                      current_order_id = getattr(self, 'last_captured_order_id', None)
                      if not current_order_id:
                          # 弹窗要求用户输入订单ID
                          from tkinter import simpledialog
-                         current_order_id = simpledialog.askstring(
+                         current_order_id = self._call_on_ui_thread(
+                             simpledialog.askstring,
                              "订单ID缺失", "未能自动提取订单ID，请手动输入当前订单ID：", parent=self.root)
                          if not current_order_id or not current_order_id.strip():
                              self._log_info("用户未输入订单ID，跳过本次映射", "red")
@@ -663,9 +703,130 @@ class DataProcessor:
             self._log_info(f"执行'{name}'操作失败: {str(e)}", "red")
             import traceback
             self._log_info(traceback.format_exc(), "red")
+            self._record_pending_strategy(element, False)
             return None
 
 
+    def _overlap_clipboard_wait(self, wait):
+        """等待剪贴板期间在后台执行已安排的下一订单准备任务（资源约定见order_pipeline）"""
+        job, self._clipboard_wait_job = self._clipboard_wait_job, None
+        if job is None:
+            return wait()
+        return self.order_pipeline.overlap(wait, job)
+    
+    def _prepare_order(self, slot, plan, last_slot):
+        """准备下一个订单：预取其页面文本（在当前订单等待剪贴板时由后台执行）
+        
+        只缓存所有getText字段都已取到文本的槽位；该订单尚未渲染完成时不缓存，轮到它时在前台重新提取
+        """
+        if not plan.text_steps or slot in self._page_text_cache:
+            return
+        texts = self._extract_page_texts(plan, [slot]).get(slot)
+        if texts and all(texts.get(step.name) is not None for step in plan.text_steps):
+            self._page_text_cache[slot] = texts
+    
+    def _get_operation_plan(self, actions_to_loop, xpath_pattern):
+        """返回操作序列的执行计划，操作序列、XPath模式变化或偏移量配置保存后重新编译"""
+        plan = self._operation_plan
+        if plan is None or not plan.matches(actions_to_loop, xpath_pattern):
+            handlers = {
+                'getText': self._run_text_step,
+                'clickAndGetClipboard': self._run_clipboard_step,
+            }
+            plan = self._operation_plan = compile_operation_plan(
+                actions_to_loop, xpath_pattern, self.element_offsets, handlers, self._run_operation_step)
+        return plan
+    
+    def _run_operation_step(self, step, slot, plan, last_slot):
+        """执行计划步骤：定位第slot个订单的元素并执行操作"""
+        return self._execute_operation(step.operation, step.xpath_for(slot), step.offsets)
+    
+    def _run_text_step(self, step, slot, plan, last_slot):
+        """getText步骤：优先使用整页批量预取的文本"""
+        text = self._get_prefetched_text(step, slot, plan, last_slot)
+        if text is not None:
+            return self._handle_text_result(step.name, text)
+        return self._run_operation_step(step, slot, plan, last_slot)
+    
+    def _run_clipboard_step(self, step, slot, plan, last_slot):
+        """clickAndGetClipboard步骤：剪贴板等待期间在后台准备下一个订单"""
+        if slot < last_slot:
+            self._clipboard_wait_job = lambda: self._prepare_order(slot + 1, plan, last_slot)
+        try:
+            return self._run_operation_step(step, slot, plan, last_slot)
+        finally:
+            self._clipboard_wait_job = None
+    
+    def _handle_text_result(self, name, text):
+        """处理getText获取到的文本：订单编号元素解析出纯订单ID并保存"""
+        import re
+        self._log_info(f"获取文本 '{name}': {text}", "green")
+        
+        # 如果是订单编号元素，解析并保存订单ID
+        if name == "订单编号" or "订单编号" in name:
+            match = re.search(r"订单编号[：: ]*([0-9a-zA-Z\-]+)", text)
+            if match:
+                self.last_captured_order_id = match.group(1)
+                self._log_info(f"已保存订单编号: {self.last_captured_order_id}", "blue")
+                # 返回纯订单ID而不是完整文本，确保数据一致性
+                return self.last_captured_order_id
+            else:
+                self.last_captured_order_id = None
+                self._log_info("未能解析订单编号", "red")
+        return text
+    
+    PREFETCH_WINDOW = 20  # 批量预取getText文本时一次提取的最多槽位数
+    
+    # 一次脚本调用按XPath列表批量读取文本，找不到的元素返回null
+    _BULK_TEXT_JS = """
+    var requests = arguments[0], results = {};
+    for (var i = 0; i < requests.length; i++) {
+        var slot = requests[i][0], name = requests[i][1], xpath = requests[i][2];
+        var node = null, text = null;
+        try {
+            node = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        } catch (e) {}
+        if (node) {
+            text = ((node.innerText !== undefined ? node.innerText : node.textContent) || '').trim();
+        }
+        (results[slot] = results[slot] || {})[name] = text;
+    }
+    return results;
+    """
+    
+    def _extract_page_texts(self, plan, slots):
+        """一次脚本调用提取多个订单槽位的全部getText字段，返回 {槽位: {元素名称: 文本，找不到时为None}}"""
+        if not plan.text_steps or not self.driver:
+            return {}
+        requests = [[slot, step.name, step.xpath_for(slot)] for slot in slots for step in plan.text_steps]
+        try:
+            results = self.driver.execute_script(self._BULK_TEXT_JS, requests) or {}
+            return {int(slot): texts for slot, texts in results.items()}
+        except Exception as e:
+            # 可能在订单流水线后台执行，不写界面
+            print(f"批量提取文本失败，回退到逐个查找: {e}")
+            return {}
+    
+    def _get_prefetched_text(self, step, slot, plan, last_slot):
+        """返回批量预取的getText文本，None表示需要走逐个查找的慢路径
+        
+        槽位未预取时一次提取从slot起最多 PREFETCH_WINDOW 个槽位，只缓存从slot起连续取到文本的槽位
+        （即已渲染的行），尚未渲染的槽位在第一次用到时重新提取，避免长列表每次未命中都扫描到列表末尾
+        """
+        if step.action != 'getText':
+            return None
+        texts = self._page_text_cache.get(slot)
+        if texts is None:
+            window_end = min(last_slot, slot + self.PREFETCH_WINDOW - 1)
+            extracted = self._extract_page_texts(plan, range(slot, window_end + 1))
+            for extracted_slot in range(slot, window_end + 1):
+                extracted_texts = extracted.get(extracted_slot)
+                if not extracted_texts or all(text is None for text in extracted_texts.values()):
+                    break
+                self._page_text_cache[extracted_slot] = extracted_texts
+            return extracted.get(slot, {}).get(step.name)
+        return texts.get(step.name)
+    
     def _find_element_smart(self, name, original_xpath):
         """智能元素查找，使用多种策略定位元素 - 阶段3增强：配置化重试策略"""
         if not self.driver:
@@ -675,13 +836,6 @@ class DataProcessor:
         self._log_info(f"智能查找元素: '{name}'", "blue")
         element = None
         
-        # 阶段3增强：获取重试策略列表
-        retry_strategies = ["smart_element_search", "fallback_xpath"]
-        if hasattr(self, 'retry_manager'):
-            retry_strategies = self.retry_manager.get_retry_strategies()
-            # 注意：重试模式下不直接使用缓存坐标，而是先尝试正常的元素查找方法
-            # 缓存坐标只作为所有策略都失败时的最后备选方案
-        
         # 策略1: 使用原始XPath
         try:
             element = self.driver.find_element(By.XPATH, original_xpath)
@@ -701,7 +855,42 @@ class DataProcessor:
         except Exception as e:
             self._log_info(f"原始XPath未找到元素 '{name}': {str(e)}", "orange")
         
-        # 策略2: 使用相对XPath
+        # 其余策略按重试管理器给出的顺序执行（按该元素近期的成功率和耗时自适应排序），并记录每个策略的结果
+        retry_strategies = ["smart_element_search", "fallback_xpath"]
+        if hasattr(self, 'retry_manager'):
+            retry_strategies = self.retry_manager.get_retry_strategies(name)
+        for strategy in retry_strategies:
+            finder = self._ELEMENT_STRATEGIES.get(strategy)
+            if finder is None:
+                continue
+            # 缓存坐标只在重试模式下使用
+            if strategy == "cached_coordinates" and not self._is_cached_coordinates_allowed():
+                continue
+            started_at = time.time()
+            element = finder(self, name, original_xpath)
+            if element is not None and strategy == "cached_coordinates":
+                # 找到缓存坐标不代表坐标仍然正确，点击得到确认后再记录结果（见 _record_pending_strategy）
+                element.pending_strategy = (strategy, started_at)
+                return element
+            if hasattr(self, 'retry_manager'):
+                self.retry_manager.record_strategy_outcome(name, strategy, element is not None, time.time() - started_at)
+            if element is not None:
+                return element
+        
+        self._log_info(f"所有策略都未能找到元素 '{name}'", "red")
+        return None
+    
+    def _record_pending_strategy(self, element, success):
+        """记录等待点击确认的查找策略结果（缓存坐标），每个元素只记录一次"""
+        pending = getattr(element, 'pending_strategy', None)
+        if not pending or not hasattr(self, 'retry_manager'):
+            return
+        element.pending_strategy = None
+        strategy, started_at = pending
+        self.retry_manager.record_strategy_outcome(element.name, strategy, success, time.time() - started_at)
+    
+    def _find_by_fallback_xpath(self, name, original_xpath):
+        """查找策略fallback_xpath：相对XPath（找到后滚动并重新尝试原始XPath）"""
         try:
             # 尝试生成更健壮的相对XPath
             relative_xpath = self._generate_relative_xpath(original_xpath)
@@ -749,7 +938,11 @@ class DataProcessor:
         except Exception as e:
             self._log_info(f"相对XPath未找到元素 '{name}': {str(e)}", "orange")
         
-        # 策略3: 使用文本内容查找
+        return None
+    
+    def _find_by_smart_search(self, name, original_xpath):
+        """查找策略smart_element_search：依次按文本内容、CSS选择器、JavaScript查找"""
+        # 文本内容查找
         try:
             element = self._find_by_text_content(name)
             if element:
@@ -769,7 +962,7 @@ class DataProcessor:
         except Exception as e:
             self._log_info(f"文本内容未找到元素 '{name}': {str(e)}", "orange")
         
-        # 策略4: 使用CSS选择器
+        # CSS选择器
         try:
             # 尝试从XPath转换为CSS选择器
             css_selector = self._xpath_to_css(original_xpath)
@@ -791,7 +984,7 @@ class DataProcessor:
         except Exception as e:
             self._log_info(f"CSS选择器未找到元素 '{name}': {str(e)}", "orange")
         
-        # 策略5: 使用JavaScript查找
+        # JavaScript查找
         try:
             js_script = f"""
             function findElementByContent(text) {{
@@ -831,41 +1024,158 @@ class DataProcessor:
         except Exception as e:
             self._log_info(f"JavaScript未找到元素 '{name}': {str(e)}", "orange")
         
-        # 策略6: 在重试模式下使用缓存坐标（仅当所有其他策略都失败时）
-        # 只有在明确的重试模式下才使用缓存坐标
-        if (hasattr(self, 'retry_current_order') and self.retry_current_order and 
-            hasattr(self, 'retry_manager') and self.retry_manager.is_coordinate_cache_enabled()):
-            try:
-                cached_coords = self._load_cached_coordinates(name)
-                if cached_coords and self.retry_manager.is_coordinate_valid(cached_coords):
-                    self._log_info(f"[重试模式] 所有策略失败，尝试使用缓存坐标查找元素 '{name}'", "orange")
-                    # 创建虚拟元素对象，使用增强的缓存坐标信息
-                    virtual_element = self._create_virtual_element_enhanced(name, cached_coords)
-                    if virtual_element:
-                        self._log_info(f"[重试模式] 使用缓存坐标成功创建虚拟元素 '{name}'", "green")
-                        return virtual_element
-            except Exception as e:
-                self._log_info(f"[重试模式] 使用缓存坐标失败 '{name}': {str(e)}", "orange")
-        
-        self._log_info(f"所有策略都未能找到元素 '{name}'", "red")
         return None
     
-    def _load_cached_coordinates(self, element_name):
-        """加载缓存的坐标信息 - 阶段3增强方法"""
+    def _is_cached_coordinates_allowed(self):
+        """只有在明确的重试模式下且启用了坐标缓存时才使用缓存坐标"""
+        return (hasattr(self, 'retry_current_order') and self.retry_current_order and 
+                hasattr(self, 'retry_manager') and self.retry_manager.is_coordinate_cache_enabled())
+    
+    def _find_by_cached_coordinates(self, name, original_xpath):
+        """查找策略cached_coordinates：重试模式下使用缓存坐标创建虚拟元素"""
+        try:
+            cached_coords = self._load_cached_coordinates(name)
+            if cached_coords and self.retry_manager.is_coordinate_valid(cached_coords):
+                self._log_info(f"[重试模式] 尝试使用缓存坐标查找元素 '{name}'", "orange")
+                # 创建虚拟元素对象，使用增强的缓存坐标信息
+                virtual_element = self._create_virtual_element_enhanced(name, cached_coords)
+                if virtual_element:
+                    self._log_info(f"[重试模式] 使用缓存坐标成功创建虚拟元素 '{name}'", "green")
+                    return virtual_element
+        except Exception as e:
+            self._log_info(f"[重试模式] 使用缓存坐标失败 '{name}': {str(e)}", "orange")
+        return None
+    
+    # 重试配置中的策略名称 -> 查找方法
+    _ELEMENT_STRATEGIES = {
+        "fallback_xpath": _find_by_fallback_xpath,
+        "smart_element_search": _find_by_smart_search,
+        "cached_coordinates": _find_by_cached_coordinates
+    }
+    
+    # 页面信息：窗口位置、视口尺寸、滚动位置、devicePixelRatio和页面布局签名所需的信息（布局坐标快速路径和正常点击共用）
+    _PAGE_METRICS_JS = """
+    function pageMetrics() {
+        return {
+            screenX: window.screenX,
+            screenY: window.screenY,
+            outerWidth: window.outerWidth,
+            outerHeight: window.outerHeight,
+            innerWidth: window.innerWidth,
+            innerHeight: window.innerHeight,
+            scrollY: window.pageYOffset || document.documentElement.scrollTop,
+            devicePixelRatio: window.devicePixelRatio || 1,
+            path: location.host + location.pathname,
+            scrollWidth: document.documentElement.scrollWidth
+        };
+    }
+    """
+    
+    # 一次脚本调用获取页面信息，并取得元素（已滚动到视口中央）中心点的视口坐标和尺寸
+    _LAYOUT_METRICS_JS = _PAGE_METRICS_JS + """
+    var metrics = pageMetrics();
+    if (arguments.length > 0 && arguments[0]) {
+        var rect = arguments[0].getBoundingClientRect();
+        metrics.viewX = rect.left + rect.width / 2;
+        metrics.viewY = rect.top + rect.height / 2;
+        metrics.width = rect.width;
+        metrics.height = rect.height;
+    }
+    return metrics;
+    """
+    
+    # 把xpath定位的元素立即滚动到视口中央，验证缓存的视口坐标上的元素属于该元素，同时返回当前页面信息
+    _LAYOUT_VERIFY_JS = _PAGE_METRICS_JS + """
+    var xpath = arguments[0], viewX = arguments[1], viewY = arguments[2];
+    var target = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    var hit = null;
+    if (target) {
+        target.scrollIntoView({behavior: 'instant', block: 'center', inline: 'nearest'});
+        hit = document.elementFromPoint(viewX, viewY);
+    }
+    var metrics = pageMetrics();
+    metrics.ok = !!(target && hit && (target === hit || target.contains(hit)));
+    return metrics;
+    """
+    
+    @staticmethod
+    def _layout_of(metrics):
+        """从页面信息中取出布局坐标键所需的部分：(视口尺寸, devicePixelRatio, 布局签名)
+        
+        布局签名取页面路径和文档宽度的摘要；文档高度随订单列表滚动加载变化，不计入签名
+        """
+        import hashlib
+        signature_source = f"{metrics.get('path', '')}|{metrics.get('scrollWidth', 0)}"
+        layout_signature = hashlib.md5(signature_source.encode('utf-8')).hexdigest()[:12]
+        return ((metrics['innerWidth'], metrics['innerHeight']),
+                metrics.get('devicePixelRatio', 1), layout_signature)
+    
+    def _save_layout_coordinate(self, name, metrics):
+        """真实元素点击成功后，用点击前取得的页面信息记录元素中心点的视口坐标（按元素名称和页面布局区分）"""
+        try:
+            if not metrics or metrics.get('width', 0) <= 0 or metrics.get('height', 0) <= 0:
+                return
+            self._last_layout = self._layout_of(metrics)
+            key = self.coordinate_cache.layout_key(name, *self._last_layout)
+            self.coordinate_cache.save_layout_coordinate(key, metrics['viewX'], metrics['viewY'])
+        except Exception as e:
+            self._log_info(f"保存布局坐标失败 '{name}': {e}", "orange")
+    
+    def _find_element_by_layout(self, name, xpath):
+        """布局坐标快速路径：当前布局下该元素的视口坐标已多次点击成功时，直接换算屏幕坐标
+        
+        键由最近一次正常点击时的页面布局生成，未命中时不与浏览器交互；命中时用一次脚本调用把元素滚动到
+        视口中央，并用 elementFromPoint 验证该点仍落在xpath定位的元素上。页面布局已变化时返回None，
+        验证失败时删除该布局坐标并返回None，均由调用方回退到智能查找。
+        点击前确认模式下不使用快速路径，点击仍经过正常流程的确认
+        """
+        if not self.driver or self._last_layout is None:
+            return None
+        if hasattr(self, 'confirm_click') and self.confirm_click.get():
+            return None
         try:
-            cache_file = "coordinate_cache.json"
-            if not os.path.exists(cache_file):
+            key = self.coordinate_cache.layout_key(name, *self._last_layout)
+            coord_data = self.coordinate_cache.lookup_layout(key)
+            if not coord_data:
                 return None
             
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-            
-            coords = cache_data.get('coordinates', {}).get(element_name)
-            if coords and coords.get('success_count', 0) > 0:
-                return coords
+            check = self.driver.execute_script(self._LAYOUT_VERIFY_JS, xpath, coord_data['view_x'], coord_data['view_y'])
+            if not check:
+                return None
+            current_layout = self._layout_of(check)
+            if current_layout != self._last_layout:
+                # 窗口或页面布局已变化，该键不再适用，由正常流程在新布局下重新记录
+                self._last_layout = current_layout
+                return None
+            if not check.get('ok'):
+                self._log_info(f"[布局坐标] 元素'{name}'的缓存位置已不匹配，回退到元素查找", "orange")
+                self.coordinate_cache.discard_layout(key)
+                return None
             
+            screen_x, screen_y = self.coordinate_cache.to_screen(coord_data, check)
+            virtual_element = self._create_virtual_element_enhanced(name, {
+                "screen_x": screen_x,
+                "screen_y": screen_y,
+                "scroll_y": check['scrollY'],
+                "element_offset_x": 0,
+                "element_offset_y": 0,
+                "success_count": coord_data.get("success_count", 0),
+                "last_success": coord_data.get("last_success", "")
+            })
+            if virtual_element:
+                virtual_element.layout_key = key
+                virtual_element.view_x = coord_data['view_x']
+                virtual_element.view_y = coord_data['view_y']
+                self._log_info(f"[布局坐标] 元素'{name}'使用布局坐标: ({screen_x:.0f}, {screen_y:.0f})", "green")
+            return virtual_element
+        except Exception as e:
+            self._log_info(f"[布局坐标] 查找失败 '{name}': {e}", "orange")
             return None
-            
+    
+    def _load_cached_coordinates(self, element_name):
+        """加载缓存的坐标信息 - 阶段3增强方法（从内存中的坐标缓存查找，不读文件）"""
+        try:
+            return self.coordinate_cache.lookup(element_name)
         except Exception as e:
             self._log_info(f"加载坐标缓存失败: {e}", "error")
             return None
@@ -941,20 +1251,8 @@ class DataProcessor:
             return None
     
     def _save_successful_coordinates_enhanced(self, element_name, screen_x, screen_y, offset_x, offset_y):
-        """保存成功的点击坐标 - 阶段3增强方法"""
+        """保存成功的点击坐标 - 阶段3增强方法（写入内存中的坐标缓存，由其延迟写盘）"""
         try:
-            cache_file = "coordinate_cache.json"
-            cache_data = {}
-            
-            # 读取现有缓存
-            if os.path.exists(cache_file):
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-            
-            # 初始化缓存结构
-            if 'coordinates' not in cache_data:
-                cache_data['coordinates'] = {}
-            
             # 获取当前页面滚动位置
             try:
                 current_scroll_y = self.driver.execute_script("return window.pageYOffset || document.documentElement.scrollTop;")
@@ -962,30 +1260,13 @@ class DataProcessor:
                 self._log_info(f"获取滚动位置失败: {e}", "orange")
                 current_scroll_y = 0
             
-            # 更新坐标信息
-            if element_name not in cache_data['coordinates']:
-                cache_data['coordinates'][element_name] = {'success_count': 0}
-            
-            coord_info = cache_data['coordinates'][element_name]
-            coord_info.update({
-                'screen_x': screen_x,
-                'screen_y': screen_y,
-                'element_offset_x': offset_x,
-                'element_offset_y': offset_y,
-                'scroll_y': current_scroll_y,  # 记录保存时的滚动位置
-                'success_count': coord_info.get('success_count', 0) + 1,
-                'last_success': datetime.now().isoformat()
-            })
+            # 更新坐标信息（记录保存时的滚动位置）
+            self.coordinate_cache.save_coordinate(element_name, screen_x, screen_y, offset_x, offset_y,
+                                                  scroll_y=current_scroll_y)
+            coord_info = self.coordinate_cache.lookup(element_name) or {}
             
             self._log_info(f"[缓存] 保存坐标时滚动位置: {current_scroll_y}", "cyan")
             
-            cache_data['cache_version'] = '1.0'
-            cache_data['last_updated'] = datetime.now().isoformat()
-            
-            # 保存缓存
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
-            
             self._log_info(f"[缓存] 已保存元素'{element_name}'的成功坐标", "blue")
             
             # 记录坐标保存事件
@@ -996,7 +1277,7 @@ class DataProcessor:
                     "screen_y": screen_y,
                     "offset_x": offset_x,
                     "offset_y": offset_y,
-                    "success_count": coord_info['success_count']
+                    "success_count": coord_info.get('success_count', 0)
                 })
                 write_retry_log(log_entry)
             
@@ -1285,6 +1566,16 @@ class DataProcessor:
             return None
     
 
+    def _wait_page_settled(self, timeout, expect_change=False):
+        """等待页面DOM静止后继续，timeout为原固定延迟，作为最长等待时间
+        
+        expect_change用于点击、滚动之后：页面开始变化并重新静止才提前结束，否则等满timeout
+        """
+        if not self.driver:
+            time.sleep(timeout)
+            return False
+        return wait_dom_quiet(self.driver, timeout, expect_change=expect_change)
+    
     def _scroll_to_next_order(self):
         """使用多种滚动策略尝试滚动到下一个订单"""
         # 检查是否已终止操作
@@ -1359,8 +1650,8 @@ class DataProcessor:
                     if not success:
                         self._log_info("JavaScript滚动返回失败状态", "orange")
                     
-                    # 增加滚动后等待时间，让页面有足够时间更新
-                    time.sleep(wait_time * 1.5)
+                    # 滚动后等待页面更新（页面静止即继续）
+                    self._wait_page_settled(wait_time * 1.5, expect_change=True)
                     
                     # 检查是否滚动到了新订单
                     new_order_id = self._extract_current_order_id()
@@ -1409,8 +1700,8 @@ class DataProcessor:
                     else:
                         method()
                     
-                    # 增加滚动后等待时间，让页面有足够时间更新
-                    time.sleep(wait_time * 1.5)
+                    # 滚动后等待页面更新（页面静止即继续）
+                    self._wait_page_settled(wait_time * 1.5, expect_change=True)
                     
                     # 检查是否滚动到了新订单
                     new_order_id = self._extract_current_order_id()
@@ -1498,8 +1789,8 @@ class DataProcessor:
                     actions.send_keys(Keys.PAGE_DOWN)
                     actions.perform()
                     
-                    # 增加滚动后等待时间
-                    time.sleep(wait_time * 1.5)
+                    # 滚动后等待页面更新（页面静止即继续）
+                    self._wait_page_settled(wait_time * 1.5, expect_change=True)
                     
                     # 检查是否滚动到了新订单
                     new_order_id = self._extract_current_order_id()
@@ -1529,8 +1820,8 @@ class DataProcessor:
             if not success:
                 self._log_info("最终JavaScript滚动返回失败状态", "orange")
                 
-            # 增加滚动后等待时间
-            time.sleep(wait_time * 2)
+            # 滚动后等待页面更新（页面静止即继续）
+            self._wait_page_settled(wait_time * 2, expect_change=True)
             
             # 再次检查是否滚动到了新订单
             new_order_id = self._extract_current_order_id()
@@ -1868,8 +2159,28 @@ class DataProcessor:
         
         self._log_info(f"开始模块化处理：总订单{total_orders}个，每页{page_size}个，共{total_pages}页", "green")
         
+        start_page, start_order = 1, 1
+        if self._resume_state:
+            start_page = self._resume_state.get("page", 1)
+            start_order = self._resume_state.get("order_index", 0) + 1
+            if start_order > page_size:
+                start_page, start_order = start_page + 1, 1
+            # 通过翻页元素（next_page_xpath）跳到检查点所在的页
+            for page in range(1, min(start_page, total_pages)):
+                if not self.is_running:
+                    return
+                self._log_info(f"[断点续采] 翻页跳过第{page}页", "blue")
+                if not self._execute_page_turn():
+                    self._log_info(f"[断点续采] 跳转到第{start_page}页失败，停止执行", "red")
+                    self._stop_collection()
+                    return
+        else:
+            self.run_checkpoint.start("modular", total_orders, page_size=page_size,
+                                      cache_epoch=self.cache_manager.get_cache_epoch())
+        completed = False
+        
         # 页面循环 - 新增的外层循环
-        for current_page in range(1, total_pages + 1):
+        for current_page in range(start_page, total_pages + 1):
             if not self.is_running:
                 break
                 
@@ -1883,7 +2194,8 @@ class DataProcessor:
             self._reset_page_state()
             
             # 调用原有的单页处理逻辑 - 保持原有代码不变
-            success = self._process_single_page(current_page_orders, current_page)
+            page_start_order = start_order if current_page == start_page else 1
+            success = self._process_single_page(current_page_orders, current_page, page_start_order)
             
             if not success:
                 self._log_info(f"第{current_page}页处理失败，停止执行", "red")
@@ -1895,8 +2207,13 @@ class DataProcessor:
                     self._log_info(f"第{current_page}页翻页失败，停止执行", "red")
                     break
                 self._log_info(f"第{current_page}页处理完成，已翻页到第{current_page+1}页", "green")
+            elif current_page == total_pages:
+                completed = True
         
         self._log_info(f"模块化处理完成，共处理{len(self.collected_data)}个订单", "green")
+        self.order_pipeline.drain()
+        if completed:
+            self.run_checkpoint.clear()
         self._stop_collection()
     
     def _get_total_order_count(self, manual_order_count):
@@ -1951,8 +2268,8 @@ class DataProcessor:
         
         self._log_info("页面状态已重置", "blue")
     
-    def _process_single_page(self, page_orders, page_num):
-        """处理单页订单 - 原有逻辑的封装"""
+    def _process_single_page(self, page_orders, page_num, start_order=1):
+        """处理单页订单 - 原有逻辑的封装（start_order为断点续采时的起始订单序号）"""
         try:
             # 获取操作序列
             actions_to_loop = [op for op in self.operation_sequence if not op.get("is_order_count", False)]
@@ -1960,12 +2277,15 @@ class DataProcessor:
                 self._log_info('错误：没有可执行的操作元素', 'red')
                 return False
             
-            # 学习XPath模式（每页重新学习）
+            # 学习XPath模式（每页重新学习；断点续采时使用检查点中该页的模式，没有记录的页重新学习）
             first_action_xpath = actions_to_loop[0]['xpath']
-            xpath_pattern = self._learn_xpath_pattern_for_page(first_action_xpath)
+            xpath_pattern = self.run_checkpoint.page_pattern(page_num) if self._resume_state else None
+            if not xpath_pattern:
+                xpath_pattern = self._learn_xpath_pattern_for_page(first_action_xpath)
             
-            # 处理当前页的所有订单
-            for order_index in range(1, page_orders + 1):
+            # 处理当前页的所有订单（getText字段在处理第一个订单时整页批量预取）
+            self._page_text_cache = {}
+            for order_index in range(start_order, page_orders + 1):
                 if not self.is_running:
                     return False
                     
@@ -1973,9 +2293,14 @@ class DataProcessor:
                 self._update_dual_progress(page_num, order_index, page_orders)
                 
                 # 处理当前订单
-                success = self._process_single_order(order_index, actions_to_loop, xpath_pattern)
+                self._last_processed_order_id = None
+                success = self._process_single_order(order_index, actions_to_loop, xpath_pattern, page_orders)
                 if not success:
                     return False
+                
+                # 记录检查点（中断后可从下一个订单继续）；与该订单的缓存写入同在流水线后台按顺序执行
+                self.order_pipeline.submit(self.run_checkpoint.record_order, page_num, order_index,
+                                           self._last_processed_order_id, xpath_pattern)
                     
                 # 滚动到下一个订单（如果不是最后一个）
                 if order_index < page_orders:
@@ -2023,72 +2348,87 @@ class DataProcessor:
         
         progress_text = f"第{page_num}页/共{total_pages}页 - 当前页第{order_index}个/共{page_orders}个"
         
+        # 计算总体进度，交给界面线程显示
+        total_processed = (page_num - 1) * page_size + order_index
+        self.run_control.post(self._show_progress, progress_text, total_processed)
+    
+    def _show_progress(self, progress_text, value, maximum=None):
+        """显示进度（界面线程执行），maximum不为None时同时设置进度条最大值"""
         if hasattr(self, 'progress_label'):
             self.progress_label.config(text=progress_text)
-        
-        # 计算总体进度
-        total_processed = (page_num - 1) * page_size + order_index
         if hasattr(self, 'progress_bar'):
-            self.progress_bar["value"] = total_processed
-            
-        if hasattr(self, 'root'):
-            self.root.update()
+            if maximum is not None:
+                self.progress_bar["maximum"] = maximum
+            self.progress_bar["value"] = value
     
-    def _process_single_order(self, order_index, actions_to_loop, xpath_pattern):
-        """处理单个订单"""
+    def _call_on_ui_thread(self, callback, *args, **kwargs):
+        """在界面线程执行callback并等待其结果（采集线程弹出对话框时使用），采集停止时不再等待并返回None"""
+        if threading.current_thread() is threading.main_thread():
+            return callback(*args, **kwargs)
+        done = threading.Event()
+        result = {}
+        
+        def run():
+            try:
+                result['value'] = callback(*args, **kwargs)
+            finally:
+                self.run_control.signal(done)
+        
+        self.run_control.post(run)
+        self.run_control.wait_event(done)
+        return result.get('value')
+    
+    def _process_single_order(self, order_index, actions_to_loop, xpath_pattern, last_slot=None):
+        """处理单个订单（last_slot为当前页最后一个订单序号，用于批量预取getText文本）"""
         order_data = {}
+        last_slot = last_slot or order_index
         
-        # 处理当前订单的所有操作
-        for op in actions_to_loop:
+        # 处理当前订单的所有操作（按编译后的执行计划）
+        plan = self._get_operation_plan(actions_to_loop, xpath_pattern)
+        for step in plan.steps:
             # 检查是否已终止操作
             if not self.is_running:
                 return False
                 
-            # 检查暂停状态
-            if hasattr(self, 'is_paused') and self.is_paused:
-                while hasattr(self, 'is_paused') and self.is_paused and self.is_running:
-                    import time
-                    time.sleep(0.5)
-                    if hasattr(self, 'root'):
-                        self.root.update()
-                if not self.is_running:
-                    return False
-            
-            # 生成当前订单的XPath
-            op_xpath = op.get('xpath', '')
-            op_item_xpath = self._generate_xpath_for_item(op_xpath, order_index, xpath_pattern)
-            op_copy = op.copy()
-            op_copy['xpath'] = op_item_xpath
+            # 暂停或验证码期间阻塞等待解除（不轮询）
+            if self.run_control.is_blocked() and not self.run_control.wait_until_clear():
+                return False
             
             try:
-                result = self._execute_operation(op_copy)
+                # 步骤的处理函数在编译时按操作类型确定（getText优先使用整页批量预取的文本）
+                result = step.handler(step, order_index, plan, last_slot)
                 if result is not None:
-                    order_data[op['name']] = result
+                    order_data[step.name] = result
+                
+                # 断点续采：已采集过的订单不再执行后续操作
+                if self._should_skip_collected_order(order_data):
+                    self._log_info(f"[断点续采] 订单 {order_data['订单编号']} 已采集，跳过", "blue")
+                    return True
                     
-                # 如果"点击前确认"未勾选，每个操作后添加延迟
+                # 如果"点击前确认"未勾选，每个操作后等待页面静止（操作间延迟作为最长等待时间）
                 if hasattr(self, 'confirm_click') and not self.confirm_click.get():
-                    import time
-                    time.sleep(self.auto_action_interval if hasattr(self, 'auto_action_interval') else 1.0)
+                    self._wait_page_settled(self.auto_action_interval if hasattr(self, 'auto_action_interval') else 1.0)
                     
             except Exception as e:
-                self._log_info(f"执行'{op['name']}'操作失败: {str(e)}", "red")
+                self._log_info(f"执行'{step.name}'操作失败: {str(e)}", "red")
         
         # 检查是否成功采集了订单数据
         if order_data:
             # 获取订单ID
             current_order_id = order_data.get('订单编号', '')
+            self._last_processed_order_id = current_order_id or None
             
-            # 写入订单基础数据到缓存
+            # 写入订单基础数据到缓存（流水线后台执行，不阻塞下一个订单）
             if current_order_id:
-                self.cache_manager.write_order_data(current_order_id, order_data=order_data)
+                self.order_pipeline.submit(self.cache_manager.write_order_data, current_order_id, order_data=dict(order_data))
             
             # 如果包含收货信息，同时写入收货信息
             if '复制完整收货信息' in order_data or '复制完整的收货信息' in order_data:
                 if current_order_id and isinstance(current_order_id, str):
                     shipping_info = order_data.get('复制完整收货信息') or order_data.get('复制完整的收货信息')
                     if shipping_info:
-                        # 写入到数据缓存
-                        self.cache_manager.write_order_data(current_order_id, shipping_info=shipping_info)
+                        # 写入到数据缓存（流水线后台执行）
+                        self.order_pipeline.submit(self.cache_manager.write_order_data, current_order_id, shipping_info=shipping_info)
                         self._log_info(f"已建立订单ID与收货信息的直接关联: {current_order_id}", "green")
                         
                         # 保持向后兼容性
@@ -2159,198 +2499,226 @@ class DataProcessor:
             self.use_modular_paging = False
             
 
+    EXPORT_SHIPPING_FIELD = '复制完整收货信息'  # 导出时收货信息的字段名
+    # 导出时需要合并的重复字段：目标字段 -> 来源字段（优先使用第一个非空值）
+    EXPORT_MERGE_COLUMNS = {
+        '复制完整收货信息': ['复制完整收货信息', '复制完整的收货信息'],
+        # 可以在这里添加其他需要合并的列
+    }
+    PRODUCT_NAME_FIELDS = ['商品名称', '商品', '产品名称', '产品', '商品信息']
+    
+    def _has_export_data(self):
+        """是否有可导出的订单（本次采集的数据或数据缓存中的订单）"""
+        if getattr(self, 'collected_data', None):
+            return True
+        return self.cache_manager.get_cache_stats()["total_orders"] > 0
+    
     def _check_shipping_info_before_export(self):
-        """检查并尝试修复收货信息字段，使用数据缓存管理器（只读权限）"""
-        # 从数据缓存读取所有订单数据（只读权限）
-        cached_orders = self.cache_manager.read_all_orders()
+        """导出前准备：把延迟刷盘的修改写入存储并确认数据缓存中有订单（收货信息在 _iter_export_orders 中逐条修复）"""
+        self.cache_manager.flush()
         
-        if not cached_orders:
+        # 缓存为空时直接返回，保留内存中已有的collected_data和order_clipboard_contents
+        if self.cache_manager.get_cache_stats()["total_orders"] == 0:
             self._log_info("数据缓存中没有订单数据可以导出", "red")
             from tkinter import messagebox
             messagebox.showwarning("导出失败", "数据缓存中没有订单数据，请先采集数据。")
             return False
-            
-        field_name = '复制完整收货信息'  # 收货信息字段名
-        fixed_count = 0
-        
-        # 输出缓存统计信息
-        orders_with_shipping = self.cache_manager.get_orders_with_shipping_info()
-        self._log_info(f"数据缓存统计: 总订单数={len(cached_orders)}, 包含收货信息的订单数={len(orders_with_shipping)}", "blue")
         
-        # 确保collected_data存在并从缓存重建
-        if not hasattr(self, 'collected_data'):
-            self.collected_data = []
-        
-        # 从缓存重建collected_data（只读操作）
-        self.collected_data.clear()
-        for order_id, cached_data in cached_orders.items():
-            # 创建订单数据副本，排除系统字段
-            system_fields = {"order_id", "created_at", "updated_at", "status", "shipping_info", "shipping_info_updated_at"}
-            order_data = {k: v for k, v in cached_data.items() if k not in system_fields}
-            
-            # 如果缓存中有收货信息，添加到订单数据中
-            if "shipping_info" in cached_data and cached_data["shipping_info"]:
-                order_data[field_name] = cached_data["shipping_info"]
-                fixed_count += 1
-            
-            if order_data:  # 确保有数据才添加
-                self.collected_data.append(order_data)
-        
-        # 保持向后兼容性，更新order_clipboard_contents
         if not hasattr(self, 'order_clipboard_contents'):
             self.order_clipboard_contents = {}
-        self.order_clipboard_contents.clear()
-        
-        for order_id, shipping_info in orders_with_shipping.items():
-            clean_order_id = order_id.replace('订单编号：', '') if isinstance(order_id, str) else str(order_id)
-            self.order_clipboard_contents[clean_order_id] = shipping_info["shipping_info"]
-        
-        # 检查每个订单的收货信息是否唯一
-        shipping_info_set = set()
-        duplicate_count = 0
+            self._log_info("警告: 导出前发现订单ID与收货信息映射字典不存在，已创建空字典", "red")
+        return True
+    
+    def _iter_export_orders(self, summary=None):
+        """从数据缓存逐条生成导出用的订单记录（只读权限），同时检查并修复收货信息字段
+        
+        每次只在内存中构造一条订单，导出写入方可以边读边写；summary（字典）在遍历结束时包含
+        total（总订单数）、with_shipping_info（缓存中有收货信息的订单数）、fixed（修复数）、duplicates（重复数）
+        """
+        field_name = self.EXPORT_SHIPPING_FIELD
+        if summary is None:
+            summary = {}
+        summary.update(total=0, with_shipping_info=0, fixed=0, duplicates=0)
+        seen_shipping_info = set()  # 已出现的收货信息的哈希值，用于检测重复
         
-        for order_data in self.collected_data:
-            # 获取当前订单ID
-            order_id = order_data.get('订单编号', '')
-            if isinstance(order_id, str) and order_id.startswith('订单编号：'):
-                order_id = order_id.replace('订单编号：', '')
+        self._log_info("导出前检查收货信息字段内容:", "blue")
+        for order_id, order_data in self.cache_manager.iter_orders(exclude_fields=SYSTEM_FIELDS - {"shipping_info"}):
+            summary["total"] += 1
+            shipping_info = order_data.pop("shipping_info", None)
+            
+            # 如果缓存中有收货信息，添加到订单数据中，并保持向后兼容性更新order_clipboard_contents
+            if shipping_info:
+                order_data[field_name] = shipping_info
+                summary["fixed"] += 1
+                summary["with_shipping_info"] += 1
+                clean_order_id = order_id.replace('订单编号：', '') if isinstance(order_id, str) else str(order_id)
+                self.order_clipboard_contents[clean_order_id] = shipping_info
+            
+            if not order_data:  # 确保有数据才导出
+                continue
             
-            self._log_info(f"处理订单: {order_id}", "blue")
+            self._repair_export_shipping_info(order_data, seen_shipping_info, summary)
             
-            # 检查是否存在此字段
-            if field_name in order_data:
-                # 检查内容是否为布尔值或空
-                if order_data[field_name] is True or order_data[field_name] is False or not order_data[field_name]:
-                    self._log_info(f"检测到订单 {order_id} 的无效收货信息字段值: {order_data[field_name]}", "orange")
-                    
-                    # 优先使用订单专属的收货信息
-                    if order_id and order_id in self.order_clipboard_contents:
-                        order_data[field_name] = self.order_clipboard_contents[order_id]
-                        fixed_count += 1
-                        self._log_info(f"使用订单专属收货信息修复: '{self.order_clipboard_contents[order_id][:30]}...'", "green")
-                        
-                        # 检查是否是重复的收货信息
-                        if order_data[field_name] in shipping_info_set:
-                            duplicate_count += 1
-                            self._log_info(f"警告: 订单 {order_id} 的收货信息与其他订单重复", "red")
-                        else:
-                            shipping_info_set.add(order_data[field_name])
-                        
-                        continue
-                    
-                    # 其次尝试使用全局变量
-                    if hasattr(self, 'last_clipboard_content') and self.last_clipboard_content:
-                        order_data[field_name] = self.last_clipboard_content
-                        fixed_count += 1
-                        self._log_info(f"使用全局变量修复了收货信息: '{self.last_clipboard_content[:30]}...'", "green")
-                        continue
-                    
-                    # 最后尝试从剪贴板获取最新内容
-                    import pyperclip
-                    clipboard_content = pyperclip.paste()
-                    if clipboard_content and clipboard_content.strip():
-                        order_data[field_name] = clipboard_content
-                        fixed_count += 1
-                        self._log_info(f"使用剪贴板内容修复了收货信息: '{clipboard_content[:30]}...'", "green")
-                        continue
-                        
-                    # 如果都失败了，记录一个明确的错误信息
-                    order_data[field_name] = "【收货信息获取失败】"
-                    self._log_info(f"无法修复订单 {order_id} 的收货信息字段，已标记为失败", "red")
+            display_id = order_data.get('订单编号', '')
+            if isinstance(display_id, str) and display_id.startswith('订单编号：'):
+                display_id = display_id.replace('订单编号：', '')
             else:
-                # 如果字段不存在，优先使用订单专属的收货信息
-                if order_id and order_id in self.order_clipboard_contents:
-                    order_data[field_name] = self.order_clipboard_contents[order_id]
-                    fixed_count += 1
-                    self._log_info(f"添加了订单 {order_id} 的专属收货信息: '{self.order_clipboard_contents[order_id][:30]}...'", "green")
-                    continue
-                
-                # 其次尝试使用全局变量
-                elif hasattr(self, 'last_clipboard_content') and self.last_clipboard_content:
-                    order_data[field_name] = self.last_clipboard_content
-                    fixed_count += 1
-                    self._log_info(f"添加了缺失的收货信息字段: '{self.last_clipboard_content[:30]}...'", "green")
+                display_id = str(display_id)
+            value = order_data.get(field_name, "未设置")
+            preview = value[:30] + "..." if isinstance(value, str) and value != "未设置" else str(value)
+            self._log_info(f"记录 {summary['total']}: 订单ID={display_id}, {field_name} = {preview} (类型: {type(value).__name__})", "blue")
+            
+            yield order_data
+        
+        self._log_info(f"数据缓存统计: 总订单数={summary['total']}, 包含收货信息的订单数={summary['with_shipping_info']}", "blue")
+        if summary["fixed"] > 0:
+            self._log_info(f"导出前共修复了 {summary['fixed']} 条收货信息记录", "green")
+        if summary["duplicates"] > 0:
+            self._log_info(f"警告: 检测到 {summary['duplicates']} 个订单的收货信息重复", "red")
+    
+    def _repair_export_shipping_info(self, order_data, seen_shipping_info, summary):
+        """检查单条订单的收货信息字段，无效或缺失时依次用订单专属收货信息、全局变量、剪贴板内容修复"""
+        field_name = self.EXPORT_SHIPPING_FIELD
+        order_id = order_data.get('订单编号', '')
+        if isinstance(order_id, str) and order_id.startswith('订单编号：'):
+            order_id = order_id.replace('订单编号：', '')
+        
+        if field_name in order_data:
+            # 检查内容是否为布尔值或空
+            if not (order_data[field_name] is True or order_data[field_name] is False or not order_data[field_name]):
+                return
+            self._log_info(f"检测到订单 {order_id} 的无效收货信息字段值: {order_data[field_name]}", "orange")
+            
+            # 优先使用订单专属的收货信息
+            if order_id and order_id in self.order_clipboard_contents:
+                order_data[field_name] = self.order_clipboard_contents[order_id]
+                summary["fixed"] += 1
+                self._log_info(f"使用订单专属收货信息修复: '{self.order_clipboard_contents[order_id][:30]}...'", "green")
+                
+                # 检查是否是重复的收货信息
+                digest = hash(order_data[field_name])
+                if digest in seen_shipping_info:
+                    summary["duplicates"] += 1
+                    self._log_info(f"警告: 订单 {order_id} 的收货信息与其他订单重复", "red")
                 else:
-                    # 最后尝试从剪贴板获取
-                    import pyperclip
-                    clipboard_content = pyperclip.paste()
-                    if clipboard_content and clipboard_content.strip():
-                        order_data[field_name] = clipboard_content
-                        fixed_count += 1
-                        self._log_info(f"添加了缺失的收货信息字段: '{clipboard_content[:30]}...'", "green")
-        
-        if fixed_count > 0:
-            self._log_info(f"导出前共修复了 {fixed_count} 条收货信息记录", "green")
-        
-        if duplicate_count > 0:
-            self._log_info(f"警告: 检测到 {duplicate_count} 个订单的收货信息重复", "red")
+                    seen_shipping_info.add(digest)
+                return
             
-        # 导出前检查收货信息字段内容
-        self._log_info("导出前检查收货信息字段内容:", "blue")
-        for i, order_data in enumerate(self.collected_data):
-            order_id = order_data.get('订单编号', '')
-            if isinstance(order_id, str) and order_id.startswith('订单编号：'):
-                order_id = order_id.replace('订单编号：', '')
-            else:
-                order_id = str(order_id)
-                
-            shipping_info = order_data.get(field_name, "未设置")
-            shipping_info_type = type(shipping_info).__name__
-            shipping_info_preview = shipping_info[:30] + "..." if isinstance(shipping_info, str) and shipping_info != "未设置" else str(shipping_info)
+            # 其次尝试使用全局变量
+            if hasattr(self, 'last_clipboard_content') and self.last_clipboard_content:
+                order_data[field_name] = self.last_clipboard_content
+                summary["fixed"] += 1
+                self._log_info(f"使用全局变量修复了收货信息: '{self.last_clipboard_content[:30]}...'", "green")
+                return
             
-            print(f"DEBUG-EXPORT-CHECK-{i+1}: 订单ID '{order_id}', {field_name} = {shipping_info_preview} (类型: {shipping_info_type})")
-            self._log_info(f"记录 {i+1}: 订单ID={order_id}, {field_name} = {shipping_info_preview} (类型: {shipping_info_type})", "blue")
+            # 最后尝试从剪贴板获取最新内容
+            import pyperclip
+            clipboard_content = pyperclip.paste()
+            if clipboard_content and clipboard_content.strip():
+                order_data[field_name] = clipboard_content
+                summary["fixed"] += 1
+                self._log_info(f"使用剪贴板内容修复了收货信息: '{clipboard_content[:30]}...'", "green")
+                return
             
-        return fixed_count > 0
-
-
-
+            # 如果都失败了，记录一个明确的错误信息
+            order_data[field_name] = "【收货信息获取失败】"
+            self._log_info(f"无法修复订单 {order_id} 的收货信息字段，已标记为失败", "red")
+        else:
+            # 如果字段不存在，优先使用订单专属的收货信息
+            if order_id and order_id in self.order_clipboard_contents:
+                order_data[field_name] = self.order_clipboard_contents[order_id]
+                summary["fixed"] += 1
+                self._log_info(f"添加了订单 {order_id} 的专属收货信息: '{self.order_clipboard_contents[order_id][:30]}...'", "green")
+            # 其次尝试使用全局变量
+            elif hasattr(self, 'last_clipboard_content') and self.last_clipboard_content:
+                order_data[field_name] = self.last_clipboard_content
+                summary["fixed"] += 1
+                self._log_info(f"添加了缺失的收货信息字段: '{self.last_clipboard_content[:30]}...'", "green")
+            else:
+                # 最后尝试从剪贴板获取
+                import pyperclip
+                clipboard_content = pyperclip.paste()
+                if clipboard_content and clipboard_content.strip():
+                    order_data[field_name] = clipboard_content
+                    summary["fixed"] += 1
+                    self._log_info(f"添加了缺失的收货信息字段: '{clipboard_content[:30]}...'", "green")
+    
+    def _merge_export_fields(self, order_data, merge_targets=None):
+        """合并重复字段（如'复制完整收货信息'和'复制完整的收货信息'），优先使用非空值，只保留目标字段
+        
+        merge_targets为需要合并的目标字段集合，为None时只合并该订单中同时存在多个来源字段的字段组
+        """
+        for target_col, source_cols in self.EXPORT_MERGE_COLUMNS.items():
+            existing_cols = [col for col in source_cols if col in order_data]
+            if merge_targets is not None:
+                if target_col not in merge_targets or not existing_cols:
+                    continue
+            elif len(existing_cols) <= 1:
+                continue
+            merged_value = ""
+            for col in existing_cols:
+                value = order_data.get(col, "")
+                if value and str(value).strip() and str(value).strip() != "nan":
+                    merged_value = value
+                    break
+            for col in existing_cols:
+                order_data.pop(col, None)
+            order_data[target_col] = merged_value
+        return order_data
+    
+    def _product_name_of(self, order_data):
+        """订单的商品名称（从多个可能的字段中获取），没有时为"未知商品\""""
+        product_name = None
+        for field_name in self.PRODUCT_NAME_FIELDS:
+            if field_name in order_data and order_data[field_name]:
+                product_name = str(order_data[field_name]).strip()
+                break
+        if not product_name or product_name == "nan":
+            product_name = "未知商品"
+        return product_name
     
     def _export_excel(self):
-        """导出数据到Excel（正常模式专用）"""
-        # 检查pandas依赖
-        if pd is None:
-            self._log_info("pandas模块未正确导入，请安装: pip install pandas", "red")
-            messagebox.showerror("错误", "pandas模块未安装，无法导出Excel文件")
-            return
-            
+        """导出数据到Excel（正常模式专用）
+        
+        用openpyxl的只写模式逐行写入：第一遍只读取缓存中的字段名和商品名称确定表头，
+        第二遍逐条修复收货信息并写入，内存中不保留全部订单
+        """
         # 确保是在正常模式下使用此功能
         if self.collection_mode.get() != "正常模式":
             messagebox.showinfo("提示", "Excel导出功能仅在正常模式下可用")
             return
-            
-        if len(self.collected_data) == 0:
+        
+        if not self._has_export_data():
             messagebox.showinfo("提示", "没有可导出的数据")
             return
         
-        # 确保order_clipboard_contents字典存在
-        if not hasattr(self, 'order_clipboard_contents'):
-            self.order_clipboard_contents = {}
-            self._log_info("警告: 导出前发现订单ID与收货信息映射字典不存在，已创建空字典", "red")
-            print("DEBUG-EXPORT-EXCEL-ERROR: 订单ID与收货信息映射字典不存在，已创建空字典")
-            
-        # 检查并尝试修复收货信息
-        self._check_shipping_info_before_export()
-        
-        # 导出前显示详细统计信息
-        self._log_info(f"=== 导出统计信息 ===", "blue")
-        self._log_info(f"总共采集到 {len(self.collected_data)} 个订单记录", "blue")
+        if not self._check_shipping_info_before_export():
+            return
         
-        # 按商品名称统计
+        # 第一遍：确定表头（按字段首次出现的顺序）并按商品名称统计
+        columns = {}
         product_stats = {}
-        for order_data in self.collected_data:
-            product_name = None
-            for field_name in ['商品名称', '商品', '产品名称', '产品', '商品信息']:
-                if field_name in order_data and order_data[field_name]:
-                    product_name = str(order_data[field_name]).strip()
-                    break
-            if not product_name or product_name == "nan":
-                product_name = "未知商品"
-            
-            if product_name not in product_stats:
-                product_stats[product_name] = 0
-            product_stats[product_name] += 1
+        total_orders = 0
+        for _, order_data in self.cache_manager.iter_orders(exclude_fields=SYSTEM_FIELDS):
+            total_orders += 1
+            columns.update(dict.fromkeys(order_data))
+            product_name = self._product_name_of(order_data)
+            product_stats[product_name] = product_stats.get(product_name, 0) + 1
+        columns[self.EXPORT_SHIPPING_FIELD] = None  # 收货信息从缓存的shipping_info字段导出
+        merge_targets = set()
+        for target_col, source_cols in self.EXPORT_MERGE_COLUMNS.items():
+            existing_cols = [col for col in source_cols if col in columns]
+            if len(existing_cols) > 1:
+                self._log_info(f"检测到重复列: {existing_cols}，将合并为: {target_col}", "blue")
+                merge_targets.add(target_col)
+                for col in existing_cols:
+                    if col != target_col:
+                        columns.pop(col, None)
+        header = list(columns)
         
+        # 导出前显示详细统计信息
+        self._log_info(f"=== 导出统计信息 ===", "blue")
+        self._log_info(f"总共采集到 {total_orders} 个订单记录", "blue")
         for product_name, count in product_stats.items():
             self._log_info(f"  - {product_name}: {count} 个订单", "blue")
         self._log_info(f"=== 统计信息结束 ===", "blue")
@@ -2384,48 +2752,20 @@ class DataProcessor:
             if not file_path:
                 return
             
-            # 创建数据框架，支持新的字典格式
-            # 从collected_data创建DataFrame，每个订单一行
-            df = pd.DataFrame(self.collected_data)
-            
-            # 检测并去重重复的列（如'复制完整收货信息'和'复制完整的收货信息'）
-            duplicate_columns = []
-            columns_to_merge = {
-                '复制完整收货信息': ['复制完整收货信息', '复制完整的收货信息'],
-                # 可以在这里添加其他需要合并的列
-            }
-            
-            for target_col, source_cols in columns_to_merge.items():
-                existing_cols = [col for col in source_cols if col in df.columns]
-                if len(existing_cols) > 1:
-                    self._log_info(f"检测到重复列: {existing_cols}，将合并为: {target_col}", "blue")
-                    # 合并列数据，优先使用非空值
-                    merged_data = []
-                    for index, row in df.iterrows():
-                        merged_value = ""
-                        for col in existing_cols:
-                            value = row.get(col, "")
-                            if value and str(value).strip() and str(value).strip() != "nan":
-                                merged_value = value
-                                break
-                        merged_data.append(merged_value)
-                    
-                    # 添加合并后的列
-                    df[target_col] = merged_data
-                    
-                    # 标记要删除的重复列
-                    duplicate_columns.extend(existing_cols)
-            
-            # 删除重复列
-            if duplicate_columns:
-                # 保留目标列，删除源列
-                cols_to_drop = [col for col in duplicate_columns if col in columns_to_merge.keys() and col in df.columns]
-                remaining_cols_to_drop = [col for col in duplicate_columns if col not in columns_to_merge.keys()]
-                df = df.drop(columns=remaining_cols_to_drop)
-                self._log_info(f"已删除重复列: {remaining_cols_to_drop}", "green")
-            
-            # 导出到Excel
-            df.to_excel(file_path, index=False)
+            # 第二遍：逐条写入，每个订单一行
+            workbook = openpyxl.Workbook(write_only=True)
+            sheet = workbook.create_sheet()
+            sheet.append(header)
+            for order_data in self._iter_export_orders():
+                self._merge_export_fields(order_data, merge_targets)
+                row = []
+                for col in header:
+                    value = order_data.get(col)
+                    if value is not None and not isinstance(value, (str, int, float, bool)):
+                        value = str(value)
+                    row.append(value)
+                sheet.append(row)
+            workbook.save(file_path)
             self._log_info(f"Excel导出成功: {file_path}", "green")
         except Exception as e:
             self._log_info(f"Excel导出失败: {str(e)}", "red")
@@ -2433,7 +2773,10 @@ class DataProcessor:
             self._log_info(traceback.format_exc(), "red")
     
     def _export_word(self):
-        """导出数据到Word（正常模式专用）- Markdown格式，按商品名称分组"""
+        """导出数据到Word（正常模式专用）- Markdown格式，按商品名称分组
+        
+        订单从数据缓存逐条读取；Word文档本身在保存前整体保存在内存中，按商品分组也需要保留全部订单
+        """
         # 检查docx依赖
         if Document is None:
             self._log_info("python-docx模块未正确导入，请安装: pip install python-docx", "red")
@@ -2445,18 +2788,12 @@ class DataProcessor:
             messagebox.showinfo("提示", "Word导出功能仅在正常模式下可用")
             return
             
-        if len(self.collected_data) == 0:
+        if not self._has_export_data():
             messagebox.showinfo("提示", "没有可导出的数据")
             return
-            
-        # 确保order_clipboard_contents字典存在
-        if not hasattr(self, 'order_clipboard_contents'):
-            self.order_clipboard_contents = {}
-            self._log_info("警告: 导出前发现订单ID与收货信息映射字典不存在，已创建空字典", "red")
-            print("DEBUG-EXPORT-WORD-ERROR: 订单ID与收货信息映射字典不存在，已创建空字典")
-            
-        # 检查并尝试修复收货信息
-        self._check_shipping_info_before_export()
+        
+        if not self._check_shipping_info_before_export():
+            return
         
         try:
             file_path = filedialog.asksaveasfilename(
@@ -2477,56 +2814,11 @@ class DataProcessor:
             timestamp = doc.add_paragraph(f"生成时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
             timestamp.alignment = 1  # 居中对齐
             
-            # 处理重复字段的去重逻辑
-            columns_to_merge = {
-                '复制完整收货信息': ['复制完整收货信息', '复制完整的收货信息'],
-                # 可以在这里添加其他需要合并的列
-            }
-            
-            # 创建处理后的数据副本
-            processed_data = []
-            for order_data in self.collected_data:
-                processed_order = order_data.copy()
-                
-                # 处理每个需要合并的字段组
-                for target_col, source_cols in columns_to_merge.items():
-                    existing_cols = [col for col in source_cols if col in processed_order]
-                    if len(existing_cols) > 1:
-                        # 合并字段数据，优先使用非空值
-                        merged_value = ""
-                        for col in existing_cols:
-                            value = processed_order.get(col, "")
-                            if value and str(value).strip() and str(value).strip() != "nan":
-                                merged_value = value
-                                break
-                        
-                        # 设置合并后的值
-                        processed_order[target_col] = merged_value
-                        
-                        # 删除重复的源字段（保留目标字段）
-                        for col in existing_cols:
-                            if col != target_col:
-                                processed_order.pop(col, None)
-                
-                processed_data.append(processed_order)
-            
-            # 按商品名称分组数据
+            # 逐条读取订单，合并重复字段并按商品名称分组
             grouped_data = {}
-            for order_data in processed_data:
-                # 尝试从多个可能的字段中获取商品名称
-                product_name = None
-                for field_name in ['商品名称', '商品', '产品名称', '产品', '商品信息']:
-                    if field_name in order_data and order_data[field_name]:
-                        product_name = str(order_data[field_name]).strip()
-                        break
-                
-                # 如果没有找到商品名称，使用默认分组
-                if not product_name or product_name == "nan":
-                    product_name = "未知商品"
-                
-                if product_name not in grouped_data:
-                    grouped_data[product_name] = []
-                grouped_data[product_name].append(order_data)
+            for order_data in self._iter_export_orders():
+                processed_order = self._merge_export_fields(order_data)
+                grouped_data.setdefault(self._product_name_of(processed_order), []).append(processed_order)
             
             # 按商品名称排序
             sorted_products = sorted(grouped_data.keys())
@@ -2543,11 +2835,7 @@ class DataProcessor:
                 for i, order_data in enumerate(orders):
                     total_order_count += 1
                     # 始终添加订单序号，使用全局计数器确保唯一性
-                    if len(orders) > 1:
-                        order_heading = doc.add_heading(f"订单 {total_order_count}", level=3)
-                    else:
-                        # 即使只有一个订单，也显示序号以保持一致性
-                        order_heading = doc.add_heading(f"订单 {total_order_count}", level=3)
+                    order_heading = doc.add_heading(f"订单 {total_order_count}", level=3)
                     
                     # 以markdown格式添加订单详细信息
                     for field_name, field_value in order_data.items():
@@ -2578,24 +2866,18 @@ class DataProcessor:
             self._log_info(f"详细错误信息: {traceback.format_exc()}", "red")
     
     def _export_json(self):
-        """导出数据到JSON（采集模式专用）"""
+        """导出数据到JSON（采集模式专用），订单从数据缓存逐条读取并逐条写入文件"""
         # 确保是在采集模式下使用此功能
         if self.collection_mode.get() != "采集模式":
             messagebox.showinfo("提示", "JSON导出功能仅在采集模式下可用")
             return
             
-        if not hasattr(self, 'collected_data') or len(self.collected_data) == 0:
+        if not self._has_export_data():
             messagebox.showinfo("提示", "没有可导出的数据")
             return
-            
-        # 确保order_clipboard_contents字典存在
-        if not hasattr(self, 'order_clipboard_contents'):
-            self.order_clipboard_contents = {}
-            self._log_info("警告: 导出前发现订单ID与收货信息映射字典不存在，已创建空字典", "red")
-            print("DEBUG-EXPORT-JSON-ERROR: 订单ID与收货信息映射字典不存在，已创建空字典")
-            
-        # 检查并尝试修复收货信息
-        self._check_shipping_info_before_export()
+        
+        if not self._check_shipping_info_before_export():
+            return
             
         try:
             file_path = filedialog.asksaveasfilename(
@@ -2605,10 +2887,9 @@ class DataProcessor:
             if not file_path:
                 return
                 
-            # 导出数据，确保JSON友好
-            import json
+            # 导出数据，确保JSON友好（格式与 json.dump(列表, indent=2) 相同）
             with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.collected_data, f, ensure_ascii=False, indent=2)
+                write_json_array(f, self._iter_export_orders())
                 
             self._log_info(f"JSON导出成功: {file_path}", "green")
         except Exception as e:
@@ -2622,9 +2903,13 @@ class DataProcessor:
         self._last_offset_x = offset_x  # 初始化为当前元素的偏移量
         self._last_offset_y = offset_y
         result = {'ok': -1}
+        decided = threading.Event()  # 对话框处理完毕（点击和保存偏移量都在界面线程完成）后设置
+        dialog = {}
         
         def show_dialog():
-            win = tk.Toplevel(self.root)
+            if decided.is_set():
+                return  # 采集线程已放弃等待
+            win = dialog['win'] = tk.Toplevel(self.root)
             win.title('请验证鼠标位置')
             win.geometry('350x220')
             win.transient(self.root)
@@ -2639,6 +2924,8 @@ class DataProcessor:
                 offset_label.config(text=f'当前偏移: X={self._last_offset_x}, Y={self._last_offset_y}')
             
             def on_ok():
+                if decided.is_set():
+                    return  # 采集线程已放弃等待，不再点击
                 result['ok'] = 1
                 
                 # 保存当前偏移量为元素特定的偏移量
@@ -2662,6 +2949,7 @@ class DataProcessor:
                 self._manage_focus()
                 self.root.after(100, self._manage_focus)
                 self._log_info("已尝试恢复主窗口焦点", "blue")
+                self.run_control.signal(decided)
                 
             def on_fail():
                 result['ok'] = 0
@@ -2670,6 +2958,9 @@ class DataProcessor:
                 self._manage_focus()
                 self.root.after(100, self._manage_focus)
                 self._log_info("已尝试恢复主窗口焦点", "blue")
+                self.run_control.signal(decided)
+            
+            win.protocol("WM_DELETE_WINDOW", on_fail)  # 关闭窗口按位置不准处理，避免采集线程一直等待
                 
             btn_frame = ttk.Frame(win)
             btn_frame.pack(pady=10)
@@ -2716,11 +3007,20 @@ class DataProcessor:
             
             win.focus_set()
             
-        self.root.after(0, show_dialog)
-        # 阻塞等待用户操作
-        while result['ok'] == -1:
-            self.root.update()
-            time.sleep(0.05)
+        def close_dialog():
+            if dialog.get('win') is not None:
+                try:
+                    dialog['win'].destroy()
+                except tk.TclError:
+                    pass
+        
+        # 对话框由界面线程创建和处理，采集线程阻塞到用户处理完毕或采集停止（停止时按位置不准处理）
+        self.run_control.post(show_dialog)
+        if not self.run_control.wait_event(decided):
+            self.run_control.signal(decided)  # 对话框尚未显示时不再显示，已显示时忽略之后的"位置准确"
+            self.run_control.post(close_dialog)
+            self._log_info(f"采集已停止，取消'{remark}'的位置验证", "orange")
+            return False
         
         return result['ok'] == 1
     
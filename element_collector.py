@@ -453,7 +453,19 @@ class ElementCollector:
         self._pending_collect = 'scroll_container'
 
 
-    def _start_collection(self):
+    def _resume_collection(self):
+        """断点续采：从上次中断的检查点继续自动采集"""
+        if self.collection_mode.get() != "正常模式":
+            messagebox.showinfo("提示", "断点续采仅在正常模式下可用")
+            return
+        if getattr(self, 'is_running', False):
+            return
+        if self.run_checkpoint.load() is None:
+            messagebox.showinfo("提示", "没有可以恢复的采集进度")
+            return
+        self._start_collection(resume=True)
+    
+    def _start_collection(self, resume=False):
         # 启动验证码检测（如果已配置）
         if hasattr(self, 'template_images') and (self.template_images or self.use_mask_detection):
             if hasattr(self, 'target_window_handle') and self.target_window_handle:
@@ -490,7 +502,10 @@ class ElementCollector:
             order_count_elements = [op for op in self.operation_sequence if op.get("is_order_count", False)]
             manual_order_count = None
             
-            if not order_count_elements:
+            if resume:
+                # 断点续采使用检查点中记录的订单总数
+                self._log_info("从检查点恢复采集...", "green")
+            elif not order_count_elements:
                 # 没有订单数量元素，需要手动输入订单数量
                 self._log_info("未选择订单数量元素，将手动输入订单数量", "blue")
                 try:
@@ -515,7 +530,7 @@ class ElementCollector:
             self.continue_button.config(state=tk.DISABLED)
             self.stop_button.config(state=tk.NORMAL)
             self.configure_button.config(state=tk.DISABLED)
-            threading.Thread(target=self.run_actions_loop, args=(manual_order_count,), daemon=True).start()
+            threading.Thread(target=self.run_actions_loop, args=(manual_order_count, resume), daemon=True).start()
         elif mode == "采集模式":
             # 确保order_clipboard_contents字典已初始化
             if not hasattr(self, 'order_clipboard_contents'):
@@ -560,6 +575,13 @@ class ElementCollector:
         self.pause_button.config(state=tk.NORMAL)
         self.continue_button.config(state=tk.DISABLED)
     
+    def _on_run_state_changed(self):
+        """运行状态变化后刷新暂停/继续按钮（验证码自动暂停、快捷键等），界面线程执行"""
+        if not self.is_running:
+            return
+        self.pause_button.config(state=tk.DISABLED if self.is_paused else tk.NORMAL)
+        self.continue_button.config(state=tk.NORMAL if self.is_paused else tk.DISABLED)
+    
     def _stop_collection(self):
         if not self.is_running:
             return
@@ -578,15 +600,30 @@ class ElementCollector:
         # 保存当前的剪贴板映射
         self._save_clipboard_mappings()
         
+        # 持久化数据缓存和坐标缓存中尚未刷盘的修改
+        if hasattr(self, 'order_pipeline'):
+            self.order_pipeline.drain()  # 先完成流水线中尚未执行的缓存写入
+        if hasattr(self, 'cache_manager'):
+            self.cache_manager.flush()
+        if hasattr(self, 'coordinate_cache'):
+            self.coordinate_cache.flush()
+        if hasattr(self, 'run_checkpoint'):
+            self.run_checkpoint.sync()
+        get_retry_event_logger().flush()
+        
         # 删除辅助定位相关状态重置
-        # 更新按钮状态
+        # 更新按钮状态（可能由采集线程调用，交给界面线程执行）
+        self.run_control.post(self._refresh_buttons_after_stop)
+
+    def _refresh_buttons_after_stop(self):
+        """采集停止后恢复按钮状态（界面线程执行）"""
         self.start_button.config(state=tk.NORMAL)
         self.pause_button.config(state=tk.DISABLED)
         self.continue_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.DISABLED)
         self.configure_button.config(state=tk.NORMAL if self.is_browser_connected else tk.DISABLED)
         # 如果有数据，根据模式启用不同导出按钮
-        if hasattr(self, 'collected_data') and len(self.collected_data) > 0:
+        if self._has_export_data():
             if self.collection_mode.get() == "正常模式":
                 self.excel_button.config(state=tk.NORMAL)
                 self.word_button.config(state=tk.NORMAL)
@@ -16,9 +16,11 @@ from captcha_detector import CaptchaDetector
 from page_turner import PageTurner
 from config_manager import ConfigManager
 from retry_manager import RetryManager
-from data_cache_manager import get_cache_manager
+from run_control import RunControl, RunControlState
+from data_cache_manager import get_cache_manager, load_cache_config
 
 class ShippingInfoCollector(
+    RunControlState,
     UIComponents,
     BrowserController,
     ElementCollector,
@@ -53,6 +55,10 @@ class ShippingInfoCollector(
         # 初始化重试管理器 - 新增功能
         self.retry_manager = RetryManager()
         
+        # 界面线程定时执行其他线程投递的界面更新，运行状态变化时刷新按钮
+        self.run_control.on_change = self._on_run_state_changed
+        self._pump_run_control()
+        
         # 设置窗口置顶状态
         self._update_always_on_top()
         
@@ -62,18 +68,26 @@ class ShippingInfoCollector(
         # 加载偏移量配置（按元素名称保存的WASD微调配置）
         self._load_offset_config()
         
-        # 同时清空映射文件，确保不会重新加载旧数据
-        self._save_clipboard_mappings()
-        
-        # 清空数据缓存，确保多模块数据一致性
-        try:
-            cache_manager = get_cache_manager()
-            cache_manager.clear_cache()
-            self._log_info("已清空数据缓存文件", "green")
-        except Exception as e:
-            self._log_info(f"清空数据缓存失败: {e}", "orange")
-        
-        self._log_info("已清空所有历史映射数据和文件，准备收集全新信息", "green")
+        session_config = load_cache_config().get("session", {})
+        if session_config.get("resume_last_session", False) or self.run_checkpoint.load() is not None:
+            # 恢复上次会话：保留数据缓存和映射，中断的采集可以继续
+            # （存在未完成的采集检查点时同样保留，否则续采会把已处理但已被清空的订单跳过）
+            self._resume_last_session()
+        else:
+            # 同时清空映射文件，确保不会重新加载旧数据
+            self._save_clipboard_mappings()
+            
+            # 清空数据缓存，确保多模块数据一致性（清空前先备份上次会话的数据）
+            try:
+                cache_manager = get_cache_manager()
+                if session_config.get("backup_before_clear", True) and cache_manager.get_cache_stats()["total_orders"] > 0:
+                    cache_manager.backup_cache()
+                cache_manager.clear_cache()
+                self._log_info("已清空数据缓存文件", "green")
+            except Exception as e:
+                self._log_info(f"清空数据缓存失败: {e}", "orange")
+            
+            self._log_info("已清空所有历史映射数据和文件，准备收集全新信息", "green")
         
         # 启动时记录日志
         self._log_info("程序已启动，等待操作...", "blue")
@@ -89,9 +103,22 @@ class ShippingInfoCollector(
         self._update_captcha_status_display = UIComponents._update_captcha_status_display.__get__(self)
         self._update_captcha_status_display()
 
+    def _resume_last_session(self):
+        """加载上次会话的数据缓存和订单映射，而不是清空重来"""
+        try:
+            cache_manager = get_cache_manager()
+            self._load_clipboard_mappings()
+            # 上次的订单留在数据缓存中，导出时直接从缓存逐条读取，不在内存中重建列表
+            stats = cache_manager.get_cache_stats()
+            self._log_info(f"已恢复上次会话: {stats['total_orders']} 个订单"
+                           f"（已完成 {stats['completed_orders']} 个，最后更新 {stats['last_updated'] or '无'}）", "green")
+        except Exception as e:
+            self._log_info(f"恢复上次会话失败: {e}", "orange")
+    
     def _init_basic_attributes(self):
         """初始化基本属性"""
-        # 基本运行状态
+        # 基本运行状态（is_running等属性保存在run_control中，采集线程和界面线程共享）
+        self.run_control = RunControl()
         self.auto_action_interval = 1.0
         self.is_running = False
         self.is_paused = False
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+操作执行计划
+
+把操作序列和学习到的XPath模式编译成不可变的步骤列表，每个订单只需拼接XPath并调用步骤的处理函数：
+- XPath在模式所在段预先拆分为前缀/后缀，订单的XPath = 前缀 + DOM索引 + 后缀
+  （规则与 _generate_xpath_for_item 相同：只替换该段的第一个数字索引）
+- 有smart_xpath的操作固定使用smart_xpath，与逐个执行时的优先级一致
+- 偏移量在编译时从element_offsets解析，偏移量配置保存后由调用方重新编译
+- 处理函数在编译时按action解析，未登记的action使用默认处理函数
+"""
+
+import re
+from types import MappingProxyType
+
+_INDEX_RE = re.compile(r'\[\d+\]')
+
+
+def split_item_xpath(base_xpath, pattern):
+    """按XPath模式拆分为 (前缀, 后缀, 索引基数)，该XPath不随订单变化时返回None"""
+    if not pattern or 'diff_segment_index' not in pattern:
+        return None
+    parts = base_xpath.split('/')
+    idx = pattern['diff_segment_index']
+    if len(parts) <= idx:
+        return None
+    segment = parts[idx]
+    match = _INDEX_RE.search(segment)
+    if not match:
+        return None
+    prefix = '/'.join(parts[:idx] + [segment[:match.start()]]) + '['
+    suffix = ']' + '/'.join([segment[match.end():]] + parts[idx + 1:])
+    return prefix, suffix, pattern['start_index'] - 1
+
+
+class PlanStep:
+    """编译后的单个操作（不可变）"""
+
+    __slots__ = ('operation', 'name', 'action', 'handler', 'offsets', '_xpath', '_prefix', '_suffix', '_index_base')
+
+    def __init__(self, operation, handler, offsets, xpath_pattern):
+        init = object.__setattr__
+        init(self, 'operation', MappingProxyType(dict(operation)))
+        init(self, 'name', operation['name'])
+        init(self, 'action', operation.get('action'))
+        init(self, 'handler', handler)
+        init(self, 'offsets', offsets)
+        smart_xpath = operation.get('smart_xpath')
+        xpath = smart_xpath or operation.get('xpath', '')
+        parts = None if smart_xpath else split_item_xpath(xpath, xpath_pattern)
+        init(self, '_xpath', xpath)
+        init(self, '_prefix', parts[0] if parts else None)
+        init(self, '_suffix', parts[1] if parts else None)
+        init(self, '_index_base', parts[2] if parts else 0)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("PlanStep 不可修改")
+
+    def xpath_for(self, slot):
+        """第slot个订单（从1开始）的XPath"""
+        if self._prefix is None:
+            return self._xpath
+        return f"{self._prefix}{self._index_base + slot}{self._suffix}"
+
+
+class OperationPlan:
+    """编译后的操作序列"""
+
+    __slots__ = ('operations', 'xpath_pattern', 'steps', 'text_steps')
+
+    def __init__(self, operations, xpath_pattern, steps):
+        self.operations = operations  # 编译来源，用于判断计划是否仍然适用
+        self.xpath_pattern = xpath_pattern
+        self.steps = tuple(steps)
+        self.text_steps = tuple(step for step in self.steps if step.action == 'getText')
+
+    def matches(self, operations, xpath_pattern):
+        return self.operations is operations and self.xpath_pattern is xpath_pattern
+
+
+def compile_operation_plan(operations, xpath_pattern, element_offsets, handlers, default_handler):
+    """编译操作序列；handlers为 {action: 处理函数}"""
+    steps = []
+    for operation in operations:
+        offset = element_offsets.get(operation['name']) if element_offsets else None
+        offsets = (offset.get('x', 0), offset.get('y', 0)) if offset else (0, 0)
+        handler = handlers.get(operation.get('action'), default_handler)
+        steps.append(PlanStep(operation, handler, offsets, xpath_pattern))
+    return OperationPlan(operations, xpath_pattern, steps)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订单流水线
+
+模块化翻页循环中，把不冲突的工作和当前订单的剪贴板等待重叠执行：
+- 订单 i 等待剪贴板时，后台预取订单 i+1 的页面文本
+- 订单 i-1 的缓存写入和检查点记录在后台按提交顺序执行，不阻塞订单 i
+
+资源所有权约定：
+- 鼠标（pyautogui）、剪贴板和界面只由采集线程使用，后台任务不得访问
+- WebDriver 同一时刻只有一个使用者：后台任务只在 overlap() 期间使用它，
+  此时采集线程只在轮询剪贴板；overlap() 返回前等待后台任务结束，WebDriver 交还采集线程
+- 后台任务由单个线程按提交顺序执行，缓存写入总在同一订单的检查点记录之前完成；
+  清除检查点、停止采集之前调用 drain()
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class OrderPipeline:
+    """订单流水线（单个后台线程，任务按提交顺序执行）"""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="order-pipeline")
+        self._pending = []
+
+    def submit(self, fn, *args, **kwargs):
+        """提交后台任务（缓存写入、检查点记录），按提交顺序执行"""
+        future = self._executor.submit(self._run_job, fn, *args, **kwargs)
+        self._pending = [pending for pending in self._pending if not pending.done()]
+        self._pending.append(future)
+        return future
+
+    def overlap(self, foreground, background):
+        """在采集线程执行foreground（如等待剪贴板）的同时，后台执行background（如预取下一订单）
+
+        返回foreground的结果；返回前等待background结束，保证WebDriver回到单一使用者
+        """
+        future = self._executor.submit(self._run_job, background)
+        try:
+            return foreground()
+        finally:
+            future.result()
+
+    def drain(self):
+        """等待所有已提交的后台任务完成"""
+        pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    @staticmethod
+    def _run_job(fn, *args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            print(f"订单流水线后台任务失败: {e}")
+            return None
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面条件等待
+
+用浏览器内的条件判断代替固定延迟，条件满足立即返回，原来的固定延迟只作为最长等待时间：
+- wait_dom_quiet: 注入 MutationObserver，从开始等待起 DOM 连续 quiet_ms 毫秒没有变化即视为页面已就绪；
+  expect_change=True（点击、滚动等预期会改变页面的操作之后）时还要求开始等待后至少发生过一次变化，
+  页面一直没有变化时等满原来的固定延迟
+- wait_element_ready: 立即滚动元素到视口中央，等待位置连续两帧不变且中心点可点击，直接返回元素位置；
+  超时仍未就绪时返回None，不返回可能已过期的位置
+
+每个等待只有一次 execute_async_script 调用，脚本失败时退回固定延迟
+"""
+
+import time
+
+DOM_QUIET_MS = 200  # DOM静止多久视为页面就绪（毫秒）
+
+_DOM_QUIET_JS = """
+var quietMs = arguments[0], timeoutMs = arguments[1], expectChange = arguments[2];
+var done = arguments[arguments.length - 1];
+var state = window.__collectorDomState;
+if (!state) {
+    // 页面跳转后window被重建，观察器会在下一次等待时重新注入
+    state = window.__collectorDomState = {last: performance.now()};
+    new MutationObserver(function() { state.last = performance.now(); }).observe(
+        document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+var start = performance.now();
+(function check() {
+    var now = performance.now();
+    // 静止时间从开始等待时算起，之前的变化不算作"已静止"
+    var changed = state.last > start;
+    if ((changed || !expectChange) && now - Math.max(state.last, start) >= quietMs) { done(true); return; }
+    if (now - start >= timeoutMs) { done(false); return; }
+    setTimeout(check, Math.min(50, quietMs));
+})();
+"""
+
+_ELEMENT_READY_JS = """
+var element = arguments[0], timeoutMs = arguments[1], behavior = arguments[2];
+var done = arguments[arguments.length - 1];
+element.scrollIntoView({behavior: behavior, block: 'center'});
+var start = performance.now(), last = null;
+(function check() {
+    var rect = element.getBoundingClientRect();
+    var stable = last && rect.left === last.left && rect.top === last.top &&
+                 rect.width === last.width && rect.height === last.height;
+    last = rect;
+    if (stable && rect.width > 0 && rect.height > 0) {
+        var hit = document.elementFromPoint(rect.left + rect.width / 2, rect.top + rect.height / 2);
+        if (hit && (hit === element || element.contains(hit))) {
+            done({left: rect.left, top: rect.top, width: rect.width, height: rect.height});
+            return;
+        }
+    }
+    if (performance.now() - start >= timeoutMs) { done(null); return; }
+    requestAnimationFrame(check);
+})();
+"""
+
+_RECT_JS = """
+var rect = arguments[0].getBoundingClientRect();
+return {left: rect.left, top: rect.top, width: rect.width, height: rect.height};
+"""
+
+
+def wait_dom_quiet(driver, timeout, quiet_ms=DOM_QUIET_MS, expect_change=False):
+    """等待页面DOM静止，最多等待timeout秒；返回是否在超时前静止
+
+    expect_change为True时只有开始等待后页面发生过变化并重新静止才提前返回
+    """
+    started_at = time.time()
+    try:
+        return bool(driver.execute_async_script(_DOM_QUIET_JS, quiet_ms, int(timeout * 1000), bool(expect_change)))
+    except Exception:
+        remaining = timeout - (time.time() - started_at)
+        if remaining > 0:
+            time.sleep(remaining)
+        return False
+
+
+def wait_element_ready(driver, element, timeout, behavior="instant"):
+    """滚动元素到视口中央，等待其位置稳定且可点击，最多等待timeout秒
+
+    返回元素的 getBoundingClientRect 结果；超时仍未就绪时返回None。
+    脚本失败时退回固定延迟，延迟前后两次查询的位置相同且尺寸有效才返回该位置，否则返回None
+    """
+    try:
+        return driver.execute_async_script(_ELEMENT_READY_JS, element, int(timeout * 1000), behavior)
+    except Exception:
+        pass
+    try:
+        driver.execute_script('arguments[0].scrollIntoView({behavior: arguments[1], block: "center"});', element, behavior)
+        before = driver.execute_script(_RECT_JS, element)
+        time.sleep(timeout)
+        after = driver.execute_script(_RECT_JS, element)
+    except Exception:
+        return None
+    if before != after or not after or after['width'] <= 0 or after['height'] <= 0:
+        return None
+    return after
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重试事件日志
+
+retry_events.log 为 JSONL 格式（每行一个事件）。写入由后台线程完成：
+自动化线程只把事件放入有界队列，后台线程批量写入并按文件大小轮转（retry_events.log.1 ... .N）；
+队列满时丢弃事件并计数，不阻塞采集。aggregate_retry_log() 读取日志（含轮转文件）按事件类型汇总次数和耗时
+"""
+
+import os
+import json
+import queue
+import atexit
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+
+class RetryEventLogger:
+    """队列缓冲的后台重试事件日志"""
+
+    def __init__(self, log_file="retry_events.log", max_bytes=5 * 1024 * 1024, backup_count=3,
+                 queue_size=10000, batch_size=200, flush_interval=0.5):
+        self.log_file = log_file
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0  # 队列满时丢弃的事件数
+        self.written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="retry-event-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, log_entry: dict) -> bool:
+        """放入写入队列，队列已满或已关闭时丢弃并返回False"""
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait(log_entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        """后台线程：取出一批事件一次写入"""
+        while True:
+            try:
+                entry = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+            if entry is None:
+                self._queue.task_done()
+                return
+            batch = [entry]
+            while len(batch) < self.batch_size:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    self._queue.put_nowait(None)  # 留给下一轮退出
+                    self._queue.task_done()
+                    break
+                batch.append(entry)
+            self._write_batch(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write_batch(self, batch):
+        lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in batch)
+        try:
+            self._rotate_if_needed()
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(lines)
+            self.written += len(batch)
+        except Exception as e:
+            print(f"写入重试日志失败: {e}")
+
+    def _rotate_if_needed(self):
+        """日志超过 max_bytes 时轮转：log -> log.1 -> log.2 ...，只保留 backup_count 个"""
+        try:
+            if os.path.getsize(self.log_file) < self.max_bytes:
+                return
+        except OSError:
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.log_file}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.log_file}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.log_file, f"{self.log_file}.1")
+        else:
+            os.remove(self.log_file)
+
+    def flush(self):
+        """等待队列中的事件全部写入"""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """写完剩余事件并停止后台线程"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=1.0)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=5.0)
+
+    def get_statistics(self) -> Dict:
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize()
+        }
+
+
+_loggers = {}
+_loggers_lock = threading.Lock()
+
+
+def get_retry_event_logger(log_file="retry_events.log") -> RetryEventLogger:
+    """获取日志文件对应的全局日志对象（首次使用时启动后台线程）"""
+    with _loggers_lock:
+        event_logger = _loggers.get(log_file)
+        if event_logger is None:
+            event_logger = _loggers[log_file] = RetryEventLogger(log_file)
+        return event_logger
+
+
+def _parse_timestamp(value) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def aggregate_retry_log(log_file="retry_events.log", include_rotated=True) -> Dict:
+    """按事件类型汇总重试日志
+
+    耗时优先取事件details中的duration（秒）；没有时取同一元素上一次retry_start到该事件的间隔
+    返回 {事件类型: {"count", "latency_count", "latency_total", "latency_avg", "latency_max"}}
+    """
+    files = []
+    if include_rotated:
+        index = 1
+        while os.path.exists(f"{log_file}.{index}"):
+            files.append(f"{log_file}.{index}")
+            index += 1
+        files.reverse()  # 从最旧的轮转文件开始读
+    files.append(log_file)
+
+    summary = {}
+    pending_starts = {}  # 元素名称 -> retry_start 时间
+    for path in files:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                event_type = entry.get("event_type", "unknown")
+                element_name = entry.get("element_name")
+                timestamp = _parse_timestamp(entry.get("timestamp"))
+                stats = summary.get(event_type)
+                if stats is None:
+                    stats = summary[event_type] = {"count": 0, "latency_count": 0,
+                                                   "latency_total": 0.0, "latency_max": 0.0}
+                stats["count"] += 1
+
+                if event_type == "retry_start":
+                    if timestamp is not None:
+                        pending_starts[element_name] = timestamp
+                    continue
+                details = entry.get("details")
+                latency = details.get("duration") if isinstance(details, dict) else None
+                if not isinstance(latency, (int, float)):
+                    latency = None
+                    start = pending_starts.pop(element_name, None)
+                    if start is not None and timestamp is not None:
+                        latency = timestamp - start
+                if latency is not None:
+                    stats["latency_count"] += 1
+                    stats["latency_total"] += latency
+                    stats["latency_max"] = max(stats["latency_max"], latency)
+
+    for stats in summary.values():
+        stats["latency_avg"] = stats["latency_total"] / stats["latency_count"] if stats["latency_count"] else 0.0
+    return summary
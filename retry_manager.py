@@ -4,22 +4,47 @@
 重试管理器
 
 负责管理验证码后的重试逻辑，包括配置管理、重试策略和状态跟踪
+
+重试历史保存在固定容量的环形缓冲区（history_size 条）中，同时维护总计、按元素的成功/失败计数
+和耗时直方图，统计信息不需要扫描历史，长时间运行时内存占用也保持不变
+
+adaptive_backoff 开启时：
+- 重试延迟按指数退避（retry_delay_seconds * 2^已重试次数）并加随机抖动，单次不超过 retry_timeout_seconds，
+  再按该元素的历史成功率缩放（成功率高等待短，成功率低等待长）；同一订单累计等待超过 retry_timeout_seconds 后不再重试
+- 元素查找策略按该元素近期的成功率和耗时（指数滑动平均，按 (元素名称, 策略) 分别统计）计算期望耗时，
+  期望耗时最短的策略排在前面
 """
 
 import json
 import os
 import time
+import random
+from bisect import bisect_left
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
+from coordinate_policy import get_coordinate_policy
 
 class RetryManager:
     """重试管理器类"""
     
+    DEFAULT_HISTORY_SIZE = 1000
+    # 重试耗时直方图的桶上限（秒），最后一个桶收集超过30秒的记录
+    LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+    STRATEGY_EWMA_ALPHA = 0.2  # 策略成功率/耗时滑动平均的权重，越大越偏向最近的结果
+    
     def __init__(self, config_file="retry_config.json"):
         self.config_file = config_file
         self.config = self._load_config()
+        self.coordinate_policy = get_coordinate_policy()
+        self.coordinate_policy.configure(self.config)  # 坐标缓存共用同一策略对象
         self.retry_attempts = {}
-        self.retry_history = []
+        history_size = self.config["retry_settings"].get("history_size", self.DEFAULT_HISTORY_SIZE)
+        self.retry_history = deque(maxlen=history_size)  # 最近的重试记录，超出容量自动丢弃最旧的
+        self._totals = {"attempts": 0, "successes": 0}
+        self._element_stats = {}  # 元素名称 -> {"successes", "failures", "latency_histogram"}
+        self._strategy_stats = {}  # (元素名称, 策略名称) -> {"success_rate", "duration", "samples"}（滑动平均）
+        self._retry_wait_spent = {}  # 元素_订单序号 -> 实际已等待的重试秒数
     
     def _load_config(self) -> Dict:
         """加载重试配置"""
@@ -43,12 +68,15 @@ class RetryManager:
                 "use_coordinate_cache": True,
                 "cache_expiry_hours": 24,
                 "retry_strategies": [
-                    "cached_coordinates",
+                    "fallback_xpath",
                     "smart_element_search",
-                    "fallback_xpath"
+                    "cached_coordinates"
                 ],
                 "enable_retry_logging": True,
-                "retry_timeout_seconds": 30
+                "retry_timeout_seconds": 30,
+                "history_size": 1000,
+                "adaptive_backoff": True,
+                "backoff_jitter": 0.2
             },
             "coordinate_validation": {
                 "enable_validation": True,
@@ -64,71 +92,131 @@ class RetryManager:
         }
     
     def should_retry(self, element_name: str, order_index: int) -> bool:
-        """判断是否应该重试"""
+        """判断是否应该重试（次数上限；自适应退避时还限制累计等待时间）"""
         key = f"{element_name}_{order_index}"
         attempts = self.retry_attempts.get(key, 0)
         max_attempts = self.config["retry_settings"]["max_retry_attempts"]
-        
-        return attempts < max_attempts
+        if attempts >= max_attempts:
+            return False
+        if self._is_adaptive_backoff_enabled():
+            return self._retry_wait_spent.get(key, 0) < self.get_timeout_seconds()
+        return True
     
-    def record_retry_attempt(self, element_name: str, order_index: int, success: bool) -> None:
-        """记录重试尝试"""
+    def record_retry_attempt(self, element_name: str, order_index: int, success: bool,
+                             duration: Optional[float] = None, strategy: Optional[str] = None) -> None:
+        """记录重试尝试，duration为本次重试耗时（秒），strategy为本次使用的查找策略"""
         key = f"{element_name}_{order_index}"
         self.retry_attempts[key] = self.retry_attempts.get(key, 0) + 1
         
-        # 记录重试历史
+        # 记录重试历史（epoch时间戳，导出时再格式化）
         self.retry_history.append({
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": time.time(),
             "element_name": element_name,
             "order_index": order_index,
             "attempt_number": self.retry_attempts[key],
-            "success": success
+            "success": success,
+            "duration": duration
         })
+        
+        # 更新累计计数和耗时直方图
+        self._totals["attempts"] += 1
+        element_stats = self._element_stats.get(element_name)
+        if element_stats is None:
+            element_stats = self._element_stats[element_name] = {
+                "successes": 0,
+                "failures": 0,
+                "latency_histogram": [0] * (len(self.LATENCY_BUCKETS) + 1)
+            }
+        if success:
+            self._totals["successes"] += 1
+            element_stats["successes"] += 1
+        else:
+            element_stats["failures"] += 1
+        if duration is not None:
+            element_stats["latency_histogram"][bisect_left(self.LATENCY_BUCKETS, duration)] += 1
+        if strategy:
+            self.record_strategy_outcome(element_name, strategy, success, duration)
+    
+    def record_strategy_outcome(self, element_name: str, strategy: str, success: bool,
+                                duration: Optional[float] = None) -> None:
+        """记录一次元素查找策略的结果，更新该元素使用该策略的成功率和耗时的滑动平均"""
+        alpha = self.STRATEGY_EWMA_ALPHA
+        key = (element_name, strategy)
+        stats = self._strategy_stats.get(key)
+        if stats is None:
+            self._strategy_stats[key] = {
+                "success_rate": 1.0 if success else 0.0,
+                "duration": duration or 0.0,
+                "samples": 1
+            }
+            return
+        stats["success_rate"] += alpha * ((1.0 if success else 0.0) - stats["success_rate"])
+        if duration is not None:
+            stats["duration"] += alpha * (duration - stats["duration"])
+        stats["samples"] += 1
+    
+    def _is_adaptive_backoff_enabled(self) -> bool:
+        return self.config["retry_settings"].get("adaptive_backoff", True)
+    
+    def get_retry_delay(self, element_name: str = None, order_index: int = None) -> float:
+        """获取重试延迟时间
+        
+        未开启自适应退避或未指定元素时返回固定的 retry_delay_seconds；
+        否则按已重试次数指数增长、按该元素的成功率缩放并加抖动，不超过 retry_timeout_seconds
+        """
+        settings = self.config["retry_settings"]
+        base_delay = settings["retry_delay_seconds"]
+        if element_name is None or not self._is_adaptive_backoff_enabled():
+            return base_delay
+        
+        key = f"{element_name}_{order_index}"
+        delay = base_delay * (2 ** self.retry_attempts.get(key, 0))
+        
+        # 拉普拉斯平滑的成功率：没有记录时为0.5，对应系数1（即标准指数退避）
+        element_stats = self._element_stats.get(element_name)
+        if element_stats:
+            success_rate = (element_stats["successes"] + 1) / (element_stats["successes"] + element_stats["failures"] + 2)
+            delay *= max(0.25, 2 * (1 - success_rate))
+        
+        jitter = settings.get("backoff_jitter", 0.2)
+        delay *= random.uniform(1 - jitter, 1 + jitter)
+        return round(min(delay, self.get_timeout_seconds()), 2)
+    
+    def record_retry_wait(self, element_name: str, order_index: int, seconds: float) -> None:
+        """记录重试前实际等待的秒数（用于限制同一订单的累计等待时间）"""
+        key = f"{element_name}_{order_index}"
+        self._retry_wait_spent[key] = self._retry_wait_spent.get(key, 0) + seconds
     
-    def get_retry_delay(self) -> float:
-        """获取重试延迟时间"""
-        return self.config["retry_settings"]["retry_delay_seconds"]
+    def get_retry_strategies(self, element_name: str = None) -> List[str]:
+        """获取重试策略列表
+        
+        自适应模式下，该元素已有记录的策略按期望耗时（平均耗时 / 成功率）从短到长重新排列，
+        没有记录的策略保持配置中的位置；未指定元素时按配置顺序
+        """
+        strategies = list(self.config["retry_settings"]["retry_strategies"])
+        if element_name is None or not self._is_adaptive_backoff_enabled() or not self._strategy_stats:
+            return strategies
+        
+        learned_slots = [index for index, strategy in enumerate(strategies)
+                         if (element_name, strategy) in self._strategy_stats]
+        learned = sorted((strategies[index] for index in learned_slots),
+                         key=lambda strategy: self._expected_strategy_cost((element_name, strategy)))
+        for index, strategy in zip(learned_slots, learned):
+            strategies[index] = strategy
+        return strategies
     
-    def get_retry_strategies(self) -> List[str]:
-        """获取重试策略列表"""
-        return self.config["retry_settings"]["retry_strategies"]
+    def _expected_strategy_cost(self, key: Tuple[str, str]) -> float:
+        """(元素名称, 策略) 找到元素的期望耗时：平均耗时 / 成功率（成功率下限0.05，避免除零）"""
+        stats = self._strategy_stats[key]
+        return (stats["duration"] + 0.01) / max(stats["success_rate"], 0.05)
     
     def is_coordinate_cache_enabled(self) -> bool:
         """检查是否启用坐标缓存"""
         return self.config["retry_settings"]["use_coordinate_cache"]
     
     def is_coordinate_valid(self, coord_info: Dict) -> bool:
-        """验证坐标是否有效"""
-        if not self.config["coordinate_validation"]["enable_validation"]:
-            return True
-        
-        try:
-            # 检查成功次数
-            min_success = self.config["coordinate_validation"]["min_success_count"]
-            if coord_info.get("success_count", 0) < min_success:
-                return False
-            
-            # 检查坐标年龄
-            max_age_minutes = self.config["coordinate_validation"]["max_coordinate_age_minutes"]
-            last_success = coord_info.get("last_success")
-            if last_success:
-                last_time = datetime.fromisoformat(last_success)
-                age = datetime.now() - last_time
-                if age.total_seconds() > max_age_minutes * 60:
-                    return False
-            
-            # 检查屏幕边界（如果启用）
-            if self.config["coordinate_validation"]["screen_bounds_check"]:
-                screen_x = coord_info.get("screen_x", 0)
-                screen_y = coord_info.get("screen_y", 0)
-                if screen_x < 0 or screen_y < 0 or screen_x > 3000 or screen_y > 2000:
-                    return False
-            
-            return True
-            
-        except Exception as e:
-            print(f"坐标验证失败: {e}")
-            return False
+        """验证坐标是否可以在重试时使用（规则见coordinate_policy）"""
+        return self.coordinate_policy.is_usable(coord_info)
     
     def reset_retry_attempts(self, element_name: str = None, order_index: int = None) -> None:
         """重置重试计数"""
@@ -136,20 +224,44 @@ class RetryManager:
             key = f"{element_name}_{order_index}"
             if key in self.retry_attempts:
                 del self.retry_attempts[key]
+            self._retry_wait_spent.pop(key, None)
         else:
             self.retry_attempts.clear()
+            self._retry_wait_spent.clear()
     
     def get_retry_statistics(self) -> Dict:
-        """获取重试统计信息"""
-        total_attempts = len(self.retry_history)
-        successful_retries = sum(1 for h in self.retry_history if h["success"])
+        """获取重试统计信息（使用累计计数，不扫描历史）"""
+        total_attempts = self._totals["attempts"]
+        successful_retries = self._totals["successes"]
+        recent_history = [dict(entry, timestamp=datetime.fromtimestamp(entry["timestamp"]).isoformat())
+                          for entry in list(self.retry_history)[-10:]]
+        bucket_labels = [f"<={bound:g}s" for bound in self.LATENCY_BUCKETS] + [f">{self.LATENCY_BUCKETS[-1]:g}s"]
         
         return {
             "total_retry_attempts": total_attempts,
             "successful_retries": successful_retries,
             "success_rate": successful_retries / total_attempts if total_attempts > 0 else 0,
-            "retry_history": self.retry_history[-10:],  # 最近10次重试记录
-            "current_retry_counts": dict(self.retry_attempts)
+            "retry_history": recent_history,  # 最近10次重试记录
+            "current_retry_counts": dict(self.retry_attempts),
+            "element_statistics": {
+                element_name: {
+                    "successes": element_stats["successes"],
+                    "failures": element_stats["failures"],
+                    "latency_histogram": dict(zip(bucket_labels, element_stats["latency_histogram"]))
+                }
+                for element_name, element_stats in self._element_stats.items()
+            },
+            "strategy_statistics": {
+                f"{element_name}|{strategy}": dict(
+                    stats, expected_cost=round(self._expected_strategy_cost((element_name, strategy)), 3))
+                for (element_name, strategy), stats in self._strategy_stats.items()
+            },
+            "strategy_order": {
+                element_name: self.get_retry_strategies(element_name)
+                for element_name in dict.fromkeys(element_name for element_name, _ in self._strategy_stats)
+            },
+            "history_size": len(self.retry_history),
+            "history_capacity": self.retry_history.maxlen
         }
     
     def get_timeout_seconds(self) -> int:
@@ -172,10 +284,10 @@ class RetryManager:
         """检查是否启用重试日志"""
         return self.config["retry_settings"]["enable_retry_logging"]
     
-    def cleanup_old_history(self, max_history_size: int = 1000) -> None:
-        """清理旧的重试历史记录"""
-        if len(self.retry_history) > max_history_size:
-            self.retry_history = self.retry_history[-max_history_size:]
+    def cleanup_old_history(self, max_history_size: int = None) -> None:
+        """调整重试历史容量（环形缓冲区本身已限制大小，累计统计不受影响）"""
+        if max_history_size is not None and max_history_size != self.retry_history.maxlen:
+            self.retry_history = deque(self.retry_history, maxlen=max_history_size)
     
     def export_statistics(self, filename: str = None) -> str:
         """导出重试统计信息"""
@@ -198,6 +310,7 @@ class RetryManager:
         """更新配置"""
         try:
             self.config.update(new_config)
+            self.coordinate_policy.configure(self.config)
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(self.config, f, ensure_ascii=False, indent=2)
             return True
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+采集进度检查点
+
+自动采集每处理完一个订单就记录进度：
+循环模式、页码、页内订单序号、学习到的xpath_pattern（模块化翻页按页记录）、已处理的订单ID，
+以及开始采集时数据缓存的清空代数（缓存在此之后被清空过则不能续采）。
+浏览器崩溃、验证码超时等导致采集中断后，可以从检查点继续，而不必从第1页第1个订单重新开始；
+采集全部完成后检查点会被删除
+
+存储方式与数据缓存的JSON后端一致：run_checkpoint.json 保存检查点快照，
+每个订单只向 run_checkpoint.json.journal 追加一行JSON（按批次fsync），
+加载时以"快照 + 日志重放"得到完整进度；start()/resume() 时把日志合并进快照，clear() 删除两者
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from data_codec import read_data_file, write_data_file
+
+
+class RunCheckpoint:
+    """采集进度检查点"""
+
+    def __init__(self, checkpoint_file="run_checkpoint.json", fsync_batch=20, fsync_interval=1.0):
+        self.checkpoint_file = checkpoint_file
+        self.journal_file_path = checkpoint_file + ".journal"
+        self.fsync_batch = fsync_batch  # 累计多少条日志后执行一次fsync
+        self.fsync_interval = fsync_interval  # 距上次fsync超过多少秒后强制fsync
+        self.data = None
+        self._processed_ids = set()
+        self._journal_file = None
+        self._unsynced_entries = 0
+        self._last_fsync_time = time.time()
+
+    def start(self, mode, total_orders, page_size=None, xpath_pattern=None, cache_epoch=None):
+        """开始新的采集，覆盖旧检查点"""
+        now = datetime.now().isoformat()
+        self.data = {
+            "mode": mode,
+            "total_orders": total_orders,
+            "page_size": page_size,
+            "page": 1,
+            "order_index": 0,
+            "xpath_pattern": xpath_pattern,
+            "page_patterns": {},
+            "cache_epoch": cache_epoch,
+            "processed_order_ids": [],
+            "started_at": now,
+            "updated_at": now
+        }
+        self._processed_ids = set()
+        return self.save()
+
+    def resume(self):
+        """加载已有检查点继续采集，没有检查点时返回None（日志合并进快照）"""
+        data = self.load()
+        if data is None:
+            return None
+        self.data = data
+        self._processed_ids = set(data.get("processed_order_ids", []))
+        self.save()
+        return data
+
+    def record_order(self, page, order_index, order_id=None, xpath_pattern=None):
+        """记录已处理完的订单位置（每个订单处理完成后调用，只追加一行日志）"""
+        if self.data is None:
+            return False
+        entry = {"page": page, "order_index": order_index}
+        if xpath_pattern and self.data.get("page_patterns", {}).get(str(page)) != xpath_pattern:
+            entry["xpath_pattern"] = xpath_pattern
+        if order_id and order_id not in self._processed_ids:
+            entry["order_id"] = order_id
+        entry["updated_at"] = datetime.now().isoformat()
+        self._apply_entry(self.data, entry)
+        if order_id:
+            self._processed_ids.add(order_id)
+        return self._append_journal(entry)
+
+    @staticmethod
+    def _apply_entry(data, entry):
+        """把一条日志记录合并到检查点数据"""
+        data["page"] = entry["page"]
+        data["order_index"] = entry["order_index"]
+        if entry.get("xpath_pattern"):
+            data["xpath_pattern"] = entry["xpath_pattern"]
+            data.setdefault("page_patterns", {})[str(entry["page"])] = entry["xpath_pattern"]
+        if entry.get("order_id"):
+            data.setdefault("processed_order_ids", []).append(entry["order_id"])
+        if entry.get("updated_at"):
+            data["updated_at"] = entry["updated_at"]
+
+    def _append_journal(self, entry):
+        try:
+            if self._journal_file is None:
+                self._journal_file = open(self.journal_file_path, 'ab')
+            line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n"
+            self._journal_file.write(line.encode('utf-8'))
+            self._journal_file.flush()
+            self._unsynced_entries += 1
+            if (self._unsynced_entries >= self.fsync_batch or
+                    time.time() - self._last_fsync_time >= self.fsync_interval):
+                self.sync()
+            return True
+        except Exception as e:
+            print(f"写入采集检查点日志失败: {str(e)}")
+            return False
+
+    def sync(self):
+        """把已追加的日志fsync到磁盘"""
+        if self._journal_file is None or self._unsynced_entries == 0:
+            return
+        try:
+            os.fsync(self._journal_file.fileno())
+        except Exception as e:
+            print(f"同步采集检查点日志失败: {str(e)}")
+        self._unsynced_entries = 0
+        self._last_fsync_time = time.time()
+
+    def _close_journal(self):
+        if self._journal_file is not None:
+            try:
+                self._journal_file.close()
+            except Exception:
+                pass
+            self._journal_file = None
+        self._unsynced_entries = 0
+
+    def page_pattern(self, page):
+        """检查点中记录的某一页的XPath模式（旧版检查点只有最后一页的模式），没有时返回None"""
+        if self.data is None:
+            return None
+        patterns = self.data.get("page_patterns")
+        if patterns:
+            return patterns.get(str(page))
+        return self.data.get("xpath_pattern") if page == self.data.get("page") else None
+
+    def is_processed(self, order_id):
+        """订单是否已在检查点中记录为处理完成"""
+        return order_id in self._processed_ids
+
+    def save(self):
+        """原子性保存检查点快照并清空日志（压缩）"""
+        if self.data is None:
+            return False
+        try:
+            self._close_journal()
+            write_data_file(self.checkpoint_file, self.data, "json")
+            if os.path.exists(self.journal_file_path):
+                os.remove(self.journal_file_path)
+            return True
+        except Exception as e:
+            print(f"保存采集检查点失败: {str(e)}")
+            return False
+
+    def load(self):
+        """读取检查点快照并重放日志，不存在或损坏时返回None"""
+        try:
+            if os.path.exists(self.checkpoint_file):
+                data = read_data_file(self.checkpoint_file)
+                if isinstance(data, dict) and "order_index" in data:
+                    self._replay_journal(data)
+                    return data
+        except Exception as e:
+            print(f"加载采集检查点失败: {str(e)}")
+        return None
+
+    def _replay_journal(self, data):
+        """重放日志；只有末尾可能出现写到一半的行（进程崩溃），遇到无法解析的行即停止"""
+        if not os.path.exists(self.journal_file_path):
+            return
+        with open(self.journal_file_path, 'rb') as f:
+            for raw_line in f:
+                if not raw_line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(raw_line.decode('utf-8'))
+                except (ValueError, UnicodeDecodeError):
+                    break
+                self._apply_entry(data, entry)
+
+    def clear(self):
+        """采集完成后删除检查点（快照和日志）"""
+        self.data = None
+        self._processed_ids = set()
+        self._close_journal()
+        for path in (self.checkpoint_file, self.journal_file_path):
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except Exception as e:
+                print(f"删除采集检查点失败: {str(e)}")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+采集运行控制
+
+自动采集线程、验证码检测线程和界面线程共享的运行状态（运行中、暂停、验证码阻塞、请求重试），
+代替原来的四个普通属性和"while 暂停: sleep; root.update()"轮询循环：
+- 每个状态是一个 threading.Event，状态变化时通知条件变量；采集线程在 wait_until_clear() / sleep() 中阻塞，不占CPU
+- 采集线程不直接调用Tk：界面更新用 post() 放入队列，由界面线程定时调用 dispatch_pending() 执行；
+  需要等待界面结果（对话框）时，界面线程用 signal() 设置事件，采集线程在 wait_event() 中等待
+- 状态变化时向队列投递 on_change 回调，界面据此刷新按钮
+
+RunControlState 把 is_running / is_paused / force_stop_flag / retry_current_order 映射到该对象，
+已有代码读写这些属性的方式不变
+"""
+
+import queue
+import threading
+
+
+class RunControl:
+    """采集运行控制状态"""
+
+    def __init__(self):
+        self.running = threading.Event()
+        self.paused = threading.Event()
+        self.captcha_blocked = threading.Event()
+        self.retry_requested = threading.Event()
+        self.on_change = None  # 状态变化后在界面线程执行的回调
+        self._condition = threading.Condition()
+        self._ui_queue = queue.Queue()
+
+    def set_state(self, event, value):
+        """设置状态并唤醒等待中的线程"""
+        with self._condition:
+            if event.is_set() == bool(value):
+                return
+            if value:
+                event.set()
+            else:
+                event.clear()
+            self._condition.notify_all()
+        if self.on_change is not None:
+            self.post(self.on_change)
+
+    def is_blocked(self):
+        """是否因暂停或验证码而需要等待"""
+        return self.paused.is_set() or self.captcha_blocked.is_set()
+
+    def wait_until_clear(self, timeout=None):
+        """阻塞到暂停和验证码状态都解除（或采集停止），返回是否可以继续执行"""
+        with self._condition:
+            self._condition.wait_for(lambda: not self.running.is_set() or not self.is_blocked(), timeout)
+            return self.running.is_set() and not self.is_blocked()
+
+    def sleep(self, seconds):
+        """可被停止打断的等待，返回采集是否仍在运行"""
+        with self._condition:
+            self._condition.wait_for(lambda: not self.running.is_set(), seconds)
+            return self.running.is_set()
+
+    def signal(self, event):
+        """设置一次性事件（如对话框已处理完毕）并唤醒等待中的线程"""
+        with self._condition:
+            event.set()
+            self._condition.notify_all()
+
+    def wait_event(self, event, timeout=None):
+        """阻塞到event被signal()设置或采集停止，返回event是否已设置"""
+        with self._condition:
+            self._condition.wait_for(lambda: event.is_set() or not self.running.is_set(), timeout)
+            return event.is_set()
+
+    def post(self, callback, *args):
+        """投递到界面线程执行（任意线程可调用）"""
+        self._ui_queue.put((callback, args))
+
+    def dispatch_pending(self, limit=200):
+        """在界面线程执行已投递的回调，单次最多limit个，避免长时间占用事件循环"""
+        for _ in range(limit):
+            try:
+                callback, args = self._ui_queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"执行界面更新失败: {e}")
+
+
+def _state_property(event_name, doc):
+    def getter(self):
+        return getattr(self.run_control, event_name).is_set()
+
+    def setter(self, value):
+        self.run_control.set_state(getattr(self.run_control, event_name), value)
+
+    return property(getter, setter, doc=doc)
+
+
+class RunControlState:
+    """运行状态属性（实际状态保存在 self.run_control 中）"""
+
+    is_running = _state_property("running", "采集是否在运行")
+    is_paused = _state_property("paused", "是否已暂停")
+    force_stop_flag = _state_property("captcha_blocked", "是否因验证码暂停")
+    retry_current_order = _state_property("retry_requested", "验证码消失后是否需要重试当前订单")
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""订单缓存存储后端"""
+
+import json
+import os
+
+from cache_storage import CacheStats, JsonCacheStorage, SqliteCacheStorage, create_storage, migrate_storage
+
+
+def _record(order_id, **fields):
+    record = {"order_id": order_id, "status": "pending", "updated_at": "2024-01-01T00:00:00"}
+    record.update(fields)
+    return record
+
+
+def _json_storage(tmp_path, **kwargs):
+    return JsonCacheStorage(str(tmp_path / "order_data_cache.json"), **kwargs)
+
+
+def test_journal_put_appends_and_reload_replays(tmp_path):
+    storage = _json_storage(tmp_path)
+    storage.load()
+    storage.put("A", _record("A"))
+    storage.put_many({"B": _record("B"), "A": _record("A", status="completed")})
+
+    assert not os.path.exists(storage.path)  # 普通写入不重写快照
+    with open(storage.journal_file_path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 3
+    assert not storage.needs_full_snapshot(1)
+    assert storage.needs_full_snapshot()  # 日志中有未合并的记录
+    storage.close()
+
+    reloaded = _json_storage(tmp_path)
+    orders = reloaded.load()
+    assert orders == {"A": _record("A", status="completed"), "B": _record("B")}
+    assert reloaded.loaded_stats.total == 2
+    assert reloaded.loaded_stats.completed == 1
+
+
+def test_journal_compacts_into_snapshot_at_threshold(tmp_path):
+    storage = _json_storage(tmp_path, compact_threshold=3)
+    orders = storage.load()
+    for order_id in ("A", "B"):
+        orders[order_id] = _record(order_id)
+        storage.put(order_id, orders[order_id])
+    assert storage.needs_full_snapshot(1)  # 下一条写入会触发压缩
+
+    orders["C"] = _record("C")
+    assert storage.put("C", orders["C"], orders)
+    assert os.path.getsize(storage.journal_file_path) == 0
+    assert not storage.has_pending_journal()
+
+    reloaded = _json_storage(tmp_path)
+    assert reloaded.load() == orders
+    assert reloaded.loaded_stats.to_dict() == {
+        "total": 3, "completed": 0, "with_shipping": 0, "potential_duplicates": 0,
+        "last_updated": "2024-01-01T00:00:00"}
+
+
+def test_torn_journal_tail_is_ignored_and_repaired(tmp_path):
+    storage = _json_storage(tmp_path)
+    storage.load()
+    storage.put("A", _record("A"))
+    storage.close()
+    with open(storage.journal_file_path, "ab") as f:
+        f.write(b'{"op":"put","order_id":"B","rec')
+
+    assert _json_storage(tmp_path).load() == {"A": _record("A")}
+
+    repaired = _json_storage(tmp_path)
+    repaired.load(repair_journal=True)
+    repaired.put("C", _record("C"))
+    repaired.close()
+    assert _json_storage(tmp_path).load() == {"A": _record("A"), "C": _record("C")}
+
+
+def test_snapshot_mode_rewrites_and_merges_leftover_journal(tmp_path):
+    journal = _json_storage(tmp_path)
+    journal.load()
+    journal.put("A", _record("A"))
+    journal.close()
+
+    snapshot_only = _json_storage(tmp_path, use_journal=False)
+    orders = snapshot_only.load()  # 遗留日志立即合并进快照
+    assert os.path.getsize(snapshot_only.journal_file_path) == 0
+    assert snapshot_only.needs_full_snapshot(1)
+
+    orders["B"] = _record("B")
+    snapshot_only.put("B", orders["B"], orders)
+    assert _json_storage(tmp_path).load() == {"A": _record("A"), "B": _record("B")}
+
+
+def test_sqlite_put_load_and_clear_bumps_epoch(tmp_path):
+    storage = SqliteCacheStorage(str(tmp_path / "order_data_cache.db"))
+    assert storage.load() == {}
+    epoch = storage.epoch
+    storage.put("A", _record("A", shipping_info="张三 13800000000"))
+    storage.put_many({"B": _record("B"), "A": _record("A", status="completed")})
+    assert not storage.needs_full_snapshot(100)
+    storage.close()
+
+    reopened = SqliteCacheStorage(str(tmp_path / "order_data_cache.db"))
+    assert reopened.load() == {"A": _record("A", status="completed"), "B": _record("B")}
+    assert reopened.clear()
+    assert reopened.epoch == epoch + 1
+    assert reopened.load() == {}
+    reopened.close()
+
+
+def test_create_storage_and_migrate_json_to_sqlite(tmp_path):
+    source = create_storage({"storage": {"json_path": str(tmp_path / "cache.json")}})
+    assert isinstance(source, JsonCacheStorage)
+    source.load()
+    source.put_many({"A": _record("A"), "B": _record("B", shipping_info="李四")})
+    source.close()
+
+    target = create_storage({"storage": {"backend": "sqlite", "sqlite_path": str(tmp_path / "cache.db")}})
+    assert isinstance(target, SqliteCacheStorage)
+    target.put("stale", _record("stale"))
+    assert migrate_storage(source, target) == 2
+    assert target.load() == {"A": _record("A"), "B": _record("B", shipping_info="李四")}
+    target.close()
+
+
+def test_json_poll_changes_reads_only_new_journal_lines(tmp_path):
+    writer = _json_storage(tmp_path)
+    reader = _json_storage(tmp_path)
+    writer.load()
+    reader.load()
+    assert not reader.has_external_changes()
+
+    writer.put("A", _record("A"))
+    assert reader.has_external_changes()
+    assert reader.poll_changes() == {"A": _record("A")}
+    assert not reader.has_external_changes()
+
+    writer.put("B", _record("B"))
+    reader.put("C", _record("C"))  # 追加前先追赶对方的日志，偏移保持一致
+    assert reader.poll_changes() == {"B": _record("B")}
+    assert writer.poll_changes() == {"C": _record("C")}
+    assert not writer.has_external_changes()
+
+
+def test_json_compaction_by_other_process_requires_reload(tmp_path):
+    writer = _json_storage(tmp_path)
+    reader = _json_storage(tmp_path)
+    orders = writer.load()
+    reader.load()
+    orders["A"] = _record("A")
+    writer.put("A", orders["A"])
+    writer.compact(orders)
+
+    assert reader.has_external_changes()
+    assert reader.poll_changes() is None
+    assert reader.load() == orders
+    assert reader.poll_changes() == {}
+
+
+def test_json_compact_keeps_other_process_writes(tmp_path):
+    first = _json_storage(tmp_path)
+    second = _json_storage(tmp_path)
+    first_orders = first.load()
+    second.load()
+    second.put("B", _record("B"))
+    first_orders["A"] = _record("A")
+    first.put("A", first_orders["A"])
+
+    first.compact(first_orders)  # 只有本进程的数据：以磁盘上的完整数据为准
+    assert first.poll_changes() is None
+    assert _json_storage(tmp_path).load() == {"A": _record("A"), "B": _record("B")}
+
+
+def test_sqlite_poll_changes_is_incremental(tmp_path):
+    db_path = str(tmp_path / "order_data_cache.db")
+    writer = SqliteCacheStorage(db_path)
+    reader = SqliteCacheStorage(db_path)
+    writer.load()
+    reader.load()
+    assert not reader.has_external_changes()
+
+    writer.put_many({"A": _record("A"), "B": _record("B")})
+    assert reader.has_external_changes()
+    assert reader.poll_changes() == {"A": _record("A"), "B": _record("B")}
+    assert not reader.has_external_changes()
+
+    writer.put("A", _record("A", status="completed"))  # 覆盖写入生成新的rowid
+    assert reader.poll_changes() == {"A": _record("A", status="completed")}
+    assert reader.poll_changes() == {}
+
+    writer.clear()
+    assert reader.poll_changes() is None
+    writer.close()
+    reader.close()
+
+
+def test_cache_stats_incremental_matches_full_scan():
+    orders = {
+        "A": _record("A", status="completed", shipping_info="张三", updated_at="2024-01-02"),
+        "B": _record("B", shipping_info="张三", potential_duplicate=True, updated_at="2024-01-03"),
+        "C": _record("C", updated_at="2024-01-01"),
+    }
+    stats = CacheStats()
+    for record in orders.values():
+        stats.add(record)
+    assert stats.to_dict() == CacheStats.from_orders(orders).to_dict() == {
+        "total": 3, "completed": 1, "with_shipping": 2, "potential_duplicates": 1,
+        "last_updated": "2024-01-03"}
+
+    updated = _record("C", status="completed", shipping_info="王五", updated_at="2024-01-04")
+    stats.remove(orders["C"])
+    stats.add(updated)
+    orders["C"] = updated
+    assert stats.to_dict() == CacheStats.from_orders(orders).to_dict()
+    assert CacheStats.from_dict(stats.to_dict()).to_dict() == stats.to_dict()
+
+
+def test_snapshot_header_stats_are_updated_by_journal_replay(tmp_path):
+    storage = _json_storage(tmp_path)
+    orders = storage.load()
+    orders.update({"A": _record("A"), "B": _record("B", shipping_info="张三")})
+    storage.put_many(dict(orders), orders)
+    storage.compact(orders)
+    orders["A"] = _record("A", status="completed", updated_at="2024-02-01T00:00:00")
+    storage.put("A", orders["A"])
+    storage.close()
+
+    reloaded = _json_storage(tmp_path)
+    assert reloaded.load() == orders
+    assert reloaded.loaded_stats.to_dict() == CacheStats.from_orders(orders).to_dict()
+
+
+def test_legacy_snapshot_leaves_stats_to_caller(tmp_path):
+    with open(tmp_path / "order_data_cache.json", "w", encoding="utf-8") as f:
+        json.dump({"A": _record("A")}, f)
+    storage = _json_storage(tmp_path)
+    assert storage.load() == {"A": _record("A")}
+    assert storage.loaded_stats is None
+    assert storage.epoch is None
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""坐标缓存：查找和保存只操作内存，写盘延迟到flush"""
+
+import builtins
+import json
+import os
+
+import pytest
+
+from coordinate_cache import CoordinateCache
+from coordinate_policy import CoordinateValidityPolicy, coordinate_timestamp
+
+
+def _fail_file_access(*args, **kwargs):
+    raise AssertionError("坐标缓存的热路径不应访问文件")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    policy = CoordinateValidityPolicy({"coordinate_validation": {"screen_bounds_check": False}})
+    # 延迟写盘时间足够长，测试期间定时器不会触发
+    coordinate_cache = CoordinateCache(str(tmp_path / "coordinate_cache.json"), flush_delay=3600, policy=policy)
+    yield coordinate_cache
+    coordinate_cache.flush()
+
+
+def test_lookup_and_save_do_not_touch_files(cache, monkeypatch):
+    monkeypatch.setattr(builtins, "open", _fail_file_access)
+    monkeypatch.setattr(os.path, "exists", _fail_file_access)
+    monkeypatch.setattr(os, "replace", _fail_file_access)
+
+    for i in range(200):
+        # 交替保存变化的坐标和未变化的坐标
+        assert cache.save_coordinate("订单编号", 100 + i % 2, 200, 3, -2, scroll_y=0)
+        assert cache.save_coordinate("查看1", 300, 400, scroll_y=0)
+        assert cache.lookup("订单编号")["screen_y"] == 200
+        assert cache.lookup("查看1")["success_count"] == i + 1
+        assert cache.lookup("未采集的元素") is None
+
+    assert cache.write_stats["flushes"] == 0
+
+
+def test_flush_persists_pending_changes_once(cache):
+    cache.save_coordinate("订单编号", 100, 200)
+    cache.save_coordinate("订单编号", 100, 200)
+    assert not os.path.exists(cache.cache_file)
+
+    assert cache.flush()
+    assert cache.write_stats["flushes"] == 1
+    assert cache.flush()  # 没有新的修改，不再写盘
+    assert cache.write_stats["flushes"] == 1
+
+    with open(cache.cache_file, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved["coordinates"]["订单编号"]["success_count"] == 2
+
+
+def test_old_records_get_timestamp_on_load(tmp_path):
+    cache_file = tmp_path / "coordinate_cache.json"
+    cache_file.write_text(json.dumps({
+        "cache_version": "1.0",
+        "coordinates": {"订单编号": {"screen_x": 1, "screen_y": 2, "success_count": 3,
+                                 "last_success": "2026-01-01T08:00:00"}}
+    }), encoding="utf-8")
+    policy = CoordinateValidityPolicy({"coordinate_validation": {"screen_bounds_check": False}})
+    coordinate_cache = CoordinateCache(str(cache_file), flush_delay=3600, policy=policy)
+
+    record = coordinate_cache.cache_data["coordinates"]["订单编号"]
+    assert record["last_success_ts"] == coordinate_timestamp(record)
+    assert coordinate_cache._dirty
+
+    copy = {"last_success": "2026-01-01T08:00:00"}
+    coordinate_timestamp(copy)
+    assert "last_success_ts" not in copy
+
+    coordinate_cache.flush()
+    stored = json.loads(cache_file.read_text(encoding="utf-8"))
+    assert stored["coordinates"]["订单编号"]["last_success_ts"] == record["last_success_ts"]
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""数据缓存管理器：字段级比较并交换、备份轮转"""
+
+import os
+import time
+
+import pytest
+
+try:
+    from data_cache_manager import DataCacheManager
+except Exception as e:  # utils 在导入时初始化 pyautogui 等依赖，无图形环境时无法导入
+    pytest.skip(f"无法导入 data_cache_manager: {e}", allow_module_level=True)
+
+
+def _manager(tmp_path, **kwargs):
+    return DataCacheManager(str(tmp_path / "order_data_cache.json"), **kwargs)
+
+
+def test_upsert_fields_rejects_only_stale_fields(tmp_path):
+    manager = _manager(tmp_path)
+    assert manager.upsert_fields("A", {"备注": "first"}) == (True, 1)
+    read_version = manager.get_order_version("A")
+
+    assert manager.upsert_fields("A", {"备注": "second"}, expected_version=read_version) == (True, 2)
+    # 基于版本1的写入方再改"备注"：该字段已在版本2被修改，拒绝
+    assert manager.upsert_fields("A", {"备注": "stale"}, expected_version=read_version) == (False, 2)
+    assert manager.cas_stats["rejected"] == 1
+    assert manager.read_order_by_id("A")["备注"] == "second"
+
+    # 修改其他字段的写入方不冲突
+    assert manager.upsert_fields("A", {"物流": "顺丰"}, expected_version=read_version) == (True, 3)
+    assert manager.upsert_fields("A", {"shipping_info": "张三 13800000000"},
+                                 expected_version=read_version) == (True, 4)
+    record = manager.read_order_by_id("A")
+    assert record["field_versions"] == {"备注": 2, "物流": 3, "shipping_info": 4}
+    manager.close()
+
+    reloaded = _manager(tmp_path)
+    assert reloaded.get_order_version("A") == 4
+    assert reloaded.upsert_fields("A", {"物流": "圆通"}, expected_version=2) == (False, 4)
+    reloaded.close()
+
+
+def test_upsert_fields_with_expected_version_creates_missing_order(tmp_path):
+    manager = _manager(tmp_path)
+    assert manager.upsert_fields("订单编号：B", {"备注": "x"}, expected_version=0) == (True, 1)
+    assert manager.get_order_version("B") == 1
+    assert manager.get_order_version("C") == 0
+    manager.close()
+
+
+def test_backup_rotation_keeps_count_and_newest(tmp_path):
+    manager = _manager(tmp_path, backup_dir=str(tmp_path / "backups"), backup_keep_count=2)
+    manager.write_order_data("A", {"备注": "x"})
+    now = time.time()
+    for age_days, suffix in ((3, "old"), (2, "older_kept"), (1, "newer_kept")):
+        manager.backup_keep_count = None  # 先生成全部备份，再按保留数量轮转
+        backup_file = manager.backup_cache(suffix)
+        os.utime(backup_file, (now - age_days * 86400, now - age_days * 86400))
+
+    manager.backup_keep_count = 2
+    removed = manager.rotate_backups()
+    assert [os.path.basename(path) for path in removed] == ["order_data_cache.json.backup_old"]
+    assert [os.path.basename(path) for path in manager.list_backups()] == [
+        "order_data_cache.json.backup_older_kept", "order_data_cache.json.backup_newer_kept"]
+
+    manager.backup_keep_count = None
+    manager.backup_max_age_days = 0.5
+    manager.rotate_backups()  # 全部过期时仍保留最新的一个
+    assert [os.path.basename(path) for path in manager.list_backups()] == [
+        "order_data_cache.json.backup_newer_kept"]
+    manager.close()
+
+
+def test_hardlink_backup_is_skipped_when_snapshot_unchanged(tmp_path):
+    manager = _manager(tmp_path, backup_hardlink=True)
+    manager.write_order_data("A", {"备注": "x"})
+    first = manager.backup_cache("first")
+    assert os.path.samefile(first, manager.cache_file_path)
+    assert manager.backup_cache("second") == first
+
+    manager.write_order_data("B", {"备注": "y"})
+    second = manager.backup_cache("third")
+    assert second != first
+    assert len(manager.list_backups()) == 2
+    manager.close()
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""数据文件编解码：逐条写入JSON数组"""
+
+import io
+import json
+
+import pytest
+
+from data_codec import write_json_array
+
+
+@pytest.mark.parametrize("items", [
+    [],
+    [{"订单编号": "A", "复制完整收货信息": "张三\n北京市"}],
+    [{"a": 1, "b": [1, {"c": None}]}, {}, [], "多行\n文本"],
+])
+def test_write_json_array_matches_json_dump(items):
+    streamed = io.StringIO()
+    write_json_array(streamed, iter(items))
+    expected = io.StringIO()
+    json.dump(items, expected, ensure_ascii=False, indent=2)
+    assert streamed.getvalue() == expected.getvalue()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""操作执行计划：XPath预拆分与 _generate_xpath_for_item 规则一致"""
+
+import pytest
+
+from operation_plan import compile_operation_plan, split_item_xpath
+
+PATTERN = {"diff_segment_index": 6, "start_index": 3}
+
+XPATHS = [
+    "/html/body/div[1]/div[2]/ul/li[3]/div[1]/span",
+    "/html/body/div[1]/div[2]/ul/li[3]/div[1]/span[2]",
+    "/html/body/div[1]/div[2]/ul/li[3][@class='a'][2]/span",
+    "/html/body/div[1]/div[2]/ul/li/div[1]",  # 模式所在段没有索引：不随订单变化
+    "/html/body/div[1]",  # 段数不足：不随订单变化
+    "//*[@id='order-list']/div/div/div/ul[7]/span",
+]
+
+
+def test_split_item_xpath():
+    assert split_item_xpath(XPATHS[0], PATTERN) == (
+        "/html/body/div[1]/div[2]/ul/li[", "]/div[1]/span", 2)
+    assert split_item_xpath(XPATHS[3], PATTERN) is None
+    assert split_item_xpath(XPATHS[4], PATTERN) is None
+    assert split_item_xpath(XPATHS[0], None) is None
+    assert split_item_xpath(XPATHS[0], {"start_index": 1}) is None
+
+
+def _plan(operations, pattern=PATTERN):
+    handlers = {"getText": "text_handler"}
+    return compile_operation_plan(operations, pattern, {"收货信息": {"x": 5, "y": -3}}, handlers, "default")
+
+
+def test_compiled_steps():
+    operations = [
+        {"name": "订单号", "action": "getText", "xpath": XPATHS[0]},
+        {"name": "收货信息", "action": "click", "xpath": XPATHS[0], "smart_xpath": "//button[text()='查看']"},
+    ]
+    plan = _plan(operations)
+    text_step, click_step = plan.steps
+    assert plan.text_steps == (text_step,)
+    assert text_step.xpath_for(1) == "/html/body/div[1]/div[2]/ul/li[3]/div[1]/span"
+    assert text_step.xpath_for(4) == "/html/body/div[1]/div[2]/ul/li[6]/div[1]/span"
+    assert (text_step.handler, text_step.offsets) == ("text_handler", (0, 0))
+    # smart_xpath固定使用，不按订单替换索引
+    assert click_step.xpath_for(4) == "//button[text()='查看']"
+    assert (click_step.handler, click_step.offsets) == ("default", (5, -3))
+    assert plan.matches(operations, PATTERN)
+    assert not plan.matches(list(operations), PATTERN)
+    with pytest.raises(AttributeError):
+        text_step.name = "x"
+
+
+def test_xpath_for_matches_generate_xpath_for_item():
+    try:
+        from element_collector import ElementCollector
+    except Exception as e:  # utils 在导入时初始化 pyautogui 等依赖，无图形环境时无法导入
+        pytest.skip(f"无法导入 element_collector: {e}")
+
+    for pattern in (PATTERN, {"diff_segment_index": 7, "start_index": 1}, None):
+        plan = _plan([{"name": f"op{i}", "action": "getText", "xpath": xpath} for i, xpath in enumerate(XPATHS)],
+                     pattern)
+        for step, xpath in zip(plan.steps, XPATHS):
+            for slot in (1, 2, 10):
+                assert step.xpath_for(slot) == ElementCollector._generate_xpath_for_item(None, xpath, slot, pattern)
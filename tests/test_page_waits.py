@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""页面条件等待：脚本失败时的回退行为"""
+
+from page_waits import wait_dom_quiet, wait_element_ready
+
+
+class FallbackDriver:
+    """execute_async_script 总是失败，execute_script 依次返回给定的位置"""
+
+    def __init__(self, rects):
+        self.rects = list(rects)
+        self.async_args = None
+
+    def execute_async_script(self, script, *args):
+        self.async_args = args
+        raise RuntimeError("脚本执行失败")
+
+    def execute_script(self, script, *args):
+        if "scrollIntoView" in script:
+            return None
+        return self.rects.pop(0)
+
+
+RECT = {"left": 10, "top": 20, "width": 30, "height": 40}
+
+
+def test_element_ready_fallback_returns_stable_rect():
+    assert wait_element_ready(FallbackDriver([RECT, dict(RECT)]), object(), 0) == RECT
+
+
+def test_element_ready_fallback_returns_none_when_moving_or_hidden():
+    moved = dict(RECT, top=25)
+    assert wait_element_ready(FallbackDriver([RECT, moved]), object(), 0) is None
+    hidden = dict(RECT, width=0)
+    assert wait_element_ready(FallbackDriver([hidden, hidden]), object(), 0) is None
+
+
+def test_dom_quiet_passes_expect_change_and_falls_back_to_timeout():
+    driver = FallbackDriver([])
+    assert wait_dom_quiet(driver, 0, expect_change=True) is False
+    assert driver.async_args == (200, 0, True)
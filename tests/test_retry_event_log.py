@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""重试事件日志：后台写入、按大小轮转、队列满时丢弃计数"""
+
+import json
+import os
+import threading
+
+from retry_event_log import RetryEventLogger, aggregate_retry_log
+
+
+def _event(index, event_type="retry_success", **details):
+    return {"timestamp": f"2024-01-01T00:00:{index:02d}", "event_type": event_type,
+            "element_name": "收货信息", "details": details}
+
+
+def test_rotation_keeps_backup_count_files(tmp_path):
+    log_file = str(tmp_path / "retry_events.log")
+    event_logger = RetryEventLogger(log_file, max_bytes=1, backup_count=2)
+    for index in range(4):
+        event_logger.log(_event(index, duration=index + 1.0))
+        event_logger.flush()  # 每个事件单独一批，写入前都会触发轮转
+    event_logger.close()
+
+    assert not os.path.exists(log_file + ".3")
+    contents = []
+    for path in (log_file + ".2", log_file + ".1", log_file):
+        with open(path, encoding="utf-8") as f:
+            contents.append([json.loads(line)["details"]["duration"] for line in f])
+    assert contents == [[2.0], [3.0], [4.0]]
+    assert event_logger.get_statistics() == {"written": 4, "dropped": 0, "queued": 0}
+
+    summary = aggregate_retry_log(log_file)
+    assert summary["retry_success"]["count"] == 3
+    assert summary["retry_success"]["latency_total"] == 9.0
+    assert summary["retry_success"]["latency_max"] == 4.0
+    assert aggregate_retry_log(log_file, include_rotated=False)["retry_success"]["count"] == 1
+
+
+def test_full_queue_drops_and_counts_events(tmp_path):
+    event_logger = RetryEventLogger(str(tmp_path / "retry_events.log"), queue_size=2)
+    writing = threading.Event()
+    release = threading.Event()
+    write_batch = event_logger._write_batch
+
+    def blocking_write_batch(batch):
+        writing.set()
+        release.wait(5)
+        write_batch(batch)
+
+    event_logger._write_batch = blocking_write_batch
+    assert event_logger.log(_event(0))
+    assert writing.wait(5)  # 后台线程取走第一个事件后阻塞在写入上
+    assert event_logger.log(_event(1)) and event_logger.log(_event(2))
+    assert not any(event_logger.log(_event(index)) for index in range(3, 6))
+    assert event_logger.get_statistics() == {"written": 0, "dropped": 3, "queued": 2}
+
+    release.set()
+    event_logger.close()
+    assert event_logger.get_statistics()["written"] == 3
+    assert not event_logger.log(_event(6))  # 关闭后不再接受事件
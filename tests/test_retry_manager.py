@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""重试管理器：环形缓冲区历史和累计统计、自适应退避和策略排序"""
+
+import json
+
+from retry_manager import RetryManager
+
+
+def _manager(tmp_path, **retry_settings):
+    config_file = tmp_path / "retry_config.json"
+    config = RetryManager(str(config_file)).config  # 配置文件不存在时使用默认配置
+    config["retry_settings"].update(retry_settings)
+    config_file.write_text(json.dumps(config), encoding="utf-8")
+    return RetryManager(str(config_file))
+
+
+def test_history_is_bounded_but_totals_keep_counting(tmp_path):
+    manager = _manager(tmp_path, history_size=5)
+    for i in range(12):
+        manager.record_retry_attempt("收货信息", i, success=i % 3 == 0, duration=0.4 if i % 2 else 12.0)
+
+    stats = manager.get_retry_statistics()
+    assert stats["history_size"] == 5
+    assert stats["history_capacity"] == 5
+    assert [entry["order_index"] for entry in manager.retry_history] == [7, 8, 9, 10, 11]
+    assert stats["total_retry_attempts"] == 12
+    assert stats["successful_retries"] == 4
+    element_stats = stats["element_statistics"]["收货信息"]
+    assert (element_stats["successes"], element_stats["failures"]) == (4, 8)
+    assert element_stats["latency_histogram"]["<=0.5s"] == 6
+    assert element_stats["latency_histogram"]["<=30s"] == 6
+
+
+def test_resizing_history_keeps_newest_entries(tmp_path):
+    manager = _manager(tmp_path, history_size=10)
+    for i in range(8):
+        manager.record_retry_attempt("订单号", i, success=True)
+    manager.cleanup_old_history(3)
+    assert [entry["order_index"] for entry in manager.retry_history] == [5, 6, 7]
+    assert manager.get_retry_statistics()["total_retry_attempts"] == 8
+
+
+def test_backoff_grows_with_attempts_and_is_capped(tmp_path):
+    manager = _manager(tmp_path, retry_delay_seconds=2.0, backoff_jitter=0, retry_timeout_seconds=30)
+    assert manager.get_retry_delay("收货信息", 1) == 2.0  # 没有记录：标准指数退避
+    manager.record_retry_attempt("收货信息", 1, success=False)
+    assert manager.get_retry_delay("收货信息", 1) == 5.33  # 2 * 2^1 * 成功率系数(4/3)
+    for _ in range(5):
+        manager.record_retry_attempt("收货信息", 1, success=False)
+    assert manager.get_retry_delay("收货信息", 1) == 30
+
+    manager.config["retry_settings"]["adaptive_backoff"] = False
+    assert manager.get_retry_delay("收货信息", 1) == 2.0
+
+
+def test_reliable_element_waits_less(tmp_path):
+    manager = _manager(tmp_path, retry_delay_seconds=2.0, backoff_jitter=0)
+    for i in range(10):
+        manager.record_retry_attempt("订单号", i, success=True)
+    assert manager.get_retry_delay("订单号", 99) == 0.5  # 系数下限0.25
+
+
+def test_should_retry_stops_when_wait_budget_is_spent(tmp_path):
+    manager = _manager(tmp_path, max_retry_attempts=5, retry_timeout_seconds=10)
+    manager.record_retry_attempt("收货信息", 1, success=False)
+    manager.record_retry_wait("收货信息", 1, 6)
+    assert manager.should_retry("收货信息", 1)
+    manager.record_retry_wait("收货信息", 1, 4)
+    assert not manager.should_retry("收货信息", 1)
+    assert manager.should_retry("收货信息", 2)
+
+    manager.reset_retry_attempts("收货信息", 1)
+    assert manager.should_retry("收货信息", 1)
+
+
+def test_strategies_are_ordered_by_expected_cost_per_element(tmp_path):
+    manager = _manager(tmp_path, retry_strategies=[
+        "fallback_xpath", "smart_element_search", "cached_coordinates"])
+    for _ in range(3):
+        manager.record_strategy_outcome("收货信息", "fallback_xpath", success=False, duration=3.0)
+        manager.record_strategy_outcome("收货信息", "cached_coordinates", success=True, duration=0.2)
+
+    # 有记录的策略在原来的位置之间重排，没有记录的策略位置不变
+    assert manager.get_retry_strategies("收货信息") == [
+        "cached_coordinates", "smart_element_search", "fallback_xpath"]
+    assert manager.get_retry_strategies("订单号") == [
+        "fallback_xpath", "smart_element_search", "cached_coordinates"]
+    assert manager.get_retry_strategies() == [
+        "fallback_xpath", "smart_element_search", "cached_coordinates"]
+    assert manager.get_retry_statistics()["strategy_order"]["收货信息"][0] == "cached_coordinates"
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""采集进度检查点：快照 + 追加日志"""
+
+import os
+
+from run_checkpoint import RunCheckpoint
+
+
+def _checkpoint(tmp_path):
+    return RunCheckpoint(str(tmp_path / "run_checkpoint.json"))
+
+
+def test_record_order_appends_without_rewriting_snapshot(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    checkpoint.start("modular", 100, page_size=10, cache_epoch="e1")
+    snapshot_mtime = os.stat(checkpoint.checkpoint_file).st_mtime_ns
+    snapshot_size = os.path.getsize(checkpoint.checkpoint_file)
+
+    pattern = {"diff_segment_index": 5, "start_index": 1}
+    for i in range(1, 51):
+        checkpoint.record_order(1 + (i - 1) // 10, i, f"order-{i}", xpath_pattern=pattern)
+
+    assert os.stat(checkpoint.checkpoint_file).st_mtime_ns == snapshot_mtime
+    assert os.path.getsize(checkpoint.checkpoint_file) == snapshot_size
+    with open(checkpoint.journal_file_path, encoding="utf-8") as f:
+        lines = f.readlines()
+    assert len(lines) == 50
+    assert sum('"xpath_pattern"' in line for line in lines) == 5  # 每页只记录一次模式
+
+
+def test_load_replays_journal_and_resume_compacts(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    checkpoint.start("original", 20, cache_epoch="e1")
+    checkpoint.record_order(1, 1, "A")
+    checkpoint.record_order(1, 2, "B", xpath_pattern={"start_index": 3})
+    checkpoint.record_order(1, 3, "B")  # 重复的订单ID只记录一次
+
+    data = _checkpoint(tmp_path).load()
+    assert data["order_index"] == 3
+    assert data["processed_order_ids"] == ["A", "B"]
+    assert data["cache_epoch"] == "e1"
+
+    resumed = _checkpoint(tmp_path)
+    assert resumed.resume()["order_index"] == 3
+    assert resumed.is_processed("A") and not resumed.is_processed("C")
+    assert resumed.page_pattern(1) == {"start_index": 3}
+    assert not os.path.exists(resumed.journal_file_path)
+
+    resumed.record_order(1, 4, "C")
+    assert _checkpoint(tmp_path).load()["processed_order_ids"] == ["A", "B", "C"]
+
+
+def test_torn_journal_tail_is_ignored(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    checkpoint.start("original", 20)
+    checkpoint.record_order(1, 1, "A")
+    checkpoint.sync()
+    with open(checkpoint.journal_file_path, "ab") as f:
+        f.write(b'{"page":1,"order_index":2,"order')
+
+    data = _checkpoint(tmp_path).load()
+    assert data["order_index"] == 1
+    assert data["processed_order_ids"] == ["A"]
+
+
+def test_old_checkpoint_without_journal_and_clear(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    checkpoint.start("modular", 20, xpath_pattern={"start_index": 1})
+    checkpoint.data["page"] = 2  # 旧版检查点：只有最后一页的模式，没有page_patterns
+    checkpoint.save()
+    loaded = _checkpoint(tmp_path)
+    loaded.resume()
+    assert loaded.page_pattern(2) == {"start_index": 1}
+    assert loaded.page_pattern(1) is None
+
+    loaded.record_order(2, 1, "A")
+    loaded.clear()
+    assert not os.path.exists(loaded.checkpoint_file)
+    assert not os.path.exists(loaded.journal_file_path)
+    assert _checkpoint(tmp_path).load() is None
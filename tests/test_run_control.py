@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""采集运行控制：状态变化、等待和界面队列"""
+
+import threading
+import time
+
+from run_control import RunControl, RunControlState
+
+
+class Collector(RunControlState):
+    def __init__(self):
+        self.run_control = RunControl()
+
+
+def _start_later(delay, action):
+    timer = threading.Timer(delay, action)
+    timer.start()
+    return timer
+
+
+def test_state_properties_map_to_events_and_post_on_change():
+    collector = Collector()
+    changes = []
+    collector.run_control.on_change = lambda: changes.append(collector.is_paused)
+
+    collector.is_running = True
+    collector.is_paused = True
+    collector.is_paused = True  # 状态未变化时不通知
+    assert collector.run_control.running.is_set()
+    assert collector.run_control.is_blocked()
+
+    collector.run_control.dispatch_pending()
+    assert changes == [True, True]  # 两次变化（running、paused），回调在界面线程执行时读取当前状态
+
+
+def test_wait_until_clear_wakes_when_pause_released():
+    collector = Collector()
+    collector.is_running = True
+    collector.force_stop_flag = True
+    _start_later(0.05, lambda: setattr(collector, "force_stop_flag", False))
+    assert collector.run_control.wait_until_clear(timeout=2)
+
+
+def test_wait_until_clear_returns_false_when_stopped():
+    collector = Collector()
+    collector.is_running = True
+    collector.is_paused = True
+    _start_later(0.05, lambda: setattr(collector, "is_running", False))
+    assert not collector.run_control.wait_until_clear(timeout=2)
+
+
+def test_sleep_is_interrupted_by_stop():
+    control = RunControl()
+    control.set_state(control.running, True)
+    _start_later(0.05, lambda: control.set_state(control.running, False))
+    started_at = time.time()
+    assert not control.sleep(5)
+    assert time.time() - started_at < 1
+
+
+def test_wait_event_returns_on_signal_or_stop():
+    control = RunControl()
+    control.set_state(control.running, True)
+    decided = threading.Event()
+    _start_later(0.05, lambda: control.signal(decided))
+    assert control.wait_event(decided, timeout=2)
+
+    pending = threading.Event()
+    _start_later(0.05, lambda: control.set_state(control.running, False))
+    assert not control.wait_event(pending, timeout=2)
+
+
+def test_dispatch_pending_runs_callbacks_in_order_and_survives_errors():
+    control = RunControl()
+    calls = []
+    control.post(calls.append, 1)
+    control.post(lambda: 1 / 0)
+    control.post(calls.append, 2)
+    control.dispatch_pending()
+    assert calls == [1, 2]
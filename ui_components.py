@@ -25,7 +25,14 @@ class UIComponents:
     def _log_info(self, message, color=None):
         print(f"LOG: {message}")  # 强制输出到控制台，便于调试
         logger.info(message)
-        # 添加到UI文本框
+        # 其他线程（采集、验证码检测等）不直接操作Tk，交给界面线程写入文本框
+        if threading.current_thread() is not threading.main_thread():
+            self.run_control.post(self._append_status_text, message, color)
+            return
+        self._append_status_text(message, color)
+    
+    def _append_status_text(self, message, color=None):
+        """添加到UI文本框（界面线程执行）"""
         self.status_text.config(state=tk.NORMAL)  # 临时设置为可写
         self.status_text.insert(tk.END, f"[{datetime.now().strftime('%H:%M:%S')}] {message}\n")
         # 应用颜色标签
@@ -35,6 +42,11 @@ class UIComponents:
         self.status_text.see(tk.END)  # 滚动到最新内容
         self.status_text.config(state=tk.DISABLED)  # 恢复只读
     
+    def _pump_run_control(self):
+        """界面线程定时执行采集线程投递的界面更新"""
+        self.run_control.dispatch_pending()
+        self.root.after(50, self._pump_run_control)
+    
 
     def _create_gui(self):
         """创建GUI界面"""
@@ -133,6 +145,14 @@ class UIComponents:
         )
         self.stop_button.pack(side=tk.LEFT, padx=5)
         
+        # 断点续采按钮：从上次中断的检查点继续
+        self.resume_button = ttk.Button(
+            self.control_frame, 
+            text="断点续采", 
+            command=self._resume_collection
+        )
+        self.resume_button.pack(side=tk.LEFT, padx=5)
+        
         # 添加配置操作按钮
         self.configure_button = ttk.Button(
             self.control_frame, 
@@ -624,7 +644,7 @@ class UIComponents:
                 self._log_info("检测到*键，终止操作...", "red")
                 self._stop_collection()
                 # 立即启用数据导出功能
-                if hasattr(self, 'collected_data') and len(self.collected_data) > 0:
+                if self._has_export_data():
                     self._log_info("操作已终止，数据导出功能已启用", "green")
                     messagebox.showinfo("操作终止", "操作已终止，现在可以进行数据导出。")
                 return
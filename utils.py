@@ -20,6 +20,9 @@ import ctypes
 import re
 from datetime import datetime
 
+# 项目内模块
+from retry_event_log import get_retry_event_logger, aggregate_retry_log
+
 # GUI相关导入
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
@@ -248,13 +251,8 @@ def log_retry_event(self, event_type: str, element_name: str, details: dict = No
         "details": details or {}
     }
     
-    # 写入重试日志文件
-    retry_log_file = "retry_events.log"
-    try:
-        with open(retry_log_file, 'a', encoding='utf-8') as f:
-            f.write(f"{json.dumps(log_entry, ensure_ascii=False)}\n")
-    except Exception as e:
-        print(f"写入重试日志失败: {e}")
+    # 写入重试日志文件（后台线程批量写入）
+    write_retry_log(log_entry)
     
     # 同时输出到控制台
     color_map = {
@@ -281,11 +279,5 @@ def create_retry_log_entry(event_type: str, element_name: str, details: dict = N
 
 
 def write_retry_log(log_entry: dict, log_file: str = "retry_events.log") -> bool:
-    """写入重试日志到文件"""
-    try:
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(f"{json.dumps(log_entry, ensure_ascii=False)}\n")
-        return True
-    except Exception as e:
-        print(f"写入重试日志失败: {e}")
-        return False
+    """写入重试日志到文件（放入后台写入队列，不阻塞调用线程；队列满时丢弃并返回False）"""
+    return get_retry_event_logger(log_file).log(log_entry)